@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import httpx
+from backend.query_engine import QueryEngine
+
+
+class AsyncQueryEngine(QueryEngine):
+    """asyncio-native QueryEngine for the FastAPI endpoints.
+
+    search_movies, get_movies_by_uris and get_options(_entry) are coroutines that go
+    through one pooled httpx.AsyncClient, so a request waiting on Blazegraph
+    does not hold a worker thread. Independent queries (the per-attribute
+    detail fetches, the /options lists) run concurrently.
+
+    Only the transport is async: caching, paging, query building and result
+    shaping are QueryEngine's query-step generators (see
+    QueryEngine._run_steps), as are the blocking helpers used at startup
+    (is_connected, has_movies, upload_ttl) and by the index builders.
+    """
+
+    def __init__(self, blazegraph_url: str = "http://blazegraph:9999/bigdata/namespace/kb/sparql",
+                 single_query: bool = True, pool_size: int = 10,
+                 timeout: float = 30.0, connect_timeout: float = 5.0, upload_timeout: float = 600.0,
+                 options_ttl: float = 300.0, search_cache_size: int = 1024, search_cache_ttl: float = 600.0):
+        super().__init__(blazegraph_url, single_query=single_query, pool_size=pool_size,
+                         timeout=timeout, connect_timeout=connect_timeout, upload_timeout=upload_timeout,
+                         options_ttl=options_ttl, search_cache_size=search_cache_size,
+                         search_cache_ttl=search_cache_ttl)
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+        self._background_tasks = set()
+
+    async def aclose(self):
+        """Closes the async and the blocking connection pools."""
+        await self.client.aclose()
+        self.close()
+
+    async def _arun_query(self, query):
+        """Runs a SELECT query and returns its result bindings."""
+        response = await self.client.post(
+            self.endpoint,
+            data={"query": query},
+            headers={"Accept": "application/sparql-results+json"},
+        )
+        response.raise_for_status()
+        return response.json()["results"]["bindings"]
+
+    async def _arun_steps(self, steps):
+        """Drives a query-step generator (see QueryEngine._run_steps), each list of queries concurrently."""
+        try:
+            queries = next(steps)
+            while True:
+                results = await asyncio.gather(*(self._arun_query(q) for q in queries), return_exceptions=True)
+                for result in results:
+                    # Cancellation is not a query error
+                    if isinstance(result, BaseException) and not isinstance(result, Exception):
+                        raise result
+                queries = steps.send(results)
+        except StopIteration as stop:
+            return stop.value
+
+    async def get_options(self):
+        """Returns the unique genres for the dropdown (actors/directors come from suggest)."""
+        return (await self.get_options_entry()).value
+
+    async def get_options_entry(self):
+        """The cached /options payload and its ETag (see QueryEngine.get_options_entry)."""
+        entry = self.options_cache.peek()
+        if entry is not None:
+            if not entry.fresh and self.options_cache.begin_refresh():
+                self._spawn(self._arefresh_options())
+            return entry
+        return await self._aload_options(self.options_cache.generation)
+
+    def _spawn(self, coro):
+        """Runs ``coro`` in the background, keeping a reference until it finishes."""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _arefresh_options(self):
+        try:
+            await self._aload_options(self.options_cache.generation)
+        except Exception as e:
+            logging.error(f"Background refresh of options failed: {e}")
+        finally:
+            self.options_cache.end_refresh()
+
+    async def _aload_options(self, generation):
+        return self._cache_options(await self._afetch_options(), generation)
+
+    async def _afetch_options(self):
+        return await self._arun_steps(self._options_steps())
+
+    async def search_movies(self, title=None, genre=None, year_start=None, year_end=None, actor=None, director=None, limit=50,
+                            cursor=None):
+        """Paged, cached search; see QueryEngine.search_movies."""
+        return await self._arun_steps(
+            self._search_steps(title, genre, year_start, year_end, actor, director, limit, cursor))
+
+    async def get_movies_by_uris(self, movie_uris):
+        """Fetches details for a specific list of movie URIs."""
+        return await self._arun_steps(self._movies_by_uris_steps(movie_uris))
@@ -0,0 +1,270 @@
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Blazegraph content types per file extension
+CONTENT_TYPES = {
+    ".ttl": "application/x-turtle",
+    ".nt": "text/plain",
+}
+
+DIRECTIVES = (b"@prefix", b"@base", b"prefix ", b"base ")
+
+# The next literal, IRI or comment outside of one, and the end of the literal
+# opened by each quote (backslash escapes skipped)
+TURTLE_SPECIAL = re.compile(rb"""\"\"\"|'''|["'<#]""")
+TURTLE_CLOSE = {quote: re.compile(rb"(?:\\.|[^\\])*?" + re.escape(quote), re.DOTALL)
+                for quote in (b'"""', b"'''", b'"', b"'")}
+
+
+def scan_turtle_line(line, quote=None):
+    """Scans one Turtle line, starting inside the long string ``quote`` if given.
+
+    Returns the long string still open at the end of the line (None if none)
+    and whether the line ends a statement, i.e. its last token outside
+    literals, IRIs and comments is a "." after whitespace, a literal or an IRI.
+    """
+    i = 0
+    while True:
+        if quote is not None:
+            match = TURTLE_CLOSE[quote].match(line, i)
+            if match is None:
+                return (quote if len(quote) == 3 else None), False
+            i, quote = match.end(), None
+
+        match = TURTLE_SPECIAL.search(line, i)
+        if match is None or match.group() == b"#":
+            code = line[i:match.start() if match else len(line)].rstrip()
+            return None, code.endswith(b".") and (len(code) == 1 or code[-2:-1].isspace())
+        if match.group() == b"<":
+            i = line.find(b">", match.end()) + 1
+            if i == 0:
+                return None, False
+        else:
+            quote, i = match.group(), match.end()
+
+
+def iter_turtle_chunks(f, chunk_bytes):
+    """Splits a Turtle stream into self-contained documents of ~chunk_bytes.
+
+    Prefix/base directives are repeated at the top of every chunk, and chunks
+    only break after a line that ends a statement (see scan_turtle_line), so
+    a "." at the end of a literal, an IRI or a comment never splits one and
+    each chunk parses on its own. Blank node labels are scoped per request,
+    so they must not be shared across statements (rdflib's serializer, used
+    by csv_to_rdf.py, does not emit any).
+    """
+    header = []
+    body = []
+    body_size = 0
+    long_string = None
+
+    for line in f:
+        if long_string is None and line.strip().lower().startswith(DIRECTIVES):
+            header.append(line)
+            continue
+
+        body.append(line)
+        body_size += len(line)
+        long_string, ends_statement = scan_turtle_line(line, long_string)
+
+        if ends_statement and body_size >= chunk_bytes:
+            yield b"".join(header + body), None
+            body, body_size = [], 0
+
+    if any(line.strip() for line in body):
+        yield b"".join(header + body), None
+
+
+def iter_ntriples_chunks(f, chunk_bytes):
+    """Splits an N-Triples stream on line boundaries; also returns the triple count."""
+    lines = []
+    size = 0
+    for line in f:
+        stripped = line.strip()
+        if not stripped or stripped.startswith(b"#"):
+            continue
+        lines.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield b"".join(lines), len(lines)
+            lines, size = [], 0
+    if lines:
+        yield b"".join(lines), len(lines)
+
+
+class BulkLoader:
+    """Streams a large Turtle/N-Triples file into Blazegraph in chunks.
+
+    Chunks of about ``chunk_bytes`` are uploaded by up to ``concurrency``
+    threads through the QueryEngine's connection pool, with at most
+    ``2 * concurrency`` chunks held in memory. Failed chunks are retried with
+    exponential backoff. Finished chunk numbers are recorded in a progress
+    file, so re-running an interrupted load skips them (the split is
+    deterministic for a given file and chunk size). The progress file is
+    written before the first chunk and removed once every chunk has been
+    loaded, so it exists exactly while a load is unfinished.
+    """
+
+    def __init__(self, engine, chunk_bytes: int = 4 * 1024 * 1024, concurrency: int = 4,
+                 retries: int = 3, backoff: float = 1.0, progress_path: str = None):
+        self.engine = engine
+        self.chunk_bytes = chunk_bytes
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.progress_path = progress_path
+
+    def _progress_file(self, path):
+        return self.progress_path or path + ".progress.json"
+
+    def _load_progress(self, path, fingerprint):
+        try:
+            with open(self._progress_file(path), encoding="utf-8") as f:
+                progress = json.load(f)
+        except (OSError, ValueError):
+            return {"fingerprint": fingerprint, "done": [], "triples": 0}
+        if progress.get("fingerprint") != fingerprint:
+            logging.info("Progress file belongs to another file version or chunk size, starting over.")
+            return {"fingerprint": fingerprint, "done": [], "triples": 0}
+        return progress
+
+    def _save_progress(self, path, progress):
+        progress_file = self._progress_file(path)
+        with open(progress_file + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(progress, f)
+        os.replace(progress_file + ".tmp", progress_file)
+
+    def is_pending(self, path):
+        """Whether a load of ``path`` was started and has not finished."""
+        return os.path.exists(self._progress_file(path))
+
+    def ensure_loaded(self, path):
+        """Loads ``path`` into an empty store, or resumes an unfinished load of it.
+
+        Returns the ``load`` report, or None when the store already has
+        movies and no load of ``path`` is pending.
+        """
+        if not self.is_pending(path) and self.engine.has_movies():
+            return None
+        return self.load(path)
+
+    def _upload(self, index, data, content_type):
+        """Posts one chunk, retrying; returns the number of triples Blazegraph added."""
+        for attempt in range(self.retries + 1):
+            try:
+                return self.engine.post_rdf(data, content_type)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logging.warning(f"Chunk {index} failed ({e}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+    def load(self, path: str, resume: bool = True):
+        """Loads ``path`` and returns a summary dict including triples/sec."""
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in CONTENT_TYPES:
+            raise ValueError(f"Unsupported RDF file type: {path} (expected .ttl or .nt)")
+        content_type = CONTENT_TYPES[ext]
+        split = iter_ntriples_chunks if ext == ".nt" else iter_turtle_chunks
+
+        stat = os.stat(path)
+        fingerprint = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns, self.chunk_bytes]
+        progress = self._load_progress(path, fingerprint) if resume else {
+            "fingerprint": fingerprint, "done": [], "triples": 0,
+        }
+        done = set(progress["done"])
+        if done:
+            logging.info(f"Resuming {path}: {len(done)} chunks already loaded.")
+        # Marks the load as unfinished until every chunk is in
+        self._save_progress(path, progress)
+
+        logging.info(f"Bulk loading {path} to {self.engine.endpoint} "
+                     f"({self.chunk_bytes} byte chunks, concurrency {self.concurrency})...")
+        start = time.perf_counter()
+        loaded_triples = 0
+        loaded_bytes = 0
+        failed = []
+        pending = {}
+
+        def collect(finished):
+            nonlocal loaded_triples, loaded_bytes
+            for future in finished:
+                index, size, counted = pending.pop(future)
+                try:
+                    modified = future.result()
+                except Exception as e:
+                    logging.error(f"Chunk {index} failed after {self.retries} retries: {e}")
+                    failed.append(index)
+                    continue
+                triples = modified if modified is not None else (counted or 0)
+                loaded_triples += triples
+                loaded_bytes += size
+                progress["done"].append(index)
+                progress["triples"] += triples
+                self._save_progress(path, progress)
+
+        try:
+            with open(path, "rb") as f, ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for index, (data, counted) in enumerate(split(f, self.chunk_bytes)):
+                    if index in done:
+                        continue
+                    future = pool.submit(self._upload, index, data, content_type)
+                    pending[future] = (index, len(data), counted)
+                    # Bounded read-ahead: never hold more than 2x concurrency chunks
+                    if len(pending) >= 2 * self.concurrency:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(finished)
+                collect(wait(pending).done)
+        finally:
+            self.engine.data_changed()
+
+        seconds = time.perf_counter() - start
+        report = {
+            "chunks_loaded": len(progress["done"]) - len(done),
+            "chunks_skipped": len(done),
+            "chunks_failed": sorted(failed),
+            "triples": loaded_triples,
+            "bytes": loaded_bytes,
+            "seconds": round(seconds, 3),
+            "triples_per_sec": round(loaded_triples / seconds, 1) if seconds > 0 else None,
+        }
+        if failed:
+            raise RuntimeError(f"Bulk load of {path} incomplete, failed chunks {sorted(failed)}; "
+                               f"re-run to resume. {report}")
+
+        try:
+            os.remove(self._progress_file(path))
+        except OSError:
+            pass
+        logging.info(f"Loaded {loaded_triples} triples in {seconds:.1f}s "
+                     f"({report['triples_per_sec']} triples/sec)")
+        return report
+
+
+if __name__ == "__main__":
+    # python -m backend.bulk_loader data/wiki_db_cleaned.ttl --endpoint http://localhost:9999/bigdata/namespace/kb/sparql
+    import argparse
+    from backend.query_engine import QueryEngine
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--endpoint", default="http://localhost:9999/bigdata/namespace/kb/sparql")
+    parser.add_argument("--chunk-mb", type=float, default=4.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--no-resume", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    loader = BulkLoader(
+        QueryEngine(args.endpoint, pool_size=args.concurrency),
+        chunk_bytes=int(args.chunk_mb * 1024 * 1024),
+        concurrency=args.concurrency,
+        retries=args.retries,
+    )
+    print(json.dumps(loader.load(args.path, resume=not args.no_resume), indent=2))
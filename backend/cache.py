@@ -0,0 +1,154 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    """A cached payload together with its precomputed ETag."""
+
+    def __init__(self, value, ttl: float):
+        self.value = value
+        self.created = time.monotonic()
+        self.expires = self.created + ttl
+        body = json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    @property
+    def fresh(self):
+        return time.monotonic() < self.expires
+
+
+class StaleWhileRevalidateCache:
+    """Holds one value for ``ttl`` seconds, then serves it stale while it refreshes.
+
+    The cache does not run refreshes itself; callers check ``peek()`` and, when
+    the entry is stale, start a background refresh if ``begin_refresh()``
+    returns True (at most one refresh is in flight). Results computed before an
+    ``invalidate()`` are discarded, so a refresh that raced a data reload
+    cannot re-populate the cache with old data.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._entry = None
+        self._generation = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def peek(self):
+        """The current entry (fresh or stale), or None if nothing is cached."""
+        return self._entry
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def begin_refresh(self):
+        """Claims the single refresh slot; returns False if it is taken."""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+
+    def end_refresh(self):
+        with self._lock:
+            self._refreshing = False
+
+    def set(self, value, generation: int = None):
+        """Stores ``value`` unless the cache was invalidated since ``generation``."""
+        entry = CacheEntry(value, self.ttl)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return entry
+            self._entry = entry
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
+            self._generation += 1
+
+    def stats(self):
+        entry = self._entry
+        return {
+            "cached": entry is not None,
+            "fresh": entry is not None and entry.fresh,
+            "age": time.monotonic() - entry.created if entry is not None else None,
+            "ttl": self.ttl,
+            "etag": entry.etag if entry is not None else None,
+        }
+
+
+class LRUCache:
+    """Bounded, thread-safe LRU mapping whose entries also expire after ``ttl`` seconds.
+
+    Keeps hit/miss/eviction/expiry counters for the admin stats endpoint.
+    Like StaleWhileRevalidateCache, ``set`` ignores values computed before the
+    last ``clear()`` when given the generation read before computing them.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires, value)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        """Returns (found, value) and marks the key as most recently used."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return False, None
+            expires, value = item
+            if time.monotonic() >= expires:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, generation: int = None):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -1,53 +1,606 @@
 import csv
+import hashlib
+import logging
+import os
+import threading
 import numpy as np
 
+
+def _top_k(dists, k):
+    """Positions of the k smallest values, sorted ascending."""
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(dists):
+        top = np.argpartition(dists, k - 1)[:k]
+    else:
+        top = np.arange(len(dists))
+    return top[np.argsort(dists[top], kind="stable")]
+
+
+class IVFIndex:
+    """Inverted-file (IVF) approximate nearest-neighbour index.
+
+    Rows are clustered with k-means into ``nlist`` lists. A query only scans
+    the rows of the ``nprobe`` lists whose centroids are closest to it, so
+    ``nprobe`` trades recall for latency (``nprobe == nlist`` is exact search).
+    """
+
+    def __init__(self, centroids, list_order, list_offsets, fingerprint=""):
+        self.centroids = centroids          # (nlist, dim) float32
+        self.list_order = list_order        # row ids grouped by list
+        self.list_offsets = list_offsets    # list j is list_order[offsets[j]:offsets[j + 1]]
+        self.fingerprint = fingerprint
+        self.centroid_sq_norms = np.einsum("ij,ij->i", centroids, centroids)
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, matrix, nlist=None, n_iter=20, seed=42):
+        """Runs k-means over the rows of ``matrix`` and groups them by centroid."""
+        n = len(matrix)
+        if nlist is None:
+            nlist = int(np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+
+        rng = np.random.default_rng(seed)
+        centroids = matrix[rng.choice(n, size=nlist, replace=False)].astype(np.float32)
+        sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+
+        for _ in range(n_iter):
+            assign = cls._assign(matrix, sq_norms, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, matrix)
+            counts = np.bincount(assign, minlength=nlist)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty lists with random rows so no centroid goes to waste
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = matrix[rng.choice(n, size=len(empty), replace=False)]
+
+        assign = cls._assign(matrix, sq_norms, centroids)
+        list_order = np.argsort(assign, kind="stable").astype(np.int64)
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=nlist), out=list_offsets[1:])
+        return cls(centroids, list_order, list_offsets, fingerprint=matrix_fingerprint(matrix))
+
+    def add(self, vectors, first_row, fingerprint=""):
+        """A copy of the index with ``vectors`` (rows ``first_row``, ``first_row + 1``, ...)
+        filed under their nearest centroids; the centroids themselves stay put."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        assign = self._assign(vectors, np.einsum("ij,ij->i", vectors, vectors), self.centroids)
+        old_lists = np.repeat(np.arange(self.nlist), np.diff(self.list_offsets))
+        lists = np.concatenate([old_lists, assign])
+        rows = np.concatenate([self.list_order, first_row + np.arange(len(vectors), dtype=np.int64)])
+        # Stable, so every list keeps its old rows first
+        order = np.argsort(lists, kind="stable")
+        list_offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lists, minlength=self.nlist), out=list_offsets[1:])
+        return IVFIndex(self.centroids, rows[order], list_offsets, fingerprint=fingerprint)
+
+    @staticmethod
+    def _assign(matrix, sq_norms, centroids):
+        c_sq = np.einsum("ij,ij->i", centroids, centroids)
+        dists = sq_norms[:, None] - 2.0 * (matrix @ centroids.T) + c_sq[None, :]
+        return np.argmin(dists, axis=1)
+
+    def candidates(self, query_vec, nprobe, max_candidates=None):
+        """Row ids stored in the ``nprobe`` lists closest to ``query_vec``."""
+        nprobe = max(1, min(nprobe, self.nlist))
+        c_dists = self.centroid_sq_norms - 2.0 * (self.centroids @ query_vec)
+        probe = _top_k(c_dists, nprobe)
+        rows = np.concatenate([
+            self.list_order[self.list_offsets[j]:self.list_offsets[j + 1]] for j in probe
+        ])
+        if max_candidates is not None:
+            rows = rows[:max_candidates]
+        return rows
+
+    def save(self, path):
+        np.savez(
+            path,
+            centroids=self.centroids,
+            list_order=self.list_order,
+            list_offsets=self.list_offsets,
+            fingerprint=np.array(self.fingerprint),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data["centroids"],
+                data["list_order"],
+                data["list_offsets"],
+                fingerprint=str(data["fingerprint"]),
+            )
+
+
+def _merge_top_k(ids, dists, k):
+    """Per row, the k smallest of ``dists`` with their ``ids``, sorted by distance then id."""
+    if dists.shape[1] > k:
+        part = np.argpartition(dists, k - 1, axis=1)[:, :k]
+        top_ids = np.take_along_axis(ids, part, axis=1)
+        top_dists = np.take_along_axis(dists, part, axis=1)
+        # argpartition picks arbitrarily among ties at the k-th distance; those
+        # (rare) rows are fully sorted so the lowest ids win, whatever the tiling
+        tied = np.flatnonzero(np.count_nonzero(dists <= top_dists.max(axis=1, keepdims=True), axis=1) > k)
+        if len(tied):
+            order = np.lexsort((ids[tied], dists[tied]), axis=1)[:, :k]
+            top_ids[tied] = np.take_along_axis(ids[tied], order, axis=1)
+            top_dists[tied] = np.take_along_axis(dists[tied], order, axis=1)
+        ids, dists = top_ids, top_dists
+    order = np.lexsort((ids, dists), axis=1)
+    return np.take_along_axis(ids, order, axis=1), np.take_along_axis(dists, order, axis=1)
+
+
+def nearest_neighbours(matrix, k, rows=None, columns=None, sq_norms=None, block_size=2048):
+    """(ids, L2 distances) of the k nearest ``columns`` rows of every ``rows`` row.
+
+    ``rows`` and ``columns`` are ranges of row ids (default: all); a row
+    never counts as its own neighbour. Distances are computed one
+    ``block_size`` x ``block_size`` tile at a time and folded into a running
+    top k, so memory stays bounded whatever the number of movies.
+    """
+    n = len(matrix)
+    rows = range(n) if rows is None else rows
+    columns = range(n) if columns is None else columns
+    if sq_norms is None:
+        sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+    ids_out = np.empty((len(rows), k), dtype=np.int64)
+    dists_out = np.empty((len(rows), k), dtype=np.float32)
+
+    for r0 in range(rows.start, rows.stop, block_size):
+        r1 = min(r0 + block_size, rows.stop)
+        block = np.asarray(matrix[r0:r1])
+        best_ids = np.empty((r1 - r0, 0), dtype=np.int64)
+        best_dists = np.empty((r1 - r0, 0), dtype=np.float32)
+        for c0 in range(columns.start, columns.stop, block_size):
+            c1 = min(c0 + block_size, columns.stop)
+            dists = sq_norms[r0:r1, None] - 2.0 * (block @ np.asarray(matrix[c0:c1]).T) + sq_norms[None, c0:c1]
+            np.maximum(dists, 0.0, out=dists)
+            # Overlapping row and column ranges put each row's self-match on a diagonal
+            lo, hi = max(r0, c0), min(r1, c1)
+            if lo < hi:
+                dists[np.arange(lo - r0, hi - r0), np.arange(lo - c0, hi - c0)] = np.inf
+            ids = np.broadcast_to(np.arange(c0, c1, dtype=np.int64), dists.shape)
+            best_ids, best_dists = _merge_top_k(np.concatenate([best_ids, ids], axis=1),
+                                                np.concatenate([best_dists, dists], axis=1), k)
+        ids_out[r0 - rows.start:r1 - rows.start] = best_ids
+        dists_out[r0 - rows.start:r1 - rows.start] = np.sqrt(best_dists)
+    return ids_out, dists_out
+
+
+def pair_distances(matrix, rows, ids, sq_norms=None, block_size=2048):
+    """L2 distances from row ``rows[i]`` to each row ``ids[i, j]``, float32, ``block_size`` rows at a time."""
+    if sq_norms is None:
+        sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+    dists = np.empty(ids.shape, dtype=np.float32)
+    for start in range(0, len(rows), block_size):
+        block_rows, block_ids = rows[start:start + block_size], ids[start:start + block_size]
+        dots = np.einsum("ij,ikj->ik", matrix[block_rows], matrix[block_ids])
+        squared = sq_norms[block_rows, None] - 2.0 * dots + sq_norms[block_ids]
+        dists[start:start + block_size] = np.sqrt(np.maximum(squared, 0.0))
+    return dists
+
+
+class NeighbourTable:
+    """The precomputed k nearest movies of every movie, for O(1) /similar lookups.
+
+    Row i lists the neighbours of movie i, nearest first: ids as int32 and
+    L2 distances as float16 (written by compute_neighbours.py). Like the IVF
+    index, it carries the fingerprint of the matrix it was computed from.
+    """
+
+    def __init__(self, ids, distances, fingerprint=""):
+        self.ids = ids                  # (n, k) int32
+        self.distances = distances      # (n, k) float16
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def k(self):
+        return self.ids.shape[1]
+
+    @classmethod
+    def build(cls, matrix, k, block_size=2048):
+        """Exact k nearest neighbours of every row of ``matrix`` (blocked, see nearest_neighbours).
+
+        k is capped at the number of other movies; a store of one movie gets
+        empty lists (/similar then falls back to live search).
+        """
+        k = max(0, min(k, len(matrix) - 1))
+        if k == 0:
+            return cls.empty(len(matrix), fingerprint=matrix_fingerprint(matrix))
+        ids, dists = nearest_neighbours(matrix, k, block_size=block_size)
+        return cls(ids.astype(np.int32), dists.astype(np.float16), fingerprint=matrix_fingerprint(matrix))
+
+    @classmethod
+    def empty(cls, n, fingerprint=""):
+        """A table of ``n`` empty neighbour lists."""
+        return cls(np.empty((n, 0), dtype=np.int32), np.empty((n, 0), dtype=np.float16), fingerprint=fingerprint)
+
+    def extend(self, matrix, sq_norms, first_row, fingerprint="", block_size=2048):
+        """A copy covering the rows of ``matrix`` from ``first_row`` on, which were appended.
+
+        The new rows get their own lists, and the new movies are merged into
+        the lists of the old ones where they are closer, so the table stays exact.
+        """
+        n, k = len(matrix), self.k
+        if k == 0:
+            return NeighbourTable.empty(n, fingerprint=fingerprint)
+        new_ids, new_dists = nearest_neighbours(matrix, k, rows=range(first_row, n), sq_norms=sq_norms,
+                                                block_size=block_size)
+        near_ids, near_dists = nearest_neighbours(matrix, min(k, n - first_row), rows=range(first_row),
+                                                  columns=range(first_row, n), sq_norms=sq_norms,
+                                                  block_size=block_size)
+        # Stored float16 distances would turn near-ties into ties; merge on float32 ones
+        old_dists = pair_distances(matrix, np.arange(first_row), self.ids, sq_norms, block_size)
+        old_ids, old_dists = _merge_top_k(np.concatenate([self.ids.astype(np.int64), near_ids], axis=1),
+                                          np.concatenate([old_dists, near_dists], axis=1), k)
+        return NeighbourTable(
+            np.concatenate([old_ids, new_ids]).astype(np.int32),
+            np.concatenate([old_dists, new_dists]).astype(np.float16),
+            fingerprint=fingerprint,
+        )
+
+    def lookup(self, row, top_n):
+        """(ids, distances) of the ``top_n`` nearest movies of ``row``; None if not covered."""
+        if row >= len(self.ids) or top_n > self.k:
+            return None
+        return self.ids[row, :top_n], self.distances[row, :top_n]
+
+    def save(self, path):
+        np.savez(path, ids=self.ids, distances=self.distances, fingerprint=np.array(self.fingerprint))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["ids"], data["distances"], fingerprint=str(data["fingerprint"]))
+
+
+def matrix_fingerprint(matrix):
+    """Short content hash used to tell whether a persisted index is stale."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.asarray(matrix.shape, dtype=np.int64).tobytes())
+    h.update(np.ascontiguousarray(matrix).tobytes())
+    return h.hexdigest()
+
+
+def index_path_for(embedding_file: str):
+    """The IVF index is persisted next to the embeddings file."""
+    return os.path.splitext(embedding_file)[0] + ".ivf.npz"
+
+
+def neighbours_path_for(embedding_file: str):
+    """The precomputed neighbour table is also kept next to the embeddings file."""
+    return os.path.splitext(embedding_file)[0] + ".neighbours.npz"
+
+
+def uris_path_for(embedding_file: str):
+    """Row i of the .npy matrix belongs to line i of this URI table."""
+    return os.path.splitext(embedding_file)[0] + ".uris.txt"
+
+
+def read_embeddings_csv(csv_file: str):
+    """Parses the legacy CSV of complex strings into (uris, float32 matrix)."""
+    uris = []
+    vectors = []
+
+    #Open embeddings CSV file
+    with open(csv_file, newline='', encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)  #Skip header row
+
+        for row in reader:
+            uri = row[0]  #First column is movie URI
+
+            # Parse complex numbers (remove parens if any, just in case)
+            vec_data = []
+            for x in row[1:]:
+                x_clean = x.replace('(', '').replace(')', '')
+                vec_data.append(complex(x_clean))
+
+            #The rest are vectors
+            c_vec = np.array(vec_data, dtype=np.complex64)
+            uris.append(uri)
+            vectors.append(c_vec)
+
+    if not vectors:
+        return uris, np.empty((0, 0), dtype=np.float32)
+    return uris, flatten_complex(np.vstack(vectors))
+
+
+def flatten_complex(c_matrix):
+    """Turns (n, dim) complex embeddings into an (n, 2 * dim) float32 matrix.
+
+    specific strategy for RotatE/Complex embeddings:
+    We flatten each complex vector into a real vector of 2x dimensions
+    [Re(z1), ..., Re(zd), Im(z1), ..., Im(zd)]
+    This allows standard L2/cosine similarity to work on plain float arrays.
+    """
+    c_matrix = np.asarray(c_matrix)
+    return np.ascontiguousarray(np.concatenate([c_matrix.real, c_matrix.imag], axis=1), dtype=np.float32)
+
+
+def save_embedding_store(embedding_file: str, uris, matrix):
+    """Writes the .npy matrix and its URI table.
+
+    Both files are written to a temporary name first and then renamed, so a
+    process that has the old store memory-mapped keeps reading a consistent copy.
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if len(uris) != len(matrix):
+        raise ValueError(f"{len(uris)} URIs for {len(matrix)} embedding rows")
+
+    uris_file = uris_path_for(embedding_file)
+    with open(uris_file + ".tmp", "w", encoding="utf-8") as f:
+        for uri in uris:
+            f.write(uri + "\n")
+    with open(embedding_file + ".tmp", "wb") as f:
+        np.save(f, matrix)
+
+    os.replace(uris_file + ".tmp", uris_file)
+    os.replace(embedding_file + ".tmp", embedding_file)
+
+
+def load_embedding_store(embedding_file: str, mmap: bool = True):
+    """Loads (uris, matrix); the matrix is memory-mapped read-only by default."""
+    with open(uris_path_for(embedding_file), encoding="utf-8") as f:
+        uris = [line.rstrip("\n") for line in f if line.strip()]
+    matrix = np.load(embedding_file, mmap_mode="r" if mmap else None)
+    if matrix.dtype != np.float32 or matrix.ndim != 2:
+        raise ValueError(f"{embedding_file} must hold a 2-D float32 matrix, got {matrix.dtype} {matrix.shape}")
+    if len(uris) != len(matrix):
+        raise ValueError(f"{embedding_file} has {len(matrix)} rows but {len(uris)} URIs")
+    return uris, matrix
+
+
+def append_embedding_store(embedding_file: str, uris, matrix):
+    """Appends rows for new URIs to the store; existing rows keep their position."""
+    old_uris, old_matrix = load_embedding_store(embedding_file)
+    known = set(old_uris).intersection(uris)
+    if known:
+        raise ValueError(f"{len(known)} URIs are already in {embedding_file}, e.g. {next(iter(known))}")
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if len(old_uris) and matrix.shape[1:] != old_matrix.shape[1:]:
+        raise ValueError(f"rows of width {matrix.shape[1:]} cannot be appended to {old_matrix.shape}")
+    save_embedding_store(embedding_file, list(old_uris) + list(uris), np.concatenate([old_matrix, matrix]))
+    return len(old_uris)
+
+
+def convert_csv(csv_file: str, embedding_file: str = None):
+    """Converts a legacy movie_embeddings.csv into the binary store."""
+    if embedding_file is None:
+        embedding_file = os.path.splitext(csv_file)[0] + ".npy"
+    uris, matrix = read_embeddings_csv(csv_file)
+    save_embedding_store(embedding_file, uris, matrix)
+    return embedding_file
+
+
+class _Rows:
+    """One consistent view of the embeddings: queries read a single reference,
+    so rows appended by ``EmbeddingEngine.add_movies`` appear all at once."""
+
+    def __init__(self, uris, matrix, sq_norms, index, neighbours):
+        self.uris = uris
+        self.uri_to_index = {uri: i for i, uri in enumerate(uris)}
+        self.matrix = matrix
+        self.sq_norms = sq_norms
+        self.index = index
+        self.neighbours = neighbours
+
+
 class EmbeddingEngine:
-    def __init__(self, embedding_file: str):
-        self.embeddings = {}
-
-        #Open embeddings CSV file
-        with open(embedding_file, newline='', encoding="utf-8") as f:
-            reader = csv.reader(f)
-            next(reader)  #Skip header row
-
-            for row in reader:
-                uri = row[0]  #First column is movie URI
-                
-                # Parse complex numbers (remove parens if any, just in case)
-                vec_data = []
-                for x in row[1:]:
-                    x_clean = x.replace('(', '').replace(')', '')
-                    vec_data.append(complex(x_clean))
-
-                #The rest are vectors
-                # specific strategy for RotatE/Complex embeddings:
-                # We flatten the complex vector into a real vector of 2x dimensions
-                # [Re(z1), Im(z1), Re(z2), Im(z2)...]
-                # This allows standard cosine similarity to work effectively for clustering.
-                c_vec = np.array(vec_data, dtype=np.complex64)
-                real_vec = np.concatenate([c_vec.real, c_vec.imag])
-                
-                self.embeddings[uri] = real_vec.astype(np.float32)
-
-    def get_similar_movies(self, target_movie_uri: str, top_n: int = 10):
-        if target_movie_uri not in self.embeddings:
+    def __init__(self, embedding_file: str, use_index: bool = True, nlist: int = None, nprobe: int = 16,
+                 use_neighbours: bool = True):
+        # All vectors live in one contiguous (n_movies, 2 * dim) float32 matrix,
+        # memory-mapped so that several workers share one page-cached copy.
+        # Row i belongs to uris[i]; uri_to_index is the reverse lookup.
+        self.embedding_file = embedding_file
+        uris, matrix = load_embedding_store(embedding_file)
+
+        # Squared norms are reused by every query: ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b
+        sq_norms = np.asarray(np.einsum("ij,ij->i", matrix, matrix))
+
+        self.nprobe = nprobe
+        fingerprint = matrix_fingerprint(matrix)
+        index = None
+        if use_index and len(uris) > 1:
+            index = self._load_or_build_index(matrix, fingerprint, index_path_for(embedding_file), nlist)
+        neighbours = None
+        if use_neighbours:
+            neighbours = self._load_neighbours(fingerprint, neighbours_path_for(embedding_file))
+        self._rows = _Rows(uris, matrix, sq_norms, index, neighbours)
+        self._append_lock = threading.Lock()
+
+    @property
+    def uris(self):
+        return self._rows.uris
+
+    @property
+    def uri_to_index(self):
+        return self._rows.uri_to_index
+
+    @property
+    def matrix(self):
+        return self._rows.matrix
+
+    @property
+    def sq_norms(self):
+        return self._rows.sq_norms
+
+    @property
+    def index(self):
+        return self._rows.index
+
+    @property
+    def neighbours(self):
+        return self._rows.neighbours
+
+    def add_movies(self, uris, vectors, matrix=None):
+        """Makes new movies searchable without rebuilding the IVF index.
+
+        ``vectors`` are their flattened embeddings (see ``flatten_complex``),
+        filed under the nearest existing centroids. ``matrix`` may pass the
+        full matrix with the new rows already at its end (e.g. the reopened
+        store) so it is not copied. A precomputed neighbour table is extended
+        to match. Returns the number of movies added.
+        """
+        with self._append_lock:
+            rows = self._rows
+            vectors = np.asarray(vectors, dtype=np.float32)
+            if len(uris) != len(vectors):
+                raise ValueError(f"{len(uris)} URIs for {len(vectors)} embedding rows")
+            if vectors.ndim != 2 or vectors.shape[1] != rows.matrix.shape[1]:
+                raise ValueError(f"expected rows of width {rows.matrix.shape[1]}, got {vectors.shape}")
+            known = [uri for uri in uris if uri in rows.uri_to_index]
+            if known:
+                raise ValueError(f"{len(known)} movies already have embeddings, e.g. {known[0]}")
+            if not len(uris):
+                return 0
+
+            first_row = len(rows.uris)
+            if matrix is None:
+                matrix = np.concatenate([rows.matrix, vectors])
+            sq_norms = np.concatenate([rows.sq_norms, np.einsum("ij,ij->i", vectors, vectors)])
+            index, neighbours = rows.index, rows.neighbours
+            if index is not None or neighbours is not None:
+                fingerprint = matrix_fingerprint(matrix)
+            if index is not None:
+                index = index.add(vectors, first_row, fingerprint=fingerprint)
+            if neighbours is not None:
+                neighbours = neighbours.extend(matrix, sq_norms, first_row, fingerprint=fingerprint)
+            self._rows = _Rows(rows.uris + list(uris), matrix, sq_norms, index, neighbours)
+            return len(uris)
+
+    def refresh(self):
+        """Serves rows appended to the store file since it was loaded.
+
+        Only appends are picked up (see ``append_embedding_store``); a store
+        rewritten by a full retraining needs a new engine. The extended IVF
+        index and neighbour table are persisted, so a restart does not
+        rerun k-means or compute_neighbours.py either.
+        """
+        uris, matrix = load_embedding_store(self.embedding_file)
+        current = self._rows.uris
+        if uris[:len(current)] != current:
+            raise ValueError(f"{self.embedding_file} was rewritten, not appended to; reload the engine")
+        added = self.add_movies(uris[len(current):], matrix[len(current):], matrix=matrix)
+        rows = self._rows
+        for name, saved, path in (("IVF index", rows.index, index_path_for(self.embedding_file)),
+                                  ("neighbour table", rows.neighbours, neighbours_path_for(self.embedding_file))):
+            if added and saved is not None:
+                try:
+                    saved.save(path)
+                except OSError as e:
+                    logging.warning(f"Could not persist {name}: {e}")
+        return added
+
+    @staticmethod
+    def _load_or_build_index(matrix, fingerprint: str, index_path: str, nlist: int = None):
+        """Reuses the persisted IVF index if it was built from this exact matrix."""
+        if os.path.exists(index_path):
+            try:
+                index = IVFIndex.load(index_path)
+                if index.fingerprint == fingerprint and (nlist is None or index.nlist == nlist):
+                    logging.info(f"Loaded IVF index ({index.nlist} lists) from {index_path}")
+                    return index
+                logging.info("Persisted IVF index is stale, rebuilding...")
+            except Exception as e:
+                logging.warning(f"Could not read IVF index {index_path}: {e}")
+
+        index = IVFIndex.build(matrix, nlist=nlist)
+        try:
+            index.save(index_path)
+            logging.info(f"Built IVF index ({index.nlist} lists) and saved it to {index_path}")
+        except OSError as e:
+            logging.warning(f"Could not persist IVF index to {index_path}: {e}")
+        return index
+
+    @staticmethod
+    def _load_neighbours(fingerprint: str, path: str):
+        """The neighbour table of compute_neighbours.py, if it was computed from this exact matrix."""
+        if not os.path.exists(path):
+            return None
+        try:
+            table = NeighbourTable.load(path)
+        except Exception as e:
+            logging.warning(f"Could not read neighbour table {path}: {e}")
+            return None
+        if table.fingerprint != fingerprint:
+            logging.info(f"Neighbour table {path} is stale, using live search; rerun compute_neighbours.py")
+            return None
+        logging.info(f"Loaded neighbour table ({len(table)} movies, k={table.k}) from {path}")
+        return table
+
+    @staticmethod
+    def _distances(state, target_idx: int, rows=None):
+        """Squared L2 distances from one row to ``rows`` (default: every row), in one batched pass."""
+        matrix, sq_norms = state.matrix, state.sq_norms
+        target_vec = matrix[target_idx]
+        if rows is None:
+            dists = sq_norms - 2.0 * (matrix @ target_vec) + sq_norms[target_idx]
+        else:
+            dists = sq_norms[rows] - 2.0 * (matrix[rows] @ target_vec) + sq_norms[target_idx]
+        # Rounding can push tiny distances slightly below zero
+        np.maximum(dists, 0.0, out=dists)
+        return dists
+
+    def get_similar_movies(self, target_movie_uri: str, top_n: int = 10, nprobe: int = None,
+                           max_candidates: int = None, exact: bool = False):
+        """Nearest movies by L2 distance as a list of (uri, distance).
+
+        Default requests are answered from the precomputed neighbour table
+        when there is one. Otherwise, or when ``exact``, ``nprobe`` or
+        ``max_candidates`` ask for a particular search, distances are
+        computed live: with the IVF index unless ``exact`` is set or no
+        index was built.
+        """
+        state = self._rows
+        target_idx = state.uri_to_index.get(target_movie_uri)
+        if target_idx is None:
             return []
 
-        target_vec = self.embeddings[target_movie_uri]
-        sims = []
+        if state.neighbours is not None and not exact and nprobe is None and max_candidates is None:
+            found = state.neighbours.lookup(target_idx, top_n)
+            if found is not None:
+                ids, dists = found
+                return [(state.uris[i], float(d)) for i, d in zip(ids, dists)]
+
+        # RotatE is a distance-based model.
+        # Entities near each other in the vector space are similar.
+        # We use Euclidean Distance (L2 norm) to measure this.
+        if exact or state.index is None:
+            rows = np.arange(len(state.uris))
+            dists = self._distances(state, target_idx)
+        else:
+            rows = state.index.candidates(
+                state.matrix[target_idx],
+                nprobe if nprobe is not None else self.nprobe,
+                max_candidates,
+            )
+            dists = self._distances(state, target_idx, rows)
 
-        for movie_uri, vec in self.embeddings.items():
-            if movie_uri == target_movie_uri:
-                continue 
+        dists[rows == target_idx] = np.inf  # never return the movie itself
+        k = min(top_n, int(np.count_nonzero(rows != target_idx)))
 
-            # RotatE is a distance-based model. 
-            # Entities near each other in the vector space are similar.
-            # We use Euclidean Distance (L2 norm) to measure this.
-            dist = np.linalg.norm(target_vec - vec)
-            
-            sims.append((movie_uri, float(dist)))
+        # argpartition selects the k smallest in O(N); only those k get sorted.
+        top = _top_k(dists, k)
 
         # Sort by ASCENDING distance (smaller is more similar)
-        sims.sort(key=lambda x: x[1])
-        print(sims[:top_n])
-        return sims[:top_n]
\ No newline at end of file
+        return [(state.uris[rows[i]], float(np.sqrt(dists[i]))) for i in top]
+
+
+if __name__ == "__main__":
+    # python -m backend.embedding_engine data/movie_embeddings.csv [data/movie_embeddings.npy]
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python -m backend.embedding_engine <embeddings.csv> [<embeddings.npy>]")
+    out = convert_csv(*sys.argv[1:])
+    logging.info(f"Wrote {out} and {uris_path_for(out)}")
@@ -0,0 +1,37 @@
+from collections import defaultdict
+from rdflib import Graph, RDF, RDFS, URIRef
+from backend.vocab import BASE_URI, EX
+
+
+def genre_closure(graph):
+    """Maps each genre's local name to itself plus every genre below it in the hierarchy.
+
+    This is what ``?actualGenre rdfs:subClassOf* ex:<genre>`` matches at
+    query time, computed once; the values are sorted tuples of local names.
+    """
+    genres = set(graph.subjects(RDF.type, EX.Genre))
+    children = defaultdict(set)
+    for sub, sup in graph.subject_objects(RDFS.subClassOf):
+        if sub in genres:
+            children[sup].add(sub)
+
+    closure = {}
+    for genre in genres | set(children):
+        if not (isinstance(genre, URIRef) and genre.startswith(BASE_URI)):
+            continue
+        below = {genre}
+        stack = [genre]
+        while stack:
+            for child in children[stack.pop()]:
+                if child not in below:
+                    below.add(child)
+                    stack.append(child)
+        closure[genre[len(BASE_URI):]] = tuple(sorted(g[len(BASE_URI):] for g in below))
+    return closure
+
+
+def load_genre_closure(ontology_path):
+    """Parses the ontology file and returns its genre closure."""
+    graph = Graph()
+    graph.parse(ontology_path, format="turtle")
+    return genre_closure(graph)
@@ -1,10 +1,15 @@
 print("BACKEND STARTING...", flush=True)
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from backend.query_engine import QueryEngine
-from backend.embedding_engine import EmbeddingEngine
-from typing import Optional
+from backend.async_query_engine import AsyncQueryEngine
+from backend.memory_engine import MemoryEngine
+from backend.bulk_loader import BulkLoader
+from backend.embedding_engine import EmbeddingEngine, convert_csv
+from backend.reloader import Reloader
+from typing import List, Optional
 import requests
+import inspect
 import os
 import logging
 import time
@@ -25,22 +30,60 @@ app.add_middleware(
 # Initialize Query Engine
 RDF_PATH = os.path.join(os.path.dirname(__file__), "../data/wiki_db_cleaned.ttl")
 ONTOLOGY_PATH = os.path.join(os.path.dirname(__file__), "../ontology/ontology.ttl")
-EMBEDDING_PATH = os.path.join(os.path.dirname(__file__), "../data/movie_embeddings.csv")
+EMBEDDING_PATH = os.path.join(os.path.dirname(__file__), "../data/movie_embeddings.npy")
+# Legacy CSV export; only read once to produce EMBEDDING_PATH if that is missing.
+EMBEDDING_CSV_PATH = os.path.join(os.path.dirname(__file__), "../data/movie_embeddings.csv")
 
 BLAZEGRAPH_URL = os.getenv("BLAZEGRAPH_URL", "http://blazegraph:8080/bigdata/namespace/kb/sparql")
-engine = QueryEngine(BLAZEGRAPH_URL)
+# "blazegraph" (default) or "memory": answer from an in-process index of the
+# TTL files instead, without Blazegraph
+QUERY_BACKEND = os.getenv("QUERY_BACKEND", "blazegraph")
+# Columnar snapshot of the in-memory index, rebuilt when the TTL files change;
+# set CATALOG_SNAPSHOT="" to always parse the TTL files
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", os.path.join(os.path.dirname(__file__), "../data/catalog_snapshot"))
+if QUERY_BACKEND == "memory":
+    engine = MemoryEngine([RDF_PATH, ONTOLOGY_PATH], snapshot_dir=CATALOG_SNAPSHOT or None)
+else:
+    # Endpoints are async; the pool bounds concurrent Blazegraph requests
+    engine = AsyncQueryEngine(
+        BLAZEGRAPH_URL,
+        single_query=os.getenv("SEARCH_SINGLE_QUERY", "1") != "0",
+        pool_size=int(os.getenv("BLAZEGRAPH_POOL_SIZE", "40")),
+        timeout=float(os.getenv("BLAZEGRAPH_TIMEOUT", "30")),
+        options_ttl=float(os.getenv("OPTIONS_CACHE_TTL", "300")),
+        search_cache_size=int(os.getenv("SEARCH_CACHE_SIZE", "1024")),
+        search_cache_ttl=float(os.getenv("SEARCH_CACHE_TTL", "600")),
+    )
+
+
+async def _result(value):
+    """Engine calls return coroutines (AsyncQueryEngine) or plain values (MemoryEngine)."""
+    return await value if inspect.isawaitable(value) else value
+
+def load_embedding_engine():
+    """EmbeddingEngine of EMBEDDING_PATH, converting the legacy CSV first if only that exists."""
+    if not os.path.exists(EMBEDDING_PATH) and os.path.exists(EMBEDDING_CSV_PATH):
+        logging.info(f"Converting {EMBEDDING_CSV_PATH} to the binary embedding store...")
+        convert_csv(EMBEDDING_CSV_PATH, EMBEDDING_PATH)
+    if not os.path.exists(EMBEDDING_PATH):
+        raise FileNotFoundError(f"Embedding file not found at {EMBEDDING_PATH}")
+    return EmbeddingEngine(EMBEDDING_PATH)
 
 # Initialize Embedding Engine (Lazy or try-except to avoid crash if not trained)
 embedding_engine = None
-if os.path.exists(EMBEDDING_PATH):
-    try:
-        logging.info(f"Loading embeddings from {EMBEDDING_PATH}...")
-        embedding_engine = EmbeddingEngine(EMBEDDING_PATH)
-        logging.info("Embeddings loaded!")
-    except Exception as e:
-        logging.error(f"Failed to load embeddings: {e}")
-else:
+try:
+    logging.info(f"Loading embeddings from {EMBEDDING_PATH}...")
+    embedding_engine = load_embedding_engine()
+    logging.info("Embeddings loaded!")
+except FileNotFoundError:
     logging.warning(f"Embedding file not found at {EMBEDDING_PATH}. Similarity search will be disabled.")
+except Exception as e:
+    logging.error(f"Failed to load embeddings: {e}")
+
+def _swap_embedding_engine(new_engine):
+    # Requests read the global once per call, so each sees one engine or the other
+    global embedding_engine
+    embedding_engine = new_engine
 
 
 # Startup logic to wait for Blazegraph and load data
@@ -71,7 +114,7 @@ def wait_for_blazegraph():
 
 running_in_docker = os.getenv("BACKEND_URL") or os.path.exists("/.dockerenv")
 
-if running_in_docker:
+if running_in_docker and QUERY_BACKEND != "memory":
     logging.info("Checking Blazegraph status...")
     # 1. Wait for service to be up
     connected = False
@@ -85,14 +128,19 @@ if running_in_docker:
             logging.info("Waiting for Blazegraph container...")
     
     if connected:
-        # 2. Check if data exists
-        if not engine.has_movies():
-            logging.info("Blazegraph is empty. Loading data...")
-            try:
-                engine.upload_ttl(RDF_PATH)
-                logging.info("Data loaded successfully!")
-            except Exception as e:
-                logging.error(f"Failed to load data: {e}")
+        # 2. Load the data into an empty store, or finish an interrupted load
+        try:
+            report = BulkLoader(
+                engine,
+                chunk_bytes=int(float(os.getenv("BULK_LOAD_CHUNK_MB", "4")) * 1024 * 1024),
+                concurrency=int(os.getenv("BULK_LOAD_CONCURRENCY", "4")),
+            ).ensure_loaded(RDF_PATH)
+            if report is None:
+                logging.info("Blazegraph already has data.")
+            else:
+                logging.info(f"Data loaded successfully! {report}")
+        except Exception as e:
+            logging.error(f"Failed to load data: {e}")
         
         # 3. Always try to load Ontology (it's small and idempotent usually, or we check if Exists)
         # For simplicity, we just upload it. If it fails (duplicates), it might be fine depending on Blazegraph config,
@@ -103,47 +151,94 @@ if running_in_docker:
              logging.info("Ontology uploaded!")
         except Exception as e:
              logging.error(f"Failed to load ontology: {e}")
-        
-        else:
-            logging.info("Blazegraph already has data.")
+
+# Title searches and actor/director type-ahead are answered in-process once
+# the data is loaded; genre filters use the ontology's precomputed hierarchy
+engine.load_title_index()
+engine.load_suggest_indexes()
+engine.load_genre_closure(ONTOLOGY_PATH)
+
+# POST /admin/reload rebuilds these in the background; the old versions are
+# served until the new ones are swapped in
+reloader = Reloader({
+    "embeddings": (load_embedding_engine, _swap_embedding_engine),
+    "catalog": (engine.build_indexes, engine.swap_indexes),
+})
+
+@app.on_event("shutdown")
+async def close_engine():
+    await _result(engine.aclose())
 
 @app.get("/")
 def read_root():
     return {"message": "Movie Explorer API is running"}
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
 @app.get("/options")
-def get_filter_options():
-    return engine.get_options()
+async def get_filter_options(request: Request):
+    entry = await _result(engine.get_options_entry())
+    # no-cache: browsers may keep the payload but must revalidate it with the ETag
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(entry.value, headers=headers)
+
+@app.get("/suggest")
+async def suggest(
+    field: str = Query(..., pattern="^(actor|director)$"),
+    prefix: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Actors or directors whose name (first or last) starts with prefix, most films first."""
+    return engine.suggest(field, prefix, limit)
 
 @app.get("/search")
-def search_movies(
+async def search_movies(
     title: Optional[str] = None,
     genre: Optional[str] = None,
-    actor: Optional[str] = None,
-    director: Optional[str] = None,
+    actor: Optional[List[str]] = Query(None, description="repeat to match movies with any of several actors"),
+    director: Optional[List[str]] = Query(None, description="repeat to match movies by any of several directors"),
     year_start: Optional[int] = None,
     year_end: Optional[int] = None,
-    limit: int = 50
+    limit: int = Query(50, ge=1),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
 ):
     print(f"DEBUG: Received search request - Title: {title}, Genre: {genre}", flush=True)
-    return engine.search_movies(
-        title=title,
-        genre=genre,
-        actor=actor,
-        director=director,
-        year_start=year_start,
-        year_end=year_end,
-        limit=limit
-    )
+    try:
+        return await _result(engine.search_movies(
+            title=title,
+            genre=genre,
+            actor=actor,
+            director=director,
+            year_start=year_start,
+            year_end=year_end,
+            limit=limit,
+            cursor=cursor
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/similar")
-def get_similar_movies(uri: str):
-    if not embedding_engine:
+async def get_similar_movies(
+    uri: str,
+    nprobe: Optional[int] = Query(None, ge=1, description="IVF lists to scan (higher = better recall, slower)"),
+    candidates: Optional[int] = Query(None, ge=1, description="Cap on vectors compared exactly"),
+    exact: bool = False
+):
+    embeddings = embedding_engine  # a reload may swap the global mid-request
+    if not embeddings:
         return []
     
     # 1. Get similar URIs
     # returns list of (uri, score)
-    similar_pairs = embedding_engine.get_similar_movies(uri, top_n=5)
+    similar_pairs = embeddings.get_similar_movies(
+        uri, top_n=5, nprobe=nprobe, max_candidates=candidates, exact=exact
+    )
     
     if not similar_pairs:
         return []
@@ -151,6 +246,44 @@ def get_similar_movies(uri: str):
     top_uris = [p[0] for p in similar_pairs]
     
     # 2. Fetch details for these URIs
-    movies = engine.get_movies_by_uris(top_uris)
+    movies = await _result(engine.get_movies_by_uris(top_uris))
     
     return movies
+
+@app.get("/admin/cache")
+def get_cache_stats():
+    return engine.cache_stats()
+
+@app.delete("/admin/cache")
+def clear_caches():
+    engine.invalidate_caches()
+    return engine.cache_stats()
+
+@app.post("/admin/embeddings/refresh")
+def refresh_embeddings():
+    """Serves movies appended to the embedding store (train_embeddings.py --incremental)."""
+    embeddings = embedding_engine
+    if not embeddings:
+        raise HTTPException(status_code=409, detail="No embeddings loaded")
+    try:
+        added = embeddings.refresh()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"added": added, "movies": len(embeddings.uris)}
+
+@app.post("/admin/reload", status_code=202)
+def reload_data(
+    target: Optional[List[str]] = Query(None, description="embeddings and/or catalog (default: both)")
+):
+    """Rebuilds the embeddings and/or the catalog indexes in the background; poll GET /admin/reload."""
+    try:
+        started = reloader.start(target)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not started:
+        raise HTTPException(status_code=409, detail="A reload is already running")
+    return reloader.status()
+
+@app.get("/admin/reload")
+def get_reload_status():
+    return reloader.status()
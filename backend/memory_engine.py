@@ -0,0 +1,451 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from functools import cached_property
+from itertools import chain
+import numpy as np
+from rdflib import Graph, RDF, URIRef
+from backend.cache import CacheEntry
+from backend.genre_closure import genre_closure, load_genre_closure
+from backend.prefix_index import PrefixIndex
+from backend.query_engine import ATTRIBUTES, QueryEngine, decode_cursor
+from backend.title_index import TitleIndex
+from backend.vocab import BASE_URI, EX, to_uri
+
+# Year of movies without one; they sort after every dated movie
+NO_YEAR = np.iinfo(np.int32).min
+
+# Bumped whenever the snapshot layout changes; older snapshots are rebuilt
+SNAPSHOT_FORMAT = 2
+
+
+def _sort_key(year, uri):
+    """Position of a movie in search order: year descending, then URI."""
+    return (1, 0, uri) if year is None or year == NO_YEAR else (0, -year, uri)
+
+
+def _csr(lists):
+    """(indptr, indices) arrays for a list of integer lists."""
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(items) for items in lists])
+    indices = np.fromiter((i for items in lists for i in items), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def _save_strings(directory, name, strings):
+    """Writes strings as one UTF-8 blob plus an int64 offsets array."""
+    encoded = [text.encode() for text in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(item) for item in encoded])
+    with open(os.path.join(directory, f"{name}.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+
+
+def _load_strings(directory, name):
+    with open(os.path.join(directory, f"{name}.bin"), "rb") as f:
+        blob = f.read()
+    offsets = np.load(os.path.join(directory, f"{name}.offsets.npy")).tolist()
+    return [blob[a:b].decode() for a, b in zip(offsets, offsets[1:])]
+
+
+def source_fingerprint(paths):
+    """(path, size, mtime) of each source file, to tell whether a snapshot is stale."""
+    return [[os.path.abspath(path), os.path.getsize(path), os.stat(path).st_mtime_ns] for path in paths]
+
+
+def snapshot_is_fresh(directory, paths):
+    """Whether ``directory`` holds a snapshot of exactly ``paths`` in their current state."""
+    try:
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+        return manifest["format"] == SNAPSHOT_FORMAT and manifest["sources"] == source_fingerprint(paths)
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+class MemoryIndex:
+    """Integer-encoded adjacency index of the movie graph.
+
+    Movies get ids in search order (year descending, then URI), so a year
+    range is a contiguous id range and "after the cursor" is a single bisect.
+    For each of genre/director/actor there is a sorted value table and two
+    CSR adjacency arrays: movie -> value ids and value -> movie ids.
+    """
+
+    def __init__(self, movie_uris, titles, other_titles, years, runtimes, values, movie_values, value_movies,
+                 genre_types, closure):
+        self.movie_uris = movie_uris          # list[str], in search order
+        self.titles = titles                  # list[str], the smallest title of each movie
+        self.other_titles = other_titles      # list of (movie id, title) for the remaining titles
+        self.years = years                    # int32 array, NO_YEAR if missing
+        self.runtimes = runtimes              # list[str or None]
+        self.values = values                  # attr -> list of value URIs (sorted)
+        self.movie_values = movie_values      # attr -> (indptr, value ids) per movie
+        self.value_movies = value_movies      # attr -> (indptr, movie ids) per value
+        self.genre_types = genre_types        # local names of every ex:Genre
+        self.closure = closure                # genre -> itself and its subgenres
+
+        # Ascending negated years (missing years last) for bisecting year ranges
+        self.neg_years = np.where(years == NO_YEAR, np.iinfo(np.int64).max, -years.astype(np.int64))
+        self.dated = int(np.count_nonzero(years != NO_YEAR))
+
+    # Lookup tables derived from the arrays are built on first use, so an
+    # index loaded from a snapshot is usable right away
+
+    @cached_property
+    def movie_ids(self):
+        return {uri: i for i, uri in enumerate(self.movie_uris)}
+
+    @cached_property
+    def value_ids(self):
+        return {attr: {uri: i for i, uri in enumerate(uris)} for attr, uris in self.values.items()}
+
+    @cached_property
+    def local_values(self):
+        return {attr: [uri.split("/")[-1] for uri in uris] for attr, uris in self.values.items()}
+
+    @cached_property
+    def sort_keys(self):
+        return [_sort_key(int(y), uri) for y, uri in zip(self.years, self.movie_uris)]
+
+    @cached_property
+    def title_index(self):
+        # Every title is searchable, as in the SPARQL backend
+        others = ((self.movie_uris[i], title) for i, title in self.other_titles)
+        return TitleIndex(chain(zip(self.movie_uris, self.titles), others))
+
+    @cached_property
+    def suggest_indexes(self):
+        return {
+            field: PrefixIndex(zip(self.local_values[field], np.diff(self.value_movies[field][0]).tolist()))
+            for field in ("actor", "director")
+        }
+
+    @classmethod
+    def from_graph(cls, graph):
+        titles, years, runtimes = defaultdict(list), {}, {}
+        links = {attr: defaultdict(set) for attr, _ in ATTRIBUTES}
+        predicates = {EX[attr]: attr for attr, _ in ATTRIBUTES}
+        for s, p, o in graph:
+            if p == EX.title:
+                titles[str(s)].append(str(o))
+            elif p == EX.year:
+                # A movie with several years is listed under the latest
+                years[str(s)] = max(years.get(str(s), NO_YEAR), int(str(o)))
+            elif p == EX.runtime:
+                # Several runtimes (or titles): the smallest is shown, as with MIN() in SPARQL
+                runtime = runtimes.get(str(s))
+                if runtime is None or float(o) < float(runtime):
+                    runtimes[str(s)] = str(o)
+            elif p in predicates and isinstance(o, URIRef):
+                links[predicates[p]][str(s)].add(str(o))
+
+        # Only movies with a title are searchable, as in the SPARQL backend
+        movie_uris = sorted(titles, key=lambda uri: _sort_key(years.get(uri), uri))
+        movie_ids = {uri: i for i, uri in enumerate(movie_uris)}
+
+        values, movie_values, value_movies = {}, {}, {}
+        for attr, by_movie in links.items():
+            uris = sorted({v for movie, vals in by_movie.items() if movie in movie_ids for v in vals})
+            ids = {uri: i for i, uri in enumerate(uris)}
+            per_movie = [sorted(ids[v] for v in by_movie.get(uri, ())) for uri in movie_uris]
+            per_value = [[] for _ in uris]
+            for movie, vals in enumerate(per_movie):
+                for v in vals:
+                    per_value[v].append(movie)
+            values[attr] = uris
+            movie_values[attr] = _csr(per_movie)
+            value_movies[attr] = _csr(per_value)
+
+        genre_types = sorted({str(g).split("/")[-1] for g in graph.subjects(RDF.type, EX.Genre)})
+        movie_titles = [sorted(set(titles[uri])) for uri in movie_uris]
+        return cls(
+            movie_uris,
+            [names[0] for names in movie_titles],
+            [(i, title) for i, names in enumerate(movie_titles) for title in names[1:]],
+            np.array([years.get(uri, NO_YEAR) for uri in movie_uris], dtype=np.int32),
+            [runtimes.get(uri) for uri in movie_uris],
+            values, movie_values, value_movies,
+            genre_types, genre_closure(graph),
+        )
+
+    def save(self, directory, sources=()):
+        """Writes the index as a columnar snapshot that ``load`` memory-maps.
+
+        Layout: ``manifest.json`` (counts, genre types, closure and the
+        fingerprint of ``sources``), string tables as UTF-8 blobs with offsets,
+        the year (int32) and runtime (float64, NaN if missing) columns, the
+        movie ids (int32) of the extra titles of movies with several, and the
+        two CSR arrays per attribute, all as ``.npy``. The snapshot is written
+        to a temporary directory and renamed into place, so a reader never
+        sees a partial one.
+        """
+        tmp = f"{directory}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        _save_strings(tmp, "movie_uris", self.movie_uris)
+        _save_strings(tmp, "titles", self.titles)
+        _save_strings(tmp, "other_titles", [title for _, title in self.other_titles])
+        np.save(os.path.join(tmp, "other_title_movies.npy"),
+                np.array([i for i, _ in self.other_titles], dtype=np.int32))
+        np.save(os.path.join(tmp, "years.npy"), np.asarray(self.years, dtype=np.int32))
+        runtimes = [float(r) if r is not None else np.nan for r in self.runtimes]
+        np.save(os.path.join(tmp, "runtimes.npy"), np.array(runtimes, dtype=np.float64))
+        for attr, _ in ATTRIBUTES:
+            _save_strings(tmp, f"{attr}_values", self.values[attr])
+            for name, (indptr, indices) in (("movie", self.movie_values[attr]), ("value", self.value_movies[attr])):
+                np.save(os.path.join(tmp, f"{attr}_by_{name}.indptr.npy"), indptr)
+                np.save(os.path.join(tmp, f"{attr}_by_{name}.indices.npy"), indices)
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "sources": source_fingerprint(sources),
+            "movies": len(self.movie_uris),
+            "values": {attr: len(uris) for attr, uris in self.values.items()},
+            "genre_types": self.genre_types,
+            "closure": self.closure,
+        }
+        with open(os.path.join(tmp, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+
+        old = f"{directory}.old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(directory):
+            os.rename(directory, old)
+        os.rename(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Reads a snapshot written by ``save``; numeric arrays are memory-mapped."""
+        mode = "r" if mmap else None
+
+        def array(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest["format"] != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format {manifest['format']} in {directory}")
+
+        values, movie_values, value_movies = {}, {}, {}
+        for attr, _ in ATTRIBUTES:
+            values[attr] = _load_strings(directory, f"{attr}_values")
+            movie_values[attr] = (array(f"{attr}_by_movie.indptr"), array(f"{attr}_by_movie.indices"))
+            value_movies[attr] = (array(f"{attr}_by_value.indptr"), array(f"{attr}_by_value.indices"))
+        runtimes = [None if np.isnan(r) else repr(r) for r in array("runtimes").tolist()]
+        return cls(
+            _load_strings(directory, "movie_uris"),
+            _load_strings(directory, "titles"),
+            list(zip(array("other_title_movies").tolist(), _load_strings(directory, "other_titles"))),
+            array("years"),
+            runtimes,
+            values, movie_values, value_movies,
+            manifest["genre_types"],
+            {genre: tuple(below) for genre, below in manifest["closure"].items()},
+        )
+
+    def _postings(self, attr, value_id):
+        indptr, indices = self.value_movies[attr]
+        return indices[indptr[value_id]:indptr[value_id + 1]]
+
+    def _movies_with_any(self, attr, uris):
+        """Sorted movie ids linked to any of ``uris`` through ``attr``."""
+        ids = self.value_ids[attr]
+        lists = [self._postings(attr, ids[uri]) for uri in uris if uri in ids]
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        return lists[0] if len(lists) == 1 else np.unique(np.concatenate(lists))
+
+    def movie(self, i):
+        """The movie dict of id ``i``, shaped like the SPARQL backend's."""
+        year = int(self.years[i])
+        movie = {
+            "id": self.movie_uris[i],
+            "title": self.titles[i],
+            "year": f"{year:04d}" if year != NO_YEAR else None,
+            "runtime": self.runtimes[i],
+        }
+        for attr, target_list in ATTRIBUTES:
+            indptr, indices = self.movie_values[attr]
+            names = self.local_values[attr]
+            movie[target_list] = [names[v] for v in indices[indptr[i]:indptr[i + 1]]]
+        return movie
+
+    def search(self, title, genre, actor, director, year_start, year_end, limit, cursor):
+        """Ids of up to ``limit`` movies in search order, for normalized filters."""
+        candidates = []
+        if title:
+            uris = self.title_index.search(title)
+            candidates.append(np.array(sorted(self.movie_ids[uri] for uri in uris), dtype=np.int32))
+        if genre:
+            genre = to_uri(genre)[len(BASE_URI):]
+            genres = self.closure.get(genre, (genre,)) if genre else ()
+            candidates.append(self._movies_with_any("genre", [BASE_URI + g for g in genres]))
+        for attr, names in (("actor", actor), ("director", director)):
+            if names is not None:
+                candidates.append(self._movies_with_any(attr, [BASE_URI + n for n in names]))
+
+        # Year filters and the cursor bound a contiguous id range
+        lo, hi = 0, len(self.movie_uris)
+        if year_start or year_end:
+            hi = self.dated
+            if year_end:
+                lo = int(np.searchsorted(self.neg_years, -year_end, "left"))
+            if year_start:
+                hi = int(np.searchsorted(self.neg_years, -year_start, "right"))
+        if cursor:
+            year, uri = decode_cursor(cursor)
+            lo = max(lo, bisect_right(self.sort_keys, _sort_key(year, uri)))
+
+        if not candidates:
+            return np.arange(lo, max(lo, min(hi, lo + limit)))
+        candidates.sort(key=len)
+        ids = candidates[0]
+        for other in candidates[1:]:
+            ids = np.intersect1d(ids, other, assume_unique=True)
+        start, stop = np.searchsorted(ids, [lo, hi])
+        return ids[start:min(stop, start + limit)]
+
+
+class MemoryEngine:
+    """QueryEngine backend answering from an in-process MemoryIndex, without HTTP.
+
+    Built from the Turtle files (data and ontology) at construction; exposes
+    the same methods as QueryEngine, so the API can use either. Loading more
+    data rebuilds the index and swaps it in atomically.
+
+    With ``snapshot_dir``, the index is memory-mapped from a columnar snapshot
+    of the same files when one is up to date, and written there after every
+    build from Turtle otherwise.
+    """
+
+    def __init__(self, rdf_paths, snapshot_dir=None):
+        self.rdf_paths = list(rdf_paths)
+        self.snapshot_dir = snapshot_dir
+        self.index = None
+        self.options_entry = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """(Re)builds the index from ``rdf_paths``, or loads it from an up-to-date snapshot."""
+        self.swap_indexes(self.build_indexes())
+
+    def build_indexes(self):
+        """A new MemoryIndex of ``rdf_paths``; queries keep using the current one meanwhile."""
+        start = time.perf_counter()
+        if self.snapshot_dir and snapshot_is_fresh(self.snapshot_dir, self.rdf_paths):
+            index = MemoryIndex.load(self.snapshot_dir)
+            logging.info(f"In-memory graph loaded from snapshot {self.snapshot_dir}: {len(index.movie_uris)} movies "
+                         f"({(time.perf_counter() - start) * 1000:.0f}ms)")
+            return index
+        return self._build()
+
+    def swap_indexes(self, index):
+        """Makes ``index`` (from build_indexes) the one queries read."""
+        with self._lock:
+            self.index = index
+            self.options_entry = CacheEntry({"genres": index.genre_types}, ttl=float("inf"))
+
+    def _build(self):
+        start = time.perf_counter()
+        graph = Graph()
+        for path in self.rdf_paths:
+            graph.parse(path, format="turtle")
+        parsed = time.perf_counter()
+        index = MemoryIndex.from_graph(graph)
+        logging.info(f"In-memory graph loaded: {len(graph)} triples, {len(index.movie_uris)} movies "
+                     f"(parse {parsed - start:.1f}s, index {time.perf_counter() - parsed:.1f}s)")
+        if self.snapshot_dir:
+            try:
+                index.save(self.snapshot_dir, self.rdf_paths)
+                logging.info(f"Wrote catalog snapshot to {self.snapshot_dir}")
+            except OSError as e:
+                logging.warning(f"Could not write catalog snapshot to {self.snapshot_dir}: {e}")
+        return index
+
+    # --- QueryEngine interface ---
+
+    def invalidate_caches(self):
+        """Nothing is cached; results are computed from the current index."""
+
+    def cache_stats(self):
+        return {"backend": "memory", "movies": len(self.index.movie_uris)}
+
+    def close(self):
+        pass
+
+    def aclose(self):
+        pass
+
+    def is_connected(self):
+        return self.index is not None
+
+    def has_movies(self):
+        return bool(self.index.movie_uris)
+
+    def upload_ttl(self, file_path):
+        """Adds a Turtle file to the graph and rebuilds the index."""
+        self.rdf_paths.append(file_path)
+        self.reload()
+
+    def load_title_index(self):
+        return self.index.title_index
+
+    def load_suggest_indexes(self):
+        return self.index.suggest_indexes
+
+    def load_genre_closure(self, ontology_path):
+        """The closure comes from the loaded graph; merges in an ontology file not loaded yet."""
+        if ontology_path not in self.rdf_paths:
+            self.index.closure.update(load_genre_closure(ontology_path))
+        return self.index.closure
+
+    def get_options(self):
+        return self.options_entry.value
+
+    def get_options_entry(self):
+        return self.options_entry
+
+    def suggest(self, field, prefix, limit=10):
+        """Same contract as QueryEngine.suggest."""
+        index = self.index.suggest_indexes.get(field)
+        if index is None:
+            raise ValueError(f"Unknown suggest field: {field!r}")
+        return [{"value": name, "count": count} for name, count in index.search(prefix, limit)]
+
+    def search_movies(self, title=None, genre=None, year_start=None, year_end=None, actor=None, director=None, limit=50,
+                      cursor=None):
+        """Same filters, order, paging and result shape as QueryEngine.search_movies."""
+        title, genre, actor, director, year_start, year_end, limit, cursor = QueryEngine._search_cache_key(
+            title, genre, year_start, year_end, actor, director, limit, cursor)
+        index = self.index
+        # One extra movie tells whether there is a next page
+        ids = index.search(title, genre, actor, director, year_start, year_end, limit + 1, cursor)
+        return QueryEngine._page([index.movie(int(i)) for i in ids], limit)
+
+    def get_movies_by_uris(self, movie_uris):
+        """Details for the known URIs, in input order."""
+        index = self.index
+        return [index.movie(index.movie_ids[uri]) for uri in movie_uris if uri in index.movie_ids]
+
+
+if __name__ == "__main__":
+    # python -m backend.memory_engine data/wiki_db_cleaned.ttl ontology/ontology.ttl --out data/catalog_snapshot
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Builds the columnar catalog snapshot used by QUERY_BACKEND=memory")
+    parser.add_argument("paths", nargs="+", help="Turtle files, in the order the API loads them")
+    parser.add_argument("--out", default="data/catalog_snapshot")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    MemoryEngine(args.paths, snapshot_dir=args.out)
@@ -0,0 +1,62 @@
+import heapq
+from bisect import bisect_left
+
+# Results for prefixes this short match large ranges; they are memoized
+MEMO_PREFIX_LEN = 2
+
+
+def normalize(text):
+    """Lowercased, with the underscores of URI local names read as spaces."""
+    return " ".join(text.replace("_", " ").lower().split())
+
+
+class PrefixIndex:
+    """Sorted-array prefix index over names, ranked by a per-name weight.
+
+    Every word start of a name is a key ("tom hanks" and "hanks" for
+    Tom_Hanks), so a prefix finds names by first or last name. Lookups bisect
+    into the sorted keys and keep the ``limit`` heaviest names of the
+    matching range.
+    """
+
+    def __init__(self, entries):
+        """``entries`` is an iterable of (name, weight) pairs, e.g. film counts."""
+        self.names = []
+        self.weights = []
+        keys = []
+        for name, weight in entries:
+            idx = len(self.names)
+            self.names.append(name)
+            self.weights.append(weight)
+            words = normalize(name).split(" ")
+            for i in range(len(words)):
+                keys.append((" ".join(words[i:]), idx))
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.ids = [idx for _, idx in keys]
+        self._memo = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, prefix, limit=10):
+        """Up to ``limit`` (name, weight) pairs with a word starting with ``prefix``, heaviest first."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= MEMO_PREFIX_LEN:
+            memo_key = (prefix, limit)
+            if memo_key not in self._memo:
+                self._memo[memo_key] = self._search(prefix, limit)
+            return self._memo[memo_key]
+        return self._search(prefix, limit)
+
+    def _search(self, prefix, limit):
+        matches = set()
+        for pos in range(bisect_left(self.keys, prefix), len(self.keys)):
+            if not self.keys[pos].startswith(prefix):
+                break
+            matches.add(self.ids[pos])
+        # Ties are broken alphabetically so results are stable
+        best = heapq.nsmallest(limit, matches, key=lambda idx: (-self.weights[idx], self.names[idx]))
+        return [(self.names[idx], self.weights[idx]) for idx in best]
@@ -1,25 +1,303 @@
+import base64
+import json
 import logging
-import sys
+import re
+import threading
 import time
-from SPARQLWrapper import SPARQLWrapper, JSON, POST, DIGEST
 import requests
+from requests.adapters import HTTPAdapter
+from backend.cache import CacheEntry, LRUCache, StaleWhileRevalidateCache
+from backend.genre_closure import load_genre_closure
+from backend.prefix_index import PrefixIndex
+from backend.title_index import TitleIndex
+from backend.vocab import BASE_URI, to_uri
+
+SEARCH_PREFIXES = """
+        PREFIX ex: <http://example.org/movie/>
+        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+"""
+
+# Joins every genre/director/actor of ?movie as (?attr, ?val) rows, where
+# ?attr is the key of the list the value belongs to in the movie dict.
+ATTRIBUTE_UNION = """
+            OPTIONAL {
+                { ?movie ex:genre ?val . BIND("genres" AS ?attr) }
+                UNION
+                { ?movie ex:director ?val . BIND("directors" AS ?attr) }
+                UNION
+                { ?movie ex:actor ?val . BIND("actors" AS ?attr) }
+            }
+"""
+
+# (attribute predicate, key of the list in the movie dict)
+ATTRIBUTES = (("genre", "genres"), ("director", "directors"), ("actor", "actors"))
+
+# /options lists: key -> (query, variable holding the URI). Actors and
+# directors are too many to ship to the browser; they come from /suggest.
+OPTION_QUERIES = {
+    "genres": ("""
+        PREFIX ex: <http://example.org/movie/>
+        SELECT DISTINCT ?g WHERE {
+            ?g a ex:Genre .
+        } ORDER BY ?g
+        """, "g"),
+}
+
+# /suggest fields: field -> query for every value and its number of films
+SUGGEST_QUERIES = {
+    field: f"""
+        PREFIX ex: <http://example.org/movie/>
+        SELECT ?val (COUNT(DISTINCT ?m) AS ?count) WHERE {{
+            ?m ex:{field} ?val .
+        }} GROUP BY ?val
+        """
+    for field in ("actor", "director")
+}
+
+# Every (movie, title) pair, for the in-process title index
+TITLES_QUERY = """
+        PREFIX ex: <http://example.org/movie/>
+        SELECT ?movie ?title WHERE {
+            ?movie ex:title ?title .
+        }
+        """
+
+# Title searches matching more movies than this fall back to the substring filter
+# rather than shipping a huge VALUES block to Blazegraph
+MAX_TITLE_VALUES = 2000
+
+# Search results are ordered by (year desc, movie URI); pages continue after
+# the last (year, URI) seen, so every page costs the same as the first.
+SEARCH_ORDER = "DESC(?year) STR(?movie)"
+
+# Triples per DELETE DATA / INSERT DATA request in apply_delta
+UPDATE_BATCH_SIZE = 5000
+
+
+def encode_cursor(movie):
+    """Opaque /search cursor pointing just after ``movie``."""
+    year = int(movie["year"]) if movie.get("year") else None
+    raw = json.dumps([year, movie["id"]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns (year or None, movie URI); raises ValueError if the cursor is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        year, uri = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if (year is not None and type(year) is not int) or not isinstance(uri, str) or not uri:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return year, uri
+
 
 class QueryEngine:
-    def __init__(self, blazegraph_url: str = "http://blazegraph:9999/bigdata/namespace/kb/sparql"):
+    def __init__(self, blazegraph_url: str = "http://blazegraph:9999/bigdata/namespace/kb/sparql",
+                 single_query: bool = True, pool_size: int = 10,
+                 timeout: float = 30.0, connect_timeout: float = 5.0, upload_timeout: float = 600.0,
+                 options_ttl: float = 300.0, search_cache_size: int = 1024, search_cache_ttl: float = 600.0):
         self.endpoint = blazegraph_url
+        # Fetch basics and genre/director/actor lists in one query instead of four
+        self.single_query = single_query
+
+        # One keep-alive connection pool shared by every request to Blazegraph.
+        # pool_size bounds the number of idle connections kept per host; it
+        # should be at least the number of threads issuing queries concurrently.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # (connect, read) timeouts in seconds
+        self.timeout = (connect_timeout, timeout)
+        self.upload_timeout = (connect_timeout, upload_timeout)
+
+        # /options only changes when data is loaded; serve it from memory for
+        # options_ttl seconds, then stale while a background refresh runs.
+        self.options_cache = StaleWhileRevalidateCache(options_ttl)
+        # Repeated searches (same normalized filters) skip Blazegraph entirely
+        self.search_cache = LRUCache(search_cache_size, search_cache_ttl)
+        # Resolves title filters to movie URIs in-process; None until
+        # load_title_index() has run (searches then use the substring filter)
+        self.title_index = None
+        # /suggest prefix indexes per field; empty until load_suggest_indexes()
+        self.suggest_indexes = {}
+        # Genre -> itself and all its subgenres, from load_genre_closure();
+        # until then genre filters use rdfs:subClassOf* at query time
+        self.genre_closure = None
+        self.ontology_path = None
+
+    def invalidate_caches(self):
+        """Drops cached /options and /search results (DELETE /admin/cache).
+
+        The title, suggest and genre indexes are kept; see ``data_changed``.
+        """
+        self.options_cache.invalidate()
+        self.search_cache.clear()
+
+    def data_changed(self):
+        """Called whenever the graph data changes: drops cached results and
+        rebuilds the title and suggest indexes, if loaded, from the new data."""
+        if self.title_index is not None or self.suggest_indexes:
+            self.reload()
+        else:
+            self.invalidate_caches()
+
+    def load_title_index(self):
+        """Builds the title index from the titles in the graph; returns it (None on error)."""
+        index = self._build_title_index()
+        if index is not None:
+            self.title_index = index
+        return index
+
+    def _build_title_index(self):
+        start = time.perf_counter()
+        try:
+            bindings = self._run_query(TITLES_QUERY)
+        except Exception as e:
+            logging.error(f"Could not build the title index: {e}")
+            return None
+        index = TitleIndex((r["movie"]["value"], r["title"]["value"]) for r in bindings)
+        logging.info(f"Title index built: {len(index)} titles "
+                     f"in {time.perf_counter() - start:.2f}s")
+        return index
+
+    def load_genre_closure(self, ontology_path):
+        """Materializes the genre hierarchy of the ontology file (see backend.genre_closure)."""
+        self.ontology_path = ontology_path
+        closure = self._build_genre_closure()
+        if closure is not None:
+            self.genre_closure = closure
+        return closure
+
+    def _build_genre_closure(self):
+        try:
+            closure = load_genre_closure(self.ontology_path)
+        except Exception as e:
+            logging.error(f"Could not build the genre closure: {e}")
+            return None
+        logging.info(f"Genre closure built for {len(closure)} genres")
+        return closure
+
+    def load_suggest_indexes(self):
+        """Builds the /suggest prefix indexes (names ranked by film count) from the graph."""
+        self.suggest_indexes = self._build_suggest_indexes()
+        return self.suggest_indexes
+
+    def _build_suggest_indexes(self):
+        start = time.perf_counter()
+        indexes = {}
+        for field, query in SUGGEST_QUERIES.items():
+            try:
+                bindings = self._run_query(query)
+            except Exception as e:
+                logging.error(f"Could not build the {field} suggest index: {e}")
+                continue
+            indexes[field] = PrefixIndex(
+                (r["val"]["value"].split("/")[-1], int(r["count"]["value"])) for r in bindings
+            )
+        logging.info("Suggest indexes built: " + ", ".join(f"{len(i)} {f}s" for f, i in indexes.items())
+                     + f" in {time.perf_counter() - start:.2f}s")
+        return indexes
+
+    def build_indexes(self):
+        """New title, suggest and genre indexes of the current graph, for ``swap_indexes``.
+
+        Searches keep using the current indexes while these are built. An
+        index that fails to build is carried over.
+        """
+        suggest_indexes = self._build_suggest_indexes()
+        return {
+            "title_index": self._build_title_index() or self.title_index,
+            "suggest_indexes": {**self.suggest_indexes, **suggest_indexes},
+            "genre_closure": (self._build_genre_closure() if self.ontology_path else None) or self.genre_closure,
+        }
 
-    def _get_sparql(self):
-        """Creates a new SPARQLWrapper instance."""
-        sparql = SPARQLWrapper(self.endpoint)
-        sparql.setReturnFormat(JSON)
-        return sparql
+    def swap_indexes(self, indexes):
+        """Installs indexes from ``build_indexes`` and drops results cached from the old data."""
+        self.title_index = indexes["title_index"]
+        self.suggest_indexes = indexes["suggest_indexes"]
+        self.genre_closure = indexes["genre_closure"]
+        self.options_cache.invalidate()
+        self.search_cache.clear()
+
+    def reload(self):
+        """Rebuilds the in-process indexes after the graph data changed."""
+        self.swap_indexes(self.build_indexes())
+
+    def suggest(self, field, prefix, limit=10):
+        """Type-ahead values of ``field`` ("actor" or "director") starting with ``prefix``.
+
+        Returns ``[{"value": ..., "count": films}, ...]``, most films first;
+        empty while the index is not built. Raises ValueError for other fields.
+        """
+        if field not in SUGGEST_QUERIES:
+            raise ValueError(f"Unknown suggest field: {field!r}")
+        index = self.suggest_indexes.get(field)
+        if index is None:
+            return []
+        return [{"value": name, "count": count} for name, count in index.search(prefix, limit)]
+
+    def cache_stats(self):
+        return {"search": self.search_cache.stats(), "options": self.options_cache.stats()}
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def _post(self, data, headers, timeout):
+        """Sends one POST to the SPARQL endpoint through the shared pool."""
+        response = self.session.post(self.endpoint, data=data, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+    def _query_json(self, query):
+        """Runs a SPARQL query and returns the decoded JSON result."""
+        response = self._post(
+            {"query": query},
+            {"Accept": "application/sparql-results+json"},
+            self.timeout,
+        )
+        return response.json()
+
+    @staticmethod
+    def _modified(response):
+        # Blazegraph answers mutations with <data modified="N" milliseconds="T"/>
+        match = re.search(r'modified="(\d+)"', response.text)
+        return int(match.group(1)) if match else None
+
+    def post_rdf(self, data: bytes, content_type: str = "application/x-turtle"):
+        """Inserts serialized RDF; returns Blazegraph's count of modified triples (None if not reported)."""
+        return self._modified(self._post(data, {"Content-Type": content_type}, self.upload_timeout))
+
+    def update(self, update: str):
+        """Runs a SPARQL UPDATE; returns Blazegraph's count of modified triples (None if not reported)."""
+        return self._modified(self._post({"update": update}, {}, self.upload_timeout))
+
+    def apply_delta(self, removed, added, batch_size=UPDATE_BATCH_SIZE):
+        """Applies a delta of N-Triples statement lines with DELETE DATA / INSERT DATA.
+
+        Each batch of ``batch_size`` lines is one update request; deletions
+        go first. Caches and indexes are refreshed afterwards (also on failure,
+        as the earlier batches are committed). Returns counts of lines and requests.
+        """
+        requests_sent = 0
+        try:
+            for operation, lines in (("DELETE DATA", removed), ("INSERT DATA", added)):
+                for i in range(0, len(lines), batch_size):
+                    self.update(f"{operation} {{\n{''.join(lines[i:i + batch_size])}}}")
+                    requests_sent += 1
+        finally:
+            self.data_changed()
+        logging.info(f"Applied delta: -{len(removed)} +{len(added)} triples in {requests_sent} updates")
+        return {"removed": len(removed), "added": len(added), "updates": requests_sent}
 
     def is_connected(self):
         """Checks if Blazegraph is reachable."""
         try:
-            sparql = self._get_sparql()
-            sparql.setQuery("ASK { ?s ?p ?o }")
-            sparql.query()
+            self._query_json("ASK { ?s ?p ?o }")
             return True
         except Exception:
             return False
@@ -27,18 +305,14 @@ class QueryEngine:
     def has_movies(self):
         """Checks if movie data is loaded."""
         try:
-            sparql = self._get_sparql()
-            sparql.setQuery("PREFIX ex: <http://example.org/movie/> ASK { ?s ex:title ?o }")
-            ret = sparql.query().convert()
-            # SPARQLWrapper JSON result for ASK is boolean
+            ret = self._query_json("PREFIX ex: <http://example.org/movie/> ASK { ?s ex:title ?o }")
+            # JSON result for ASK is boolean
             return ret["boolean"]
         except Exception:
             return False
 
     def upload_ttl(self, file_path: str):
         """Uploads a TTL file to Blazegraph via HTTP POST."""
-        url = self.endpoint 
-        
         logging.info(f"Starting upload of {file_path} to {self.endpoint}...")
         
         with open(file_path, "rb") as f:
@@ -48,7 +322,11 @@ class QueryEngine:
             "Content-Type": "application/x-turtle",
         }
         
-        response = requests.post(self.endpoint, data=data, headers=headers)
+        try:
+            response = self.session.post(self.endpoint, data=data, headers=headers, timeout=self.upload_timeout)
+        finally:
+            # Even a failed upload may have committed part of the data
+            self.data_changed()
         
         if response.status_code != 200:
             logging.error(f"Failed to upload data: {response.text}")
@@ -57,232 +335,511 @@ class QueryEngine:
         logging.info(f"Successfully uploaded {len(data)} bytes.")
 
     def get_options(self):
-        """Returns unique genres, actors, directors for dropdowns."""
-        # Query Genres
-        logging.info("Fetching options...")
-        q_genre = """
-        PREFIX ex: <http://example.org/movie/>
-        SELECT DISTINCT ?g WHERE {
-            ?g a ex:Genre .
-        } ORDER BY ?g
-        """
-        genres_uris = self._execute_query_list(q_genre, "g")
-        genres = [uri.split("/")[-1] for uri in genres_uris]
-        genres = sorted(list(set(genres))) # Ensure unique and sorted
-        logging.info(f"Fetched {len(genres)} genres")
+        """Returns the unique genres for the dropdown (actors/directors come from suggest)."""
+        return self.get_options_entry().value
 
-        # Query Actors (limit to top 200 most frequent)
-        logging.info("Fetching actors...")
-        q_actor = """
-        PREFIX ex: <http://example.org/movie/>
-        SELECT ?a (COUNT(?m) as ?count) WHERE {
-            ?m ex:actor ?a .
-        } GROUP BY ?a ORDER BY DESC(?count) LIMIT 5000
-        """
-        actors_uris = self._execute_query_list(q_actor, "a")
-        actors = [uri.split("/")[-1] for uri in actors_uris]
-        logging.info(f"Fetched {len(actors)} actors")
+    def get_options_entry(self):
+        """The cached /options payload and its ETag.
 
-        # Query Directors
-        logging.info("Fetching directors...")
-        q_director = """
-        PREFIX ex: <http://example.org/movie/>
-        SELECT DISTINCT ?d WHERE {
-            ?m ex:director ?d .
-        } ORDER BY ?d
+        A stale entry is returned immediately while one background thread
+        re-queries Blazegraph; only an empty cache blocks on the queries.
         """
-        directors_uris = self._execute_query_list(q_director, "d")
-        directors = [uri.split("/")[-1] for uri in directors_uris]
-        directors = sorted(list(set(directors)))
-        logging.info(f"Fetched {len(directors)} directors")
+        entry = self.options_cache.peek()
+        if entry is not None:
+            if not entry.fresh and self.options_cache.begin_refresh():
+                threading.Thread(target=self._refresh_options, daemon=True).start()
+            return entry
+        return self._load_options(self.options_cache.generation)
+
+    def _refresh_options(self):
+        try:
+            self._load_options(self.options_cache.generation)
+        except Exception as e:
+            logging.error(f"Background refresh of options failed: {e}")
+        finally:
+            self.options_cache.end_refresh()
+
+    def _load_options(self, generation):
+        return self._cache_options(self._fetch_options(), generation)
+
+    def _cache_options(self, options, generation):
+        # Query errors come back as empty lists; do not pin those for a whole TTL
+        if not any(options.values()):
+            return CacheEntry(options, ttl=0)
+        return self.options_cache.set(options, generation)
+
+    def _fetch_options(self):
+        return self._run_steps(self._options_steps())
+
+    def _options_steps(self):
+        """Query steps (see _run_steps) of the /options payload: all lists at once."""
+        logging.info("Fetching options...")
+        keys = list(OPTION_QUERIES)
+        results = yield [OPTION_QUERIES[key][0] for key in keys]
+        lists = {}
+        for key, bindings in zip(keys, results):
+            if isinstance(bindings, Exception):
+                logging.error(f"SPARQL Error: {bindings}")
+                lists[key] = []
+            else:
+                lists[key] = [r[OPTION_QUERIES[key][1]]["value"] for r in bindings]
+        return self._build_options(lists)
 
-        return {"genres": genres, "actors": actors, "directors": directors}
+    @staticmethod
+    def _build_options(lists):
+        """Turns the URI lists of OPTION_QUERIES into the /options payload."""
+        genres = [uri.split("/")[-1] for uri in lists["genres"]]
+        genres = sorted(list(set(genres))) # Ensure unique and sorted
+        logging.info(f"Fetched {len(genres)} genres")
+        return {"genres": genres}
 
     def _execute_query_list(self, query, var_name):
         try:
-            sparql = self._get_sparql()
-            sparql.setQuery(query)
-            results = sparql.query().convert()
-            return [r[var_name]["value"] for r in results["results"]["bindings"]]
+            return [r[var_name]["value"] for r in self._run_query(query)]
         except Exception as e:
             logging.error(f"SPARQL Error: {e}")
             return []
 
-    def search_movies(self, title=None, genre=None, year_start=None, year_end=None, actor=None, director=None, limit=50):
-        """Dynamic SPARQL query builder."""
-        
-        query_body = """
-        PREFIX ex: <http://example.org/movie/>
-        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    def _run_query(self, query):
+        """Runs a SELECT query and returns its result bindings."""
+        return self._query_json(query)["results"]["bindings"]
 
-        SELECT DISTINCT ?movie ?title ?year ?runtime
-        WHERE {
+    def _run_steps(self, steps):
+        """Drives a query-step generator, running its queries one after another.
+
+        Searches, lookups and /options are written once, as generators that
+        yield lists of independent SELECT queries and are sent back, for
+        each query, its bindings or the exception it raised; the generator's
+        return value is the result. AsyncQueryEngine drives the same
+        generators with concurrent async requests, so only the transport differs.
+        """
+        try:
+            queries = next(steps)
+            while True:
+                results = []
+                for query in queries:
+                    try:
+                        results.append(self._run_query(query))
+                    except Exception as e:
+                        results.append(e)
+                queries = steps.send(results)
+        except StopIteration as stop:
+            return stop.value
+
+    @staticmethod
+    def _new_movie(row):
+        """Builds the movie dict returned to the frontend from a basics row."""
+        m_uri = row["movie"]["value"]
+        return {
+            "id": m_uri,
+            "title": row["title"]["value"],
+            "year": row["year"]["value"] if "year" in row else None,
+            "runtime": row["runtime"]["value"] if "runtime" in row else None,
+            "genres": [],
+            "directors": [],
+            "actors": [],
+        }
+
+    @staticmethod
+    def _sort_attributes(movies):
+        for m in movies:
+            m["genres"].sort()
+            m["directors"].sort()
+            m["actors"].sort()
+        return movies
+
+    def _search_where(self, title=None, genre=None, year_start=None, year_end=None, actor=None, director=None):
+        """(graph pattern + filters selecting the matching movies, filters on their year).
+
+        The pattern binds each of a movie's years to ?movieYear; a movie is
+        dated by its latest year (?year, and ?yearNumber as an integer), as
+        in MemoryEngine, and the year filters apply to that one. Returns
+        None if the filters are known to match nothing.
+        """
+        where = """
             ?movie ex:title ?title .
-            OPTIONAL { ?movie ex:year ?year }
-            OPTIONAL { ?movie ex:runtime ?runtime }
+            OPTIONAL { ?movie ex:year ?movieYear }
         """
 
         # Filters
         if title:
-            query_body += f'\nFILTER(REGEX(?title, "{title}", "i"))'
-        
-        if genre:
-            query_body += f'\nVALUES ?reqGenre {{ ex:{genre} }} . ?movie ex:genre ?actualGenre . ?actualGenre rdfs:subClassOf* ?reqGenre .'
+            title_filter = self._title_filter(title)
+            if title_filter is None:
+                return None
+            where += title_filter
 
-        if actor:
-             query_body += f'\n?movie ex:actor ?targetActor . FILTER(STRENDS(STR(?targetActor), "/{actor}"))'
+        if genre:
+            genre_filter = self._genre_filter(genre)
+            if genre_filter is None:
+                return None
+            where += genre_filter
 
-        if director:
-             query_body += f'\n?movie ex:director ?targetDirector . FILTER(STRENDS(STR(?targetDirector), "/{director}"))'
+        for predicate, names in (("actor", actor), ("director", director)):
+            if names is None:
+                continue
+            names = self._name_list(names)
+            if not names:
+                return None
+            where += self._person_filter(predicate, names)
 
+        year_filters = ""
         if year_start:
-             query_body += f'\nFILTER(?year >= "{year_start}"^^xsd:gYear)'
-        
+            year_filters += f"\nFILTER(?yearNumber >= {int(year_start)})"
+
         if year_end:
-             query_body += f'\nFILTER(?year <= "{year_end}"^^xsd:gYear)'
+            year_filters += f"\nFILTER(?yearNumber <= {int(year_end)})"
 
-        query_body += """
-        }
-        ORDER BY DESC(?year)
+        return where, year_filters
+
+    def _genre_filter(self, genre):
+        """Matches the genre or any of its subgenres (None if the name cannot match).
+
+        With the precomputed closure this is a flat list of genre URIs;
+        without it, the hierarchy is walked with rdfs:subClassOf* per query.
         """
-        query_body += f"LIMIT {limit}"
+        genre = to_uri(genre)[len(BASE_URI):]
+        if not genre:
+            return None
+        if self.genre_closure is None:
+            return f'\nVALUES ?reqGenre {{ ex:{genre} }} . ?movie ex:genre ?actualGenre . ?actualGenre rdfs:subClassOf* ?reqGenre .'
+        genres = self.genre_closure.get(genre, (genre,))
+        if len(genres) == 1:
+            return f"\n?movie ex:genre ex:{genres[0]} ."
+        values = " ".join(f"ex:{g}" for g in genres)
+        return f"\nVALUES ?genreUri {{ {values} }}\n?movie ex:genre ?genreUri ."
 
-        movies_map = {}
-        
-        try:
-            logging.info(f"Query Step 1: {query_body}")
-            sparql = self._get_sparql()
-            sparql.setQuery(query_body)
-            results = sparql.query().convert()
-            
-            for row in results["results"]["bindings"]:
-                m_uri = row["movie"]["value"]
-                movies_map[m_uri] = {
-                    "id": m_uri,
-                    "title": row["title"]["value"],
-                    "year": row["year"]["value"] if "year" in row else None,
-                    "runtime": row["runtime"]["value"] if "runtime" in row else None,
-                    "genres": [],
-                    "directors": [],
-                    "actors": [],
-                }
-        except Exception as e:
-            logging.error(f"SPARQL Error in Step 1: {e}")
-            return []
+    @staticmethod
+    def _name_list(value):
+        """Local names of one actor/director name or a list of them, normalized like csv_to_rdf.
 
-        if not movies_map:
-            return []
+        Returns None if no name was given and () if none of them can name
+        anything.
+        """
+        if isinstance(value, str):
+            value = [value]
+        given = [v for v in value or () if v and v.strip()]
+        if not given:
+            return None
+        names = {to_uri(v)[len(BASE_URI):] for v in given}
+        names.discard("")
+        return tuple(sorted(names))
 
-        # Step 2: Fetch Details
-        movie_uris = list(movies_map.keys())
-        uris_str = " ".join([f"<{uri}>" for uri in movie_uris])
+    def _person_filter(self, predicate, names):
+        """Binds the exact URIs of ``names`` in the ?movie ex:<predicate> pattern.
+
+        Several names are alternatives (a movie with any of them matches).
+        """
+        if len(names) == 1:
+            return f"\n?movie ex:{predicate} <{BASE_URI}{names[0]}> ."
+        uris_str = " ".join(f"<{BASE_URI}{name}>" for name in names)
+        return f"\nVALUES ?{predicate}Uri {{ {uris_str} }}\n?movie ex:{predicate} ?{predicate}Uri ."
+
+    def _title_filter(self, title):
+        """Restricts ?movie to the title index matches, or falls back to a
+        case-insensitive substring filter on ?title.
 
-        def fetch_attribute(attr_name, target_list):
-            q_attr = f"""
+        Returns None when the index shows that no title matches.
+        """
+        index = self.title_index
+        if index is not None:
+            uris = index.search(title)
+            if not uris:
+                return None
+            if len(uris) <= MAX_TITLE_VALUES:
+                uris_str = " ".join(f"<{uri}>" for uri in uris)
+                return f"\nVALUES ?movie {{ {uris_str} }}"
+        # Quoted and escaped SPARQL string literal, matched as plain text
+        title = json.dumps(title, ensure_ascii=False)
+        return f'\nFILTER(CONTAINS(LCASE(?title), LCASE({title})))'
+
+    @staticmethod
+    def _keyset_filter(cursor):
+        """Keeps only the movies ordered after the cursor's (year, URI); a filter on ?year/?yearNumber."""
+        year, uri = decode_cursor(cursor)
+        uri = json.dumps(uri)  # quoted and escaped SPARQL string literal
+        if year is None:
+            # Movies without a year sort last
+            return f'\nFILTER(!BOUND(?year) && STR(?movie) > {uri})'
+        return (f'\nFILTER(!BOUND(?year) || ?yearNumber < {year} || '
+                f'(?yearNumber = {year} && STR(?movie) > {uri}))')
+
+    @staticmethod
+    def _page(results, limit):
+        """Cuts the limit + 1 fetched movies down to a page and its next cursor."""
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            next_cursor = encode_cursor(results[-1])
+        return {"results": results, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _matches_subquery(where, year_filters, limit):
+        """One page of matching movies in search order, one row each with their basics.
+
+        Matches are grouped by movie and dated by their latest year, so each
+        movie takes exactly one of the LIMIT slots even if it has several
+        years, and "limit + 1 movies" reliably means another page. Year
+        filters compare ?yearNumber, as not every store orders xsd:gYear
+        values. The title and runtime of the page's movies are joined after
+        the limit; a movie with several is shown with the smallest, as in
+        MemoryEngine.
+        """
+        return f"""
+            {{
+                {{
+                    SELECT ?movie ?year (MIN(?movieTitle) AS ?title) (MIN(?movieRuntime) AS ?runtime)
+                    WHERE {{
+                        {{
+                            SELECT ?movie ?year
+                            WHERE {{
+                                {{
+                                    SELECT ?movie (MAX(?movieYear) AS ?year) (xsd:integer(STR(MAX(?movieYear))) AS ?yearNumber)
+                                    WHERE {{
+                                        {where}
+                                    }}
+                                    GROUP BY ?movie
+                                }}
+                                # Some stores answer a GROUP BY over no rows with one empty group
+                                FILTER(BOUND(?movie))
+                                {year_filters}
+                            }}
+                            ORDER BY {SEARCH_ORDER}
+                            LIMIT {limit}
+                        }}
+                        ?movie ex:title ?movieTitle .
+                        OPTIONAL {{ ?movie ex:runtime ?movieRuntime }}
+                    }}
+                    GROUP BY ?movie ?year
+                }}
+                FILTER(BOUND(?movie))
+            }}
+        """
+
+    @staticmethod
+    def _single_search_query(where, year_filters, limit):
+        """Matches, basics and genre/director/actor values in one round-trip.
+
+        The matching movies come from an ordered, limited subquery; each
+        multi-valued attribute is joined in through one UNION branch, so the
+        result has one row per (movie, attribute value) instead of a cross product.
+        """
+        return f"""
+        {SEARCH_PREFIXES}
+        SELECT ?movie ?title ?year ?runtime ?attr ?val
+        WHERE {{
+            {QueryEngine._matches_subquery(where, year_filters, limit)}
+            {ATTRIBUTE_UNION}
+        }}
+        ORDER BY {SEARCH_ORDER}
+        """
+
+    @staticmethod
+    def _multi_search_query(where, year_filters, limit):
+        """Step 1 of the four-query path: only the matching movies' basics."""
+        return f"""
+        {SEARCH_PREFIXES}
+        SELECT DISTINCT ?movie ?title ?year ?runtime
+        WHERE {{
+            {QueryEngine._matches_subquery(where, year_filters, limit)}
+        }}
+        ORDER BY {SEARCH_ORDER}"""
+
+    @staticmethod
+    def _attribute_query(movie_uris, attr_name):
+        """Step 2 of the four-query path: one attribute for a set of movies."""
+        uris_str = " ".join([f"<{uri}>" for uri in movie_uris])
+        return f"""
             PREFIX ex: <http://example.org/movie/>
             SELECT ?movie ?val WHERE {{
                 VALUES ?movie {{ {uris_str} }}
                 ?movie ex:{attr_name} ?val .
             }}
             """
-            try:
-                sparql = self._get_sparql()
-                sparql.setQuery(q_attr)
-                res = sparql.query().convert()
-                for row in res["results"]["bindings"]:
-                    m_uri = row["movie"]["value"]
-                    if m_uri in movies_map:
-                        val = row["val"]["value"].split('/')[-1]
-                        movies_map[m_uri][target_list].append(val)
-            except Exception as e:
-                logging.error(f"SPARQL Error fetching {attr_name}: {e}")
-
-        fetch_attribute("genre", "genres")
-        fetch_attribute("director", "directors")
-        fetch_attribute("actor", "actors")
 
-        results = list(movies_map.values())
-        for m in results:
-             m["genres"].sort()
-             m["directors"].sort()
-             m["actors"].sort()
-        
-        logging.info(f"Search returned {len(results)} results")
-        return results
+    @staticmethod
+    def _movies_by_uris_query(movie_uris, with_attributes):
+        """Basics for a list of URIs, optionally with all attribute values.
 
-    def get_movies_by_uris(self, movie_uris):
-        """Fetches details for a specific list of movie URIs."""
-        if not movie_uris:
-            return []
-            
+        Movies with several values are dated by their latest year and shown
+        with their smallest title and runtime, as in search results.
+        """
         uris_str = " ".join([f"<{uri}>" for uri in movie_uris])
-        
-        # Query basic info
-        q_basic = f"""
+        if with_attributes:
+            select = "SELECT ?movie ?title ?year ?runtime ?attr ?val"
+            attributes = ATTRIBUTE_UNION
+        else:
+            select = "SELECT DISTINCT ?movie ?title ?year ?runtime"
+            attributes = ""
+        return f"""
         PREFIX ex: <http://example.org/movie/>
-        SELECT DISTINCT ?movie ?title ?year ?runtime
+        {select}
         WHERE {{
-            VALUES ?movie {{ {uris_str} }}
-            ?movie ex:title ?title .
-            OPTIONAL {{ ?movie ex:year ?year }}
-            OPTIONAL {{ ?movie ex:runtime ?runtime }}
+            {{
+                SELECT ?movie (MIN(?movieTitle) AS ?title) (MAX(?movieYear) AS ?year)
+                       (MIN(?movieRuntime) AS ?runtime)
+                WHERE {{
+                    VALUES ?movie {{ {uris_str} }}
+                    # rdflib drops the movies without a year or runtime
+                    # unless the VALUES rows are joined with a triple first
+                    ?movie ex:title ?movieTitle .
+                    OPTIONAL {{ ?movie ex:year ?movieYear }}
+                    OPTIONAL {{ ?movie ex:runtime ?movieRuntime }}
+                }}
+                GROUP BY ?movie
+            }}
+            {attributes}
         }}
         """
-        
+
+    @staticmethod
+    def _decode_basic_rows(bindings):
+        """Movie dicts keyed by URI, with empty attribute lists."""
         movies_map = {}
-        try:
-            sparql = self._get_sparql()
-            sparql.setQuery(q_basic)
-            results = sparql.query().convert()
-            
-            for row in results["results"]["bindings"]:
-                m_uri = row["movie"]["value"]
-                movies_map[m_uri] = {
-                    "id": m_uri,
-                    "title": row["title"]["value"],
-                    "year": row["year"]["value"] if "year" in row else None,
-                    "runtime": row["runtime"]["value"] if "runtime" in row else None,
-                    "genres": [],
-                    "directors": [],
-                    "actors": [],
-                }
-        except Exception as e:
-            logging.exception(f"Error fetching movie basics: {e}")
+        for row in bindings:
+            movies_map[row["movie"]["value"]] = QueryEngine._new_movie(row)
+        return movies_map
+
+    @staticmethod
+    def _decode_attribute_rows(bindings):
+        """Folds (basics, ?attr, ?val) rows into movie dicts keyed by URI."""
+        movies_map = {}
+        seen = set()
+        for row in bindings:
+            m_uri = row["movie"]["value"]
+            if m_uri not in movies_map:
+                movies_map[m_uri] = QueryEngine._new_movie(row)
+
+            if "attr" in row and "val" in row:
+                key = (m_uri, row["attr"]["value"], row["val"]["value"])
+                if key not in seen:
+                    seen.add(key)
+                    movies_map[m_uri][key[1]].append(key[2].split('/')[-1])
+        return movies_map
+
+    @staticmethod
+    def _add_attribute_values(movies_map, target_list, bindings):
+        """Appends the ?val of each (?movie, ?val) row to the movie's list."""
+        for row in bindings:
+            m_uri = row["movie"]["value"]
+            if m_uri in movies_map:
+                val = row["val"]["value"].split('/')[-1]
+                movies_map[m_uri][target_list].append(val)
+
+    @staticmethod
+    def _in_input_order(movie_uris, movies_map):
+        """Return in the order of the input URIs to maintain similarity ranking."""
+        return [movies_map[uri] for uri in movie_uris if uri in movies_map]
+
+    @staticmethod
+    def _search_cache_key(title=None, genre=None, year_start=None, year_end=None, actor=None, director=None, limit=50,
+                          cursor=None):
+        """Normalized filter tuple: equivalent searches share one cache entry."""
+        def norm(value):
+            value = (value or "").strip()
+            return value or None
+
+        # The title filter is case-insensitive, so case does not matter
+        title = norm(title)
+        return (
+            title.lower() if title else None,
+            norm(genre),
+            QueryEngine._name_list(actor),
+            QueryEngine._name_list(director),
+            int(year_start) if year_start else None,
+            int(year_end) if year_end else None,
+            int(limit),
+            cursor or None,
+        )
+
+    def search_movies(self, title=None, genre=None, year_start=None, year_end=None, actor=None, director=None, limit=50,
+                      cursor=None):
+        """Dynamic SPARQL query builder.
+
+        Returns one page, ``{"results": [...], "next_cursor": str or None}``;
+        pass ``next_cursor`` back as ``cursor`` to get the following page.
+        Raises ValueError for a malformed cursor.
+
+        Pages are served from the LRU search cache when possible; callers
+        must treat the returned page as read-only.
+        """
+        return self._run_steps(self._search_steps(title, genre, year_start, year_end, actor, director, limit, cursor))
+
+    def _search_steps(self, title, genre, year_start, year_end, actor, director, limit, cursor):
+        """Query steps (see _run_steps) of search_movies."""
+        key = self._search_cache_key(title, genre, year_start, year_end, actor, director, limit, cursor)
+        found, page = self.search_cache.get(key)
+        if found:
+            return page
+        generation = self.search_cache.generation
+
+        # Query with the normalized values so the result matches its cache key
+        title, genre, actor, director, year_start, year_end, limit, cursor = key
+        match = self._search_where(title, genre, year_start, year_end, actor, director)
+        if match is None:
+            page = {"results": [], "next_cursor": None}
+            self.search_cache.set(key, page, generation)
+            return page
+        where, year_filters = match
+        if cursor:
+            year_filters += self._keyset_filter(cursor)
+
+        # One extra movie tells whether there is a next page. Query errors
+        # return an empty page that is not cached.
+        if self.single_query:
+            query = self._single_search_query(where, year_filters, limit + 1)
+            logging.info(f"Search query: {query}")
+            [bindings] = yield [query]
+            if isinstance(bindings, Exception):
+                logging.error(f"SPARQL Error in search: {bindings}")
+                return {"results": [], "next_cursor": None}
+            movies_map = self._decode_attribute_rows(bindings)
+        else:
+            # Original path: one query for the matches, then one per attribute
+            query = self._multi_search_query(where, year_filters, limit + 1)
+            logging.info(f"Query Step 1: {query}")
+            [bindings] = yield [query]
+            if isinstance(bindings, Exception):
+                logging.error(f"SPARQL Error in Step 1: {bindings}")
+                return {"results": [], "next_cursor": None}
+            movies_map = self._decode_basic_rows(bindings)
+            # Step 2: Fetch Details
+            yield from self._detail_steps(movies_map)
+
+        page = self._page(self._sort_attributes(list(movies_map.values())), limit)
+        logging.info(f"Search returned {len(page['results'])} results")
+        self.search_cache.set(key, page, generation)
+        return page
+
+    def _detail_steps(self, movies_map):
+        """Fills genres/directors/actors with one query per attribute."""
+        if not movies_map:
+            return
+        results = yield [self._attribute_query(movies_map.keys(), attr_name) for attr_name, _ in ATTRIBUTES]
+        for (attr_name, target_list), bindings in zip(ATTRIBUTES, results):
+            if isinstance(bindings, Exception):
+                logging.error(f"SPARQL Error fetching {attr_name}: {bindings}")
+            else:
+                self._add_attribute_values(movies_map, target_list, bindings)
+
+    def get_movies_by_uris(self, movie_uris):
+        """Fetches details for a specific list of movie URIs."""
+        return self._run_steps(self._movies_by_uris_steps(movie_uris))
+
+    def _movies_by_uris_steps(self, movie_uris):
+        """Query steps (see _run_steps) of get_movies_by_uris."""
+        if not movie_uris:
             return []
 
-        # Re-use the batch fetch logic for details
-        # (This is a simplified version of what is in search_movies - could be DRYed further)
-        details_uris_str = " ".join([f"<{uri}>" for uri in movies_map.keys()])
-        
-        def fetch_attribute(attr_name, target_list):
-            q_attr = f"""
-            PREFIX ex: <http://example.org/movie/>
-            SELECT ?movie ?val WHERE {{
-                VALUES ?movie {{ {details_uris_str} }}
-                ?movie ex:{attr_name} ?val .
-            }}
-            """
-            try:
-                sparql = self._get_sparql()
-                sparql.setQuery(q_attr)
-                res = sparql.query().convert()
-                for row in res["results"]["bindings"]:
-                    m_uri = row["movie"]["value"]
-                    if m_uri in movies_map:
-                        val = row["val"]["value"].split('/')[-1]
-                        movies_map[m_uri][target_list].append(val)
-            except Exception as e:
-                 logging.error(f"Error fetching {attr_name}: {e}")
+        query = self._movies_by_uris_query(movie_uris, with_attributes=self.single_query)
+        [bindings] = yield [query]
+        if isinstance(bindings, Exception):
+            logging.error(f"Error fetching movie basics: {bindings}", exc_info=bindings)
+            return []
 
-        fetch_attribute("genre", "genres")
-        fetch_attribute("director", "directors")
-        fetch_attribute("actor", "actors")
-        
-        # Return in the order of the input URIs to maintain similarity ranking
-        ordered_results = []
-        for uri in movie_uris:
-            if uri in movies_map:
-                ordered_results.append(movies_map[uri])
-                
-        return ordered_results
+        if self.single_query:
+            movies_map = self._decode_attribute_rows(bindings)
+        else:
+            movies_map = self._decode_basic_rows(bindings)
+            yield from self._detail_steps(movies_map)
+
+        return self._in_input_order(movie_uris, movies_map)
@@ -0,0 +1,71 @@
+import logging
+import threading
+import time
+
+
+class Reloader:
+    """Rebuilds served data in a background thread and swaps it in when ready.
+
+    Each target is a ``(build, swap)`` pair: ``build()`` does the slow work
+    (parsing, index building) while requests keep using the current data,
+    then ``swap(result)`` installs the result, which should only rebind
+    references. One reload runs at a time; ``status()`` reports the last
+    one with per-target build and swap durations.
+    """
+
+    def __init__(self, targets):
+        self.targets = targets
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {"state": "idle"}
+
+    def start(self, names=None):
+        """Starts reloading ``names`` (default: every target); False if a reload is already running."""
+        names = list(self.targets) if names is None else list(names)
+        unknown = [name for name in names if name not in self.targets]
+        if unknown:
+            raise ValueError(f"Unknown reload target(s): {', '.join(unknown)}")
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._status = {"state": "running", "targets": {}, "started_at": time.time()}
+            self._thread = threading.Thread(target=self._run, args=(names,), name="reloader", daemon=True)
+            self._thread.start()
+            return True
+
+    def status(self):
+        with self._lock:
+            return {**self._status, "targets": dict(self._status.get("targets", {}))}
+
+    def join(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _report(self, name, **values):
+        with self._lock:
+            self._status["targets"][name] = values
+
+    def _run(self, names):
+        start = time.perf_counter()
+        state = "done"
+        for name in names:
+            build, swap = self.targets[name]
+            self._report(name, state="building")
+            try:
+                built = time.perf_counter()
+                result = build()
+                swapped = time.perf_counter()
+                swap(result)
+                done = time.perf_counter()
+            except Exception as e:
+                # The previous data stays in place; later targets are still tried
+                logging.exception(f"Reloading {name} failed")
+                self._report(name, state="failed", error=str(e))
+                state = "failed"
+                continue
+            self._report(name, state="done", build_seconds=round(swapped - built, 3),
+                         swap_ms=round((done - swapped) * 1000, 3))
+            logging.info(f"Reloaded {name}: built in {swapped - built:.2f}s, swapped in {(done - swapped) * 1000:.3f}ms")
+        with self._lock:
+            self._status.update(state=state, seconds=round(time.perf_counter() - start, 3), finished_at=time.time())
@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+# Queries shorter than a trigram are answered by scanning every title
+GRAM = 3
+
+
+def _trigrams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class TitleIndex:
+    """In-memory trigram index answering case-insensitive title substring searches.
+
+    Every lowercased title is split into its trigrams; a query is resolved by
+    intersecting the posting lists of its own trigrams (rarest first) and
+    checking the few remaining candidates with a plain substring test. The
+    result is the same set of movies as QueryEngine's fallback filter
+    ``CONTAINS(LCASE(?title), LCASE(query))``, but without touching Blazegraph.
+    """
+
+    def __init__(self, titles):
+        """``titles`` is an iterable of (movie URI, title) pairs."""
+        self.uris = []
+        self.titles = []
+        postings = defaultdict(list)
+        for uri, title in titles:
+            doc = len(self.titles)
+            self.uris.append(uri)
+            self.titles.append(title.lower())
+            for gram in _trigrams(self.titles[doc]):
+                postings[gram].append(doc)
+        self.postings = {gram: frozenset(docs) for gram, docs in postings.items()}
+
+    def __len__(self):
+        return len(self.titles)
+
+    def search(self, query):
+        """URIs of the movies with a title containing ``query``, ignoring case."""
+        query = query.lower()
+        if len(query) < GRAM:
+            docs = (doc for doc, title in enumerate(self.titles) if query in title)
+        else:
+            lists = []
+            for gram in _trigrams(query):
+                docs = self.postings.get(gram)
+                if docs is None:
+                    return []
+                lists.append(docs)
+            lists.sort(key=len)
+            candidates = lists[0].intersection(*lists[1:])
+            docs = (doc for doc in candidates if query in self.titles[doc])
+        return sorted({self.uris[doc] for doc in docs})
@@ -1,3 +1,21 @@
-from rdflib import Namespace
+import re
+from rdflib import Namespace, URIRef
 
-EX = Namespace("http://example.org/movie/")
+BASE_URI = "http://example.org/movie/"
+EX = Namespace(BASE_URI)
+
+
+def to_uri(text):
+    """
+    Convert a string into a safe URI:
+    - Strip leading/trailing spaces
+    - Replace spaces with underscores
+    - Remove special characters
+
+    Shared by csv_to_rdf.py and the query engine, so a name typed into a
+    search resolves to exactly the URI the loader minted for it.
+    """
+    text = text.strip()
+    text = re.sub(r"\s+", "_", text)
+    text = re.sub(r"[^A-Za-z0-9_]", "", text)
+    return URIRef(BASE_URI + text)
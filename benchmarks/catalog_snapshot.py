@@ -0,0 +1,80 @@
+# Cold start of the in-memory engine: parsing the Turtle files with
+# Graph.parse and indexing them, against memory-mapping the columnar catalog
+# snapshot. Also checks that both indexes answer searches identically and
+# times the first search on the snapshot, which builds the lazy lookup tables.
+# Run from the project root:
+#   PYTHONPATH=. python benchmarks/catalog_snapshot.py
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from rdflib import Graph
+from backend.memory_engine import MemoryIndex
+
+RDF_PATHS = ["data/wiki_db_cleaned.ttl", "ontology/ontology.ttl"]
+
+CASES = [
+    {},
+    {"title": "star wars"},
+    {"genre": "Fiction", "year_start": 2015},
+    {"actor": ("Tom_Hanks",)},
+    {"director": ("Christopher_Nolan",), "title": "the"},
+]
+
+
+def search(index, case):
+    args = {"title": None, "genre": None, "actor": None, "director": None, "year_start": None, "year_end": None}
+    args.update(case)
+    return [index.movie(int(i)) for i in index.search(**args, limit=100, cursor=None)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rdf", nargs="+", default=RDF_PATHS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    start = time.perf_counter()
+    graph = Graph()
+    for path in args.rdf:
+        graph.parse(path, format="turtle")
+    parsed = time.perf_counter()
+    built = MemoryIndex.from_graph(graph)
+    indexed = time.perf_counter()
+    print(f"Graph.parse:        {parsed - start:8.2f}s  ({len(graph)} triples)")
+    print(f"MemoryIndex build:  {indexed - parsed:8.2f}s  ({len(built.movie_uris)} movies)")
+
+    directory = os.path.join(tempfile.mkdtemp(), "catalog_snapshot")
+    try:
+        start = time.perf_counter()
+        built.save(directory, args.rdf)
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"snapshot write:     {time.perf_counter() - start:8.2f}s  ({size / 1e6:.1f} MB)")
+
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            loaded = MemoryIndex.load(directory)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"snapshot load:      {statistics.median(timings):8.1f}ms (median of {args.repeat})")
+
+        start = time.perf_counter()
+        search(loaded, {"title": "man", "actor": ("Tom_Hanks",)})
+        print(f"first search:       {(time.perf_counter() - start) * 1000:8.1f}ms (builds lookup tables)")
+
+        ok = loaded.genre_types == built.genre_types and loaded.closure == built.closure
+        for case in CASES:
+            if search(built, case) != search(loaded, case):
+                print(f"  MISMATCH {case}")
+                ok = False
+        print("\nparity OK" if ok else "\nparity FAILED")
+    finally:
+        shutil.rmtree(os.path.dirname(directory))
+
+
+if __name__ == "__main__":
+    main()
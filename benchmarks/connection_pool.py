@@ -0,0 +1,58 @@
+# Concurrent /search workload against a local stand-in endpoint, comparing the
+# pooled keep-alive session with opening a fresh connection per query (the old
+# SPARQLWrapper / bare requests.post behaviour).
+# Run from the project root: PYTHONPATH=. python benchmarks/connection_pool.py
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from backend.query_engine import QueryEngine
+from benchmarks.stub_sparql_endpoint import StubSparqlEndpoint
+
+
+class UnpooledQueryEngine(QueryEngine):
+    """Baseline: every query opens (and tears down) its own TCP connection."""
+
+    def _post(self, data, headers, timeout):
+        response = requests.post(self.endpoint, data=data, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+
+def run(engine, requests_total, concurrency):
+    def one_search(_):
+        start = time.perf_counter()
+        engine.search_movies(genre="drama", limit=10)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one_search, range(requests_total)))
+    elapsed = time.perf_counter() - start
+    return latencies, requests_total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--delay-ms", type=float, default=2.0, help="simulated server time per query")
+    parser.add_argument("--multi-query", action="store_true", help="use the four-query search path")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{'mode':<10} {'p50 ms':>8} {'p95 ms':>8} {'req/s':>8} {'TCP conns':>10}")
+    for name, cls in (("unpooled", UnpooledQueryEngine), ("pooled", QueryEngine)):
+        with StubSparqlEndpoint(delay=args.delay_ms / 1000) as stub:
+            engine = cls(stub.url, single_query=not args.multi_query, pool_size=args.concurrency,
+                         search_cache_size=0)
+            latencies, throughput = run(engine, args.requests, args.concurrency)
+            engine.close()
+            p50 = latencies[len(latencies) // 2]
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            print(f"{name:<10} {p50:>8.2f} {p95:>8.2f} {throughput:>8.0f} {stub.connections:>10}")
+
+
+if __name__ == "__main__":
+    main()
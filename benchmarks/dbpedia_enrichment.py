@@ -0,0 +1,74 @@
+# Wikidata->DBpedia enrichment against a local stand-in endpoint: batches
+# fetched one at a time (the old loop, minus its fixed sleep) against the
+# rate-limited thread pool, then a rerun on the warm response cache and a
+# resumed run after losing half of it, as after a crash.
+# Run from the project root: PYTHONPATH=. python benchmarks/dbpedia_enrichment.py
+import argparse
+import glob
+import os
+import re
+import shutil
+import tempfile
+import time
+import wikidata_to_dbpedia_movies as enrichment
+from benchmarks.stub_sparql_endpoint import StubSparqlEndpoint
+
+
+def respond(query):
+    """DBpedia-shaped bindings for the URIs in the query's VALUES block."""
+    if "owl:sameAs" in query:
+        return [
+            {"wikidata": {"type": "uri", "value": uri}, "dbpediaMovie": {"type": "uri", "value": f"http://dbpedia.org/resource/Film_{uri.rsplit('/', 1)[-1]}"}}
+            for uri in re.findall(r"<(http://www\.wikidata\.org/entity/Q\d+)>", query)
+        ]
+    return [
+        {"film": {"type": "uri", "value": uri}, "title": {"type": "literal", "value": uri.rsplit("_", 1)[-1]},
+         "year": {"type": "literal", "value": "2020"}}
+        for uri in re.findall(r"<(http://dbpedia\.org/resource/Film_Q\d+)>", query)
+    ]
+
+
+def enrich(fetcher, qids):
+    start = time.perf_counter()
+    mapping = enrichment.get_dbpedia_uris(qids, fetcher=fetcher)
+    data = enrichment.get_movie_data(list(mapping.values()), fetcher=fetcher)
+    return time.perf_counter() - start, data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--qids", type=int, default=2000)
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds the endpoint takes per query")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=10.0, help="requests/s allowed by the token bucket")
+    args = parser.parse_args()
+
+    qids = [f"Q{i}" for i in range(1, args.qids + 1)]
+    cache_dir = tempfile.mkdtemp()
+    try:
+        with StubSparqlEndpoint(delay=args.delay, responder=respond) as stub:
+            enrichment.DBPEDIA_SPARQL = stub.url
+            runs = [
+                ("sequential, no cache", enrichment.SparqlFetcher(None, workers=1, rate=args.rate), None),
+                ("concurrent, cold cache", enrichment.SparqlFetcher(cache_dir, args.workers, args.rate), None),
+                ("concurrent, warm cache", enrichment.SparqlFetcher(cache_dir, args.workers, args.rate), None),
+                ("resume after losing half", enrichment.SparqlFetcher(cache_dir, args.workers, args.rate), 0.5),
+            ]
+            print(f"{'run':<28} {'seconds':>8} {'requests':>9} {'cached':>7} {'movies':>7}")
+            expected = None
+            for name, fetcher, drop in runs:
+                if drop:
+                    entries = sorted(glob.glob(os.path.join(cache_dir, "*", "*.json")))
+                    for path in entries[:int(len(entries) * drop)]:
+                        os.remove(path)
+                elapsed, data = enrich(fetcher, qids)
+                expected = expected or data
+                cached = fetcher.cache.hits if fetcher.cache else 0
+                flag = "" if data == expected else "  MISMATCH"
+                print(f"{name:<28} {elapsed:>8.2f} {fetcher.requests:>9} {cached:>7} {len(data):>7}{flag}")
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Genre-filtered search with the precomputed genre closure (flat VALUES list)
+# against walking rdfs:subClassOf* at query time.
+# Run from the project root against a loaded Blazegraph, e.g.:
+#   PYTHONPATH=. python benchmarks/genre_filter.py --endpoint http://localhost:9999/bigdata/namespace/kb/sparql
+import argparse
+import logging
+import statistics
+import time
+from backend.query_engine import QueryEngine
+
+ENDPOINT = "http://localhost:9999/bigdata/namespace/kb/sparql"
+ONTOLOGY_PATH = "ontology/ontology.ttl"
+
+# Leaf genres, inner nodes of the hierarchy, and genres outside it
+CASES = [
+    {"genre": "drama"},
+    {"genre": "adventure"},
+    {"genre": "SpeculativeFiction"},
+    {"genre": "Fiction"},
+    {"genre": "Fiction", "year_start": 2022},
+    {"genre": "Thriller", "title": "night"},
+]
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(0.95 * (len(timings) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", default=ENDPOINT)
+    parser.add_argument("--ontology", default=ONTOLOGY_PATH)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    # No result cache: every repetition must reach Blazegraph
+    path = QueryEngine(args.endpoint, search_cache_size=0)
+    closure = QueryEngine(args.endpoint, search_cache_size=0)
+    closure.load_genre_closure(args.ontology)
+
+    print(f"{'case':<45} {'subClassOf* p50/p95 ms':>24} {'closure p50/p95 ms':>20}")
+    for case in CASES:
+        # Warm up both paths so Blazegraph caches do not favour the second one
+        expected = path.search_movies(**case)["results"]
+        got = closure.search_movies(**case)["results"]
+        if [m["id"] for m in got] != [m["id"] for m in expected]:
+            print(f"  warning: results differ for {case}")
+        p50, p95 = measure(lambda: path.search_movies(**case), args.repeat)
+        c50, c95 = measure(lambda: closure.search_movies(**case), args.repeat)
+        print(f"{str(case):<45} {p50:>11.1f}/{p95:<12.1f} {c50:>9.1f}/{c95:<10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Parity check and latency comparison between the in-memory engine and the
+# SPARQL backend: both must return the same searches (every page, as served),
+# options, movie details and suggestions for the same data. Exits with status
+# 1 on any difference. tests/test_memory_engine_parity.py runs the same check
+# on a small in-process fixture.
+# Run from the project root against a Blazegraph loaded with the same files:
+#   PYTHONPATH=. python benchmarks/memory_engine_parity.py --endpoint http://localhost:9999/bigdata/namespace/kb/sparql
+import argparse
+import logging
+import statistics
+import sys
+import time
+from backend.memory_engine import MemoryEngine
+from backend.query_engine import QueryEngine
+
+ENDPOINT = "http://localhost:9999/bigdata/namespace/kb/sparql"
+RDF_PATHS = ["data/wiki_db_cleaned.ttl", "ontology/ontology.ttl"]
+
+CASES = [
+    {},
+    {"title": "the"},
+    {"title": "star wars"},
+    {"title": "zzzq"},
+    {"genre": "drama"},
+    {"genre": "Fiction"},
+    {"genre": "SpeculativeFiction", "year_start": 2015, "year_end": 2020},
+    {"year_start": 2022},
+    {"year_end": 2012},
+    # Blonde has two years (2022 and 2025) and is dated by the later one
+    {"title": "blonde"},
+    {"year_start": 2022, "year_end": 2023},
+    {"actor": "Tom Holland"},
+    {"actor": "Adam_Driver"},
+    {"actor": ["Tom_Hanks", "Zendaya"], "year_start": 2000},
+    {"director": "Christopher_Nolan"},
+    {"title": "man", "genre": "adventure"},
+]
+SUGGEST_CASES = [("actor", "tom"), ("actor", "s"), ("director", "nol"), ("director", "zz")]
+
+
+def walk(engine, case, page_size):
+    """Every page of a search as returned, following next_cursor.
+
+    Pages are compared as they are, so a movie listed twice or skipped by
+    one engine's paging is a difference.
+    """
+    pages, cursor = [], None
+    while True:
+        page = engine.search_movies(limit=page_size, cursor=cursor, **case)
+        pages.append(page["results"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return pages
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def report(name, expected, got):
+    if expected == got:
+        return True
+    print(f"  MISMATCH {name}")
+    if isinstance(expected, list) and isinstance(got, list):
+        print(f"    sparql: {len(expected)} items, memory: {len(got)} items")
+        for a, b in zip(expected, got):
+            if a != b:
+                print(f"    first difference:\n      sparql: {a}\n      memory: {b}")
+                break
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", default=ENDPOINT)
+    parser.add_argument("--rdf", nargs="+", default=RDF_PATHS, help="files loaded into the endpoint")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    sparql = QueryEngine(args.endpoint, search_cache_size=0)
+    sparql.load_title_index()
+    sparql.load_suggest_indexes()
+    sparql.load_genre_closure(args.rdf[-1])
+    start = time.perf_counter()
+    memory = MemoryEngine(args.rdf)
+    print(f"memory engine built in {time.perf_counter() - start:.1f}s\n")
+
+    ok = report("options", sparql.get_options(), memory.get_options())
+
+    print(f"{'case':<70} {'movies':>7} {'sparql ms':>10} {'memory ms':>10}")
+    sample = []
+    for case in CASES:
+        expected = walk(sparql, case, args.page_size)
+        got = walk(memory, case, args.page_size)
+        ok &= report(f"{case} pages", [len(p) for p in expected], [len(p) for p in got])
+        ok &= report(str(case), [m for p in expected for m in p], [m for p in got for m in p])
+        ids = [m["id"] for p in expected for m in p]
+        ok &= report(f"{case} movies listed once", len(set(ids)), len(ids))
+        sample += [m["id"] for m in expected[0][:3]]
+        s = timed(lambda: sparql.search_movies(limit=args.page_size, **case), args.repeat)
+        m = timed(lambda: memory.search_movies(limit=args.page_size, **case), args.repeat)
+        print(f"{str(case):<70} {sum(map(len, expected)):>7} {s:>10.2f} {m:>10.3f}")
+
+    uris = sample + ["http://example.org/movie/No_Such_Movie"]
+    ok &= report("get_movies_by_uris", sparql.get_movies_by_uris(uris), memory.get_movies_by_uris(uris))
+    for field, prefix in SUGGEST_CASES:
+        ok &= report(f"suggest {field} {prefix!r}", sparql.suggest(field, prefix), memory.suggest(field, prefix))
+
+    print("\nparity OK" if ok else "\nparity FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
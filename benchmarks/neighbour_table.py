@@ -0,0 +1,88 @@
+# /similar from the precomputed neighbour table against live IVF and exact
+# search: build time, per-query latency, and agreement with exact search.
+# Also checks that a table extended by add_movies equals one rebuilt from
+# scratch, and that a table of other embeddings is ignored.
+# Run from the project root: PYTHONPATH=. python benchmarks/neighbour_table.py
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from backend.embedding_engine import (EmbeddingEngine, NeighbourTable, append_embedding_store, load_embedding_store,
+                                      neighbours_path_for, pair_distances, save_embedding_store)
+
+
+def timed(engine, queries, top_n, **kwargs):
+    start = time.perf_counter()
+    results = [engine.get_similar_movies(uri, top_n, **kwargs) for uri in queries]
+    return (time.perf_counter() - start) / len(queries) * 1e6, results
+
+
+def compare(matrix, table, reference):
+    """'same', 'same up to ties' (lists differ only where distances tie in float32) or 'DIFFERENT'."""
+    if np.array_equal(table.ids, reference.ids):
+        return "same"
+    rows = np.arange(len(matrix))
+    tied = np.allclose(pair_distances(matrix, rows, table.ids), pair_distances(matrix, rows, reference.ids), rtol=1e-6)
+    return "same up to ties" if tied else "DIFFERENT"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embeddings", default="data/movie_embeddings.npy")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=20)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--appended", type=int, default=300, help="movies added after the table was built")
+    args = parser.parse_args()
+
+    uris, matrix = load_embedding_store(args.embeddings, mmap=False)
+    workdir = tempfile.mkdtemp()
+    try:
+        store = os.path.join(workdir, "embeddings.npy")
+        save_embedding_store(store, uris, matrix)
+        start = time.perf_counter()
+        table = NeighbourTable.build(matrix, args.k)
+        print(f"{len(uris)} movies, k={table.k}: table built in {time.perf_counter() - start:.2f}s")
+        for block_size in (97, 1000):
+            print(f"block size {block_size}: {compare(matrix, NeighbourTable.build(matrix, args.k, block_size=block_size), table)} neighbours")
+        table.save(neighbours_path_for(store))
+
+        engine = EmbeddingEngine(store)
+        rng = np.random.default_rng(0)
+        queries = [uris[i] for i in rng.choice(len(uris), size=min(args.queries, len(uris)), replace=False)]
+        exact_us, exact = timed(engine, queries, args.top_n, exact=True)
+        ivf_us, ivf = timed(engine, queries, args.top_n, nprobe=engine.nprobe)
+        table_us, looked_up = timed(engine, queries, args.top_n)
+
+        def agreement(results):
+            return np.mean([len({u for u, _ in a} & {u for u, _ in b}) / args.top_n for a, b in zip(results, exact)])
+
+        error = max(abs(d - e) for a, b in zip(looked_up, exact) for (_, d), (_, e) in zip(a, b))
+        print(f"{'search':<8} {'us/query':>9} {'recall':>7}")
+        print(f"{'exact':<8} {exact_us:>9.0f} {1.0:>7.3f}")
+        print(f"{'ivf':<8} {ivf_us:>9.0f} {agreement(ivf):>7.3f}")
+        print(f"{'table':<8} {table_us:>9.1f} {agreement(looked_up):>7.3f}  (max distance error {error:.4f}, float16)")
+
+        # Table of the first n - appended movies, extended when the rest are appended
+        split = len(uris) - args.appended
+        save_embedding_store(store, uris[:split], matrix[:split])
+        NeighbourTable.build(matrix[:split], args.k).save(neighbours_path_for(store))
+        engine = EmbeddingEngine(store)
+        append_embedding_store(store, uris[split:], matrix[split:])
+        start = time.perf_counter()
+        engine.refresh()
+        print(f"{args.appended} appended movies merged in {(time.perf_counter() - start) * 1000:.0f}ms: "
+              f"{compare(matrix, engine.neighbours, table)} as a rebuilt table")
+        reloaded = EmbeddingEngine(store).neighbours
+        print(f"extended table reused after restart: {reloaded is not None and np.array_equal(reloaded.ids, engine.neighbours.ids)}")
+
+        save_embedding_store(store, uris, matrix[::-1].copy())
+        print(f"table of other embeddings ignored: {EmbeddingEngine(store).neighbours is None}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Actor/director filters bound to exact URIs (one triple pattern, or a VALUES
+# list for several names) against the original STRENDS scan over every
+# actor/director triple.
+# Run from the project root against a loaded Blazegraph, e.g.:
+#   PYTHONPATH=. python benchmarks/person_filter.py --endpoint http://localhost:9999/bigdata/namespace/kb/sparql
+import argparse
+import logging
+import statistics
+import time
+from backend.query_engine import QueryEngine
+
+ENDPOINT = "http://localhost:9999/bigdata/namespace/kb/sparql"
+
+CASES = [
+    {"actor": "Adam_Driver"},
+    {"actor": "Tom Holland"},
+    {"director": "Christopher_Nolan"},
+    {"actor": ["Adam_Driver", "Tom_Holland", "Zendaya"]},
+    {"director": ["Christopher_Nolan", "Steven_Spielberg"], "actor": "Adam_Driver"},
+]
+
+
+class StrendsQueryEngine(QueryEngine):
+    """Baseline: matches the names by the suffix of every actor/director URI."""
+
+    def _person_filter(self, predicate, names):
+        var = f"?{predicate}Uri"
+        tests = " || ".join(f'STRENDS(STR({var}), "/{name}")' for name in names)
+        return f"\n?movie ex:{predicate} {var} . FILTER({tests})"
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(0.95 * (len(timings) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", default=ENDPOINT)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    # No result cache: every repetition must reach Blazegraph
+    strends = StrendsQueryEngine(args.endpoint, search_cache_size=0)
+    exact = QueryEngine(args.endpoint, search_cache_size=0)
+
+    print(f"{'case':<70} {'STRENDS p50/p95 ms':>20} {'exact p50/p95 ms':>20}")
+    for case in CASES:
+        # Warm up both paths so Blazegraph caches do not favour the second one
+        expected = strends.search_movies(**case)["results"]
+        got = exact.search_movies(**case)["results"]
+        if [m["id"] for m in got] != [m["id"] for m in expected]:
+            print(f"  warning: results differ for {case}")
+        s50, s95 = measure(lambda: strends.search_movies(**case), args.repeat)
+        e50, e95 = measure(lambda: exact.search_movies(**case), args.repeat)
+        print(f"{str(case):<70} {s50:>9.1f}/{s95:<10.1f} {e50:>9.1f}/{e95:<10.1f}")
+
+
+if __name__ == "__main__":
+    main()
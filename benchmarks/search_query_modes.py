@@ -0,0 +1,59 @@
+# Latency of the single-query search path against the original four-query path.
+# Run from the project root against a loaded Blazegraph, e.g.:
+#   PYTHONPATH=. python benchmarks/search_query_modes.py --endpoint http://localhost:9999/bigdata/namespace/kb/sparql
+import argparse
+import logging
+import statistics
+import time
+from backend.query_engine import QueryEngine
+
+ENDPOINT = "http://localhost:9999/bigdata/namespace/kb/sparql"
+
+# Typical frontend searches
+CASES = [
+    {"limit": 50},
+    {"title": "the", "limit": 50},
+    {"genre": "drama", "limit": 50},
+    {"genre": "Fiction", "year_start": 2022, "limit": 50},
+    {"actor": "Tom_Holland", "limit": 50},
+]
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(0.95 * (len(timings) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", default=ENDPOINT)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    # No result cache: every repetition must reach Blazegraph
+    single = QueryEngine(args.endpoint, single_query=True, search_cache_size=0)
+    multi = QueryEngine(args.endpoint, single_query=False, search_cache_size=0)
+
+    print(f"{'case':<55} {'4-query p50/p95 ms':>20} {'1-query p50/p95 ms':>20}")
+    for case in CASES:
+        # Warm up both paths so Blazegraph caches do not favour the second one
+        multi.search_movies(**case)
+        single.search_movies(**case)
+        m50, m95 = measure(lambda: multi.search_movies(**case), args.repeat)
+        s50, s95 = measure(lambda: single.search_movies(**case), args.repeat)
+        print(f"{str(case):<55} {m50:>9.1f}/{m95:<10.1f} {s50:>9.1f}/{s95:<10.1f}")
+
+    uris = [m["id"] for m in single.search_movies(limit=5)["results"]]
+    m50, m95 = measure(lambda: multi.get_movies_by_uris(uris), args.repeat)
+    s50, s95 = measure(lambda: single.get_movies_by_uris(uris), args.repeat)
+    print(f"{'get_movies_by_uris (5 URIs)':<55} {m50:>9.1f}/{m95:<10.1f} {s50:>9.1f}/{s95:<10.1f}")
+
+
+if __name__ == "__main__":
+    main()
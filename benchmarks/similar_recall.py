@@ -0,0 +1,46 @@
+# Recall@k of the IVF index against exact search, per nprobe setting.
+# Run from the project root: PYTHONPATH=. python benchmarks/similar_recall.py
+import argparse
+import time
+import numpy as np
+from backend.embedding_engine import EmbeddingEngine
+
+EMBEDDING_PATH = "data/movie_embeddings.npy"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embeddings", default=EMBEDDING_PATH)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    engine = EmbeddingEngine(args.embeddings, nlist=args.nlist)
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(engine.uris), size=min(args.queries, len(engine.uris)), replace=False)
+    queries = [engine.uris[i] for i in sample]
+    print(f"{len(engine.uris)} movies, {engine.index.nlist} IVF lists, {len(queries)} queries, k={args.k}")
+
+    start = time.perf_counter()
+    truth = {q: {u for u, _ in engine.get_similar_movies(q, args.k, exact=True)} for q in queries}
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    print(f"{'mode':>12} {'recall@k':>9} {'ms/query':>9}")
+    print(f"{'exact':>12} {1.0:>9.3f} {exact_ms:>9.3f}")
+    for nprobe in args.nprobe:
+        if nprobe > engine.index.nlist:
+            break
+        hits = 0
+        start = time.perf_counter()
+        for q in queries:
+            found = engine.get_similar_movies(q, args.k, nprobe=nprobe)
+            hits += len(truth[q].intersection(u for u, _ in found))
+        ms = (time.perf_counter() - start) / len(queries) * 1000
+        recall = hits / sum(len(t) for t in truth.values())
+        print(f"{'nprobe=' + str(nprobe):>12} {recall:>9.3f} {ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Local stand-in for Blazegraph's SPARQL endpoint, used by the benchmarks.
+# It answers every SELECT with the same canned movie rows after a fixed delay,
+# so measurements isolate client-side overhead (connections, round-trips).
+# A ``responder`` can compute the bindings from the query instead.
+# The server runs in its own process so it does not compete with the client
+# for the GIL.
+import json
+import multiprocessing
+import socket
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+MOVIE_ROWS = 10
+VALUES_PER_MOVIE = 8
+
+
+def _canned_bindings():
+    rows = []
+    for i in range(MOVIE_ROWS):
+        basics = {
+            "movie": {"type": "uri", "value": f"http://example.org/movie/Movie_{i}"},
+            "title": {"type": "literal", "value": f"Movie {i}"},
+            "year": {"type": "literal", "value": str(2024 - i)},
+            "runtime": {"type": "literal", "value": "2.0"},
+        }
+        for j in range(VALUES_PER_MOVIE):
+            attr = ("genres", "directors", "actors")[j % 3]
+            rows.append(dict(
+                basics,
+                attr={"type": "literal", "value": attr},
+                val={"type": "uri", "value": f"http://example.org/movie/Value_{j}"},
+            ))
+    return rows
+
+
+def _serve(sock, delay, connections, responder):
+    body = json.dumps({"head": {}, "results": {"bindings": _canned_bindings()}}).encode()
+    ask_body = json.dumps({"head": {}, "boolean": True}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without TCP_NODELAY
+        # every keep-alive response would stall on delayed ACKs (~40 ms).
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            with connections.get_lock():
+                connections.value += 1
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            payload = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            if b"ASK" in payload:
+                reply = ask_body
+            elif responder is not None:
+                query = parse_qs(payload.decode()).get("query", [""])[0]
+                reply = json.dumps({"head": {}, "results": {"bindings": responder(query)}}).encode()
+            else:
+                reply = body
+            self.send_response(200)
+            self.send_header("Content-Type", "application/sparql-results+json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+    server = ThreadingHTTPServer(sock.getsockname(), Handler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+class StubSparqlEndpoint:
+    """Threaded HTTP/1.1 server (keep-alive capable) on 127.0.0.1.
+
+    ``connections`` counts the TCP connections accepted so far.
+    ``responder`` (a picklable function of the query string returning
+    result bindings) replaces the canned rows.
+    """
+
+    def __init__(self, delay: float = 0.002, port: int = 0, responder=None):
+        self._connections = multiprocessing.Value("i", 0)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", port))
+        self._sock.listen(128)
+        self.url = f"http://127.0.0.1:{self._sock.getsockname()[1]}/bigdata/namespace/kb/sparql"
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self._sock, delay, self._connections, responder), daemon=True
+        )
+
+    @property
+    def connections(self):
+        return self._connections.value
+
+    def __enter__(self):
+        self._process.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.join()
+        self._sock.close()
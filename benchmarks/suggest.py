@@ -0,0 +1,86 @@
+# /options payload size and latency before (every actor and director shipped
+# to the browser) and after (genres only, names from the /suggest prefix index).
+# Run from the project root against a loaded Blazegraph, e.g.:
+#   PYTHONPATH=. python benchmarks/suggest.py --endpoint http://localhost:9999/bigdata/namespace/kb/sparql
+import argparse
+import json
+import logging
+import statistics
+import time
+from backend.query_engine import QueryEngine
+
+ENDPOINT = "http://localhost:9999/bigdata/namespace/kb/sparql"
+
+# The actor/director lists /options used to carry
+OLD_LIST_QUERIES = {
+    "actors": ("""
+        PREFIX ex: <http://example.org/movie/>
+        SELECT ?a (COUNT(?m) as ?count) WHERE {
+            ?m ex:actor ?a .
+        } GROUP BY ?a ORDER BY DESC(?count) LIMIT 5000
+        """, "a"),
+    "directors": ("""
+        PREFIX ex: <http://example.org/movie/>
+        SELECT DISTINCT ?d WHERE {
+            ?m ex:director ?d .
+        } ORDER BY ?d
+        """, "d"),
+}
+
+# Keystrokes of someone typing names into the sidebar
+PREFIXES = [("actor", "t"), ("actor", "to"), ("actor", "tom"), ("actor", "tom h"),
+            ("actor", "hanks"), ("director", "s"), ("director", "spiel"), ("director", "nolan")]
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(0.95 * (len(timings) - 1))]
+
+
+def payload_bytes(value):
+    return len(json.dumps(value).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", default=ENDPOINT)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    engine = QueryEngine(args.endpoint, options_ttl=0)
+
+    def old_options():
+        options = engine._fetch_options()
+        for key, (query, var) in OLD_LIST_QUERIES.items():
+            options[key] = [uri.split("/")[-1] for uri in engine._execute_query_list(query, var)]
+        return options
+
+    old = old_options()
+    new = engine._fetch_options()
+    o50, o95 = measure(old_options, args.repeat)
+    n50, n95 = measure(engine._fetch_options, args.repeat)
+    print(f"{'/options':<22} {'bytes':>10} {'uncached p50/p95 ms':>22}")
+    print(f"{'before (all names)':<22} {payload_bytes(old):>10} {o50:>10.1f}/{o95:<11.1f}")
+    print(f"{'after (genres only)':<22} {payload_bytes(new):>10} {n50:>10.1f}/{n95:<11.1f}")
+
+    start = time.perf_counter()
+    engine.load_suggest_indexes()
+    print(f"\nsuggest indexes built in {time.perf_counter() - start:.2f}s "
+          f"({', '.join(f'{len(i)} {f}s' for f, i in engine.suggest_indexes.items())})\n")
+
+    print(f"{'/suggest':<22} {'bytes':>10} {'p50/p95 us':>22}  top match")
+    for field, prefix in PREFIXES:
+        results = engine.suggest(field, prefix)
+        p50, p95 = measure(lambda: engine.suggest(field, prefix), max(args.repeat, 200))
+        top = results[0]["value"] if results else "-"
+        print(f"{field + ' ' + repr(prefix):<22} {payload_bytes(results):>10} "
+              f"{p50 * 1000:>10.1f}/{p95 * 1000:<11.1f} {top}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Title search through the in-process trigram index (VALUES ?movie) against the
+# SPARQL substring filter it replaces, plus the cost of the index lookup itself.
+# Run from the project root against a loaded Blazegraph, e.g.:
+#   PYTHONPATH=. python benchmarks/title_index.py --endpoint http://localhost:9999/bigdata/namespace/kb/sparql
+import argparse
+import logging
+import statistics
+import time
+from backend.query_engine import QueryEngine
+
+ENDPOINT = "http://localhost:9999/bigdata/namespace/kb/sparql"
+
+# Keystroke-style title queries, from broad to no match
+QUERIES = ["th", "the", "harry", "star wars", "love", "man", "of the", "zzzq"]
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(0.95 * (len(timings) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", default=ENDPOINT)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    # No result cache: every repetition must reach Blazegraph
+    scan = QueryEngine(args.endpoint, search_cache_size=0)
+    indexed = QueryEngine(args.endpoint, search_cache_size=0)
+    start = time.perf_counter()
+    index = indexed.load_title_index()
+    if index is None:
+        raise SystemExit(f"Could not read titles from {args.endpoint}")
+    print(f"index: {len(index)} titles, built in {time.perf_counter() - start:.2f}s "
+          f"(including the SPARQL fetch)\n")
+
+    print(f"{'title':<12} {'matches':>8} {'lookup us':>10} {'filter p50/p95 ms':>18} {'index p50/p95 ms':>18}")
+    for query in QUERIES:
+        matches = len(index.search(query))
+        lookup_us = measure(lambda: index.search(query), 200)[0] * 1000
+
+        # Warm up both paths so Blazegraph caches do not favour the second one
+        expected = scan.search_movies(title=query, limit=args.limit)["results"]
+        got = indexed.search_movies(title=query, limit=args.limit)["results"]
+        if [m["id"] for m in got] != [m["id"] for m in expected]:
+            print(f"  warning: results differ for {query!r}")
+
+        r50, r95 = measure(lambda: scan.search_movies(title=query, limit=args.limit), args.repeat)
+        i50, i95 = measure(lambda: indexed.search_movies(title=query, limit=args.limit), args.repeat)
+        print(f"{query!r:<12} {matches:>8} {lookup_us:>10.1f} {r50:>8.1f}/{r95:<9.1f} {i50:>8.1f}/{i95:<9.1f}")
+
+
+if __name__ == "__main__":
+    main()
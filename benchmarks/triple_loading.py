@@ -0,0 +1,86 @@
+# Time and peak RSS until the training triples are ready: the old path
+# (rdflib Graph -> string tuples -> NumPy str array -> label mapping) against
+# the integer encoders reading Turtle, the cleaned CSV and N-Triples. Each
+# method runs in a fresh process so peak RSS is its own; all must produce the
+# same id triples. TriplesFactory itself is left out (it only wraps the ids).
+# Run from the project root: PYTHONPATH=. python benchmarks/triple_loading.py
+import argparse
+import hashlib
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import numpy as np
+
+TTL_PATH = "data/wiki_db_cleaned.ttl"
+CSV_PATH = "data/wiki_db_cleaned.csv"
+
+
+def graph_strings(path):
+    """What train_embeddings.py did before: ids via a str array of every triple."""
+    from rdflib import Graph
+
+    g = Graph()
+    g.parse(path, format="turtle")
+    triples = np.array([(str(s), str(p), str(o)) for s, p, o in g], dtype=str)
+    entity_to_id = {str(label): i for i, label in enumerate(sorted(set(triples[:, 0]).union(triples[:, 2])))}
+    relation_to_id = {str(label): i for i, label in enumerate(sorted(set(triples[:, 1])))}
+    mapped = np.array([[entity_to_id[h], relation_to_id[r], entity_to_id[t]] for h, r, t in triples], dtype=np.int64)
+    return np.unique(mapped, axis=0)
+
+
+def run(method, path, results):
+    import triple_encoding
+
+    start = time.perf_counter()
+    if method == "graph_strings":
+        mapped = graph_strings(path)
+    else:
+        mapped = getattr(triple_encoding, method)(path).mapped
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results.put((elapsed, peak, len(mapped), hashlib.sha1(mapped.tobytes()).hexdigest()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ttl", default=TTL_PATH)
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--nt", help="N-Triples export (default: generated from --csv)")
+    args = parser.parse_args()
+
+    nt = args.nt
+    if nt is None:
+        import csv
+        from csv_to_rdf import write_stream
+
+        nt = os.path.join(tempfile.mkdtemp(), "triples.nt")
+        with open(args.csv, newline="", encoding="utf-8") as f:
+            write_stream(csv.DictReader(f), nt, fmt="nt")
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'method':<16} {'source':<30} {'seconds':>8} {'peak MiB':>9} {'triples':>8}")
+    digests = set()
+    for method, path in [
+        ("graph_strings", args.ttl),
+        ("encode_turtle", args.ttl),
+        ("encode_csv", args.csv),
+        ("encode_ntriples", nt),
+    ]:
+        results = ctx.Queue()
+        process = ctx.Process(target=run, args=(method, path, results))
+        process.start()
+        elapsed, peak, count, digest = results.get()
+        process.join()
+        digests.add(digest)
+        print(f"{method:<16} {os.path.basename(path):<30} {elapsed:>8.2f} {peak:>9.0f} {count:>8}")
+
+    print("\nsame id triples" if len(digests) == 1 else "\nid triples DIFFER")
+    if args.nt is None:
+        os.remove(nt)
+
+
+if __name__ == "__main__":
+    main()
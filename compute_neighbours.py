@@ -0,0 +1,36 @@
+# Precomputes the nearest movies of every movie, so /similar is a table lookup
+# Rerun after train_embeddings.py; the backend ignores a table computed from
+# other embeddings (and falls back to live search) until then
+import argparse
+import os
+import resource
+import time
+from backend.embedding_engine import NeighbourTable, load_embedding_store, neighbours_path_for
+
+EMBEDDINGS_NPY = "data/movie_embeddings.npy"
+# /similar shows 5; the rest are headroom for larger top_n requests
+TOP_K = 20
+# Rows and columns per distance tile: a tile is BLOCK_SIZE^2 float32 values
+BLOCK_SIZE = 2048
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes the top-K neighbour table used by /similar")
+    parser.add_argument("--embeddings", default=EMBEDDINGS_NPY)
+    parser.add_argument("--out", help="default: <embeddings>.neighbours.npz, where the backend looks for it")
+    parser.add_argument("-k", type=int, default=TOP_K)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    args = parser.parse_args()
+
+    out = args.out or neighbours_path_for(args.embeddings)
+    start = time.perf_counter()
+    uris, matrix = load_embedding_store(args.embeddings)
+    table = NeighbourTable.build(matrix, args.k, block_size=args.block_size)
+    table.save(out)
+    # ru_maxrss is in KiB on Linux
+    print(f"Top {table.k} neighbours of {len(uris)} movies written to {out} ({os.path.getsize(out) / 2**20:.1f} MiB) "
+          f"in {time.perf_counter() - start:.1f}s, peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,301 @@
+import argparse
 import csv
-from rdflib import Graph, Namespace, Literal, URIRef, RDF
+import hashlib
+import json
+import os
+import resource
+import time
+from collections import defaultdict
+from itertools import islice
+from multiprocessing import Pool
+from rdflib import Graph, Literal, RDF, URIRef
 from rdflib.namespace import XSD
 import re
+from backend.vocab import BASE_URI, EX as ex, to_uri
 
 # ---------- Settings ----------
 CSV_FILE = "data/wiki_db_cleaned.csv"
 OUTPUT_FILE = "data/wiki_db_cleaned.ttl"
-BASE_URI = "http://example.org/movie/"
-ex = Namespace(BASE_URI)
 
-# ---------- Helper function: generate clean URI ----------
-def to_uri(text):
+# Rows handed to a worker at a time in streaming mode
+CHUNK_ROWS = 500
+
+# Incremental mode: per-movie row hashes and triples of the last run, and
+# where the added/removed triples of a run are written
+STATE_FILE = "data/wiki_db_cleaned.state.json"
+DELTA_DIR = "data/delta"
+
+TURTLE_HEADER = (
+    f"@prefix ex: <{BASE_URI}> .\n"
+    f"@prefix rdf: <{RDF}> .\n"
+    f"@prefix xsd: <{XSD}> .\n\n"
+)
+
+
+def _names(value):
+    """Non-empty names of a multi-valued cell ("a|b" or "a, b")."""
+    for name in re.split(r"[|,]", (value or "").strip()):
+        name = name.strip()
+        if name:
+            yield name
+
+
+def row_triples(row):
+    """Yields the triples of one CSV row."""
+    movie_uri = to_uri(row["title"])
+
+    # title (mandatory)
+    yield movie_uri, RDF.type, ex.Movie
+    yield movie_uri, ex.title, Literal(row["title"])
+
+    # year (check empty and numeric)
+    year = (row.get("year") or "").strip()
+    if year.isdigit():
+        yield movie_uri, ex.year, Literal(year, datatype=XSD.gYear)
+
+    # runtime (check empty and numeric)
+    runtime = (row.get("runtime") or "").strip()
+    if runtime.replace(".","").isdigit():
+        yield movie_uri, ex.runtime, Literal(runtime, datatype=XSD.float)
+
+    # directors, genres and actors (multiple allowed, skip empty)
+    for column, predicate, cls in (
+        ("directors", ex.director, ex.Director),
+        ("genre", ex.genre, ex.Genre),
+        ("actors", ex.actor, ex.Actor),
+    ):
+        for name in _names(row.get(column)):
+            uri = to_uri(name)
+            yield uri, RDF.type, cls
+            yield movie_uri, predicate, uri
+
+
+def build_graph(rows):
+    """The whole CSV as one rdflib Graph."""
+    g = Graph()
+    g.bind("ex", ex)
+    for row in rows:
+        for triple in row_triples(row):
+            g.add(triple)
+    return g
+
+
+# ---------- Streaming ----------
+
+def _term(term, turtle):
+    if isinstance(term, URIRef):
+        # to_uri only keeps [A-Za-z0-9_], which is always a valid local name
+        if turtle and term.startswith(BASE_URI):
+            return "ex:" + term[len(BASE_URI):]
+        if turtle and term == RDF.type:
+            return "a"
+        return f"<{term}>"
+    if turtle and term.datatype is not None and term.datatype.startswith(str(XSD)):
+        return f'{Literal(str(term)).n3()}^^xsd:{term.datatype[len(str(XSD)):]}'
+    return term.n3()
+
+
+def format_triple(triple, turtle=False):
+    """One statement line, in N-Triples or (with prefixes) in Turtle."""
+    s, p, o = triple
+    return f"{_term(s, turtle)} {_term(p, turtle)} {_term(o, turtle)} .\n"
+
+
+def convert_chunk(args):
+    """Worker: the distinct statement lines of a range of rows, in order."""
+    rows, turtle = args
+    return list(dict.fromkeys(format_triple(t, turtle) for row in rows for t in row_triples(row)))
+
+
+def iter_statements(rows, turtle=False, workers=1, chunk_rows=CHUNK_ROWS):
+    """Yields the RDF text of ``rows`` chunk by chunk, in row order.
+
+    Chunks of ``chunk_rows`` rows are converted by a pool of ``workers``
+    processes (in-process with one worker). Each statement is written once,
+    like a Graph would: the type triples of directors, genres and actors
+    recur in every row that mentions them, and a movie listed under several
+    genres has one row per genre. Only the set of written statements is
+    kept in memory, not a Graph.
     """
-    Convert a string into a safe URI:
-    - Strip leading/trailing spaces
-    - Replace spaces with underscores
-    - Remove special characters
+    rows = iter(rows)
+    chunks = iter(lambda: (list(islice(rows, chunk_rows)), turtle), ([], turtle))
+    seen = set()
+
+    def merge(converted):
+        for lines in converted:
+            new = [line for line in lines if line not in seen]
+            seen.update(new)
+            yield "".join(new)
+
+    if workers > 1:
+        with Pool(workers) as pool:
+            yield from merge(pool.imap(convert_chunk, chunks))
+    else:
+        yield from merge(map(convert_chunk, chunks))
+
+
+def write_stream(rows, output_file, fmt="turtle", workers=1, chunk_rows=CHUNK_ROWS):
+    """Writes ``rows`` to ``output_file`` incrementally, without building a Graph."""
+    turtle = fmt == "turtle"
+    with open(output_file, "w", encoding="utf-8") as out:
+        if turtle:
+            out.write(TURTLE_HEADER)
+        for text in iter_statements(rows, turtle, workers, chunk_rows):
+            out.write(text)
+
+
+# ---------- Incremental ----------
+
+def movie_rows(rows):
+    """Groups rows by the movie URI they produce (a movie has one row per genre)."""
+    movies = defaultdict(list)
+    for row in rows:
+        movies[str(to_uri(row["title"]))].append(row)
+    return movies
+
+
+def rows_hash(rows):
+    """Content hash of a movie's rows, independent of their order in the CSV."""
+    content = "\n".join(sorted(json.dumps(row, sort_keys=True) for row in rows))
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def compute_delta(rows, state):
+    """(added, removed, new_state) between the last run's ``state`` and ``rows``.
+
+    Only movies whose rows hash differently (or that appeared or vanished)
+    are converted again. A triple is shared when several movies produce it
+    (an actor's type triple), so it is removed only when no movie produces
+    it any more, and added only when no movie produced it before. ``added``
+    and ``removed`` are sorted N-Triples lines.
+    """
+    old = state.get("movies", {})
+    new = {}
+    changed = []
+    for uri, group in movie_rows(rows).items():
+        digest = rows_hash(group)
+        if uri in old and old[uri]["hash"] == digest:
+            new[uri] = old[uri]
+        else:
+            lines = dict.fromkeys(format_triple(t) for row in group for t in row_triples(row))
+            new[uri] = {"hash": digest, "triples": list(lines)}
+            changed.append(uri)
+    changed += [uri for uri in old if uri not in new]
+
+    counts = defaultdict(int)
+    for movie in old.values():
+        for line in movie["triples"]:
+            counts[line] += 1
+    before = {}
+    for uri in changed:
+        for movies, step in ((old, -1), (new, 1)):
+            for line in movies.get(uri, {}).get("triples", ()):
+                before.setdefault(line, counts[line])
+                counts[line] += step
+
+    added = sorted(line for line, count in before.items() if count == 0 and counts[line] > 0)
+    removed = sorted(line for line, count in before.items() if count > 0 and counts[line] == 0)
+    return added, removed, {"movies": new}
+
+
+def write_incremental(rows, state_file, delta_dir, output_file, apply=None):
+    """Computes the delta against ``state_file`` and writes it to ``delta_dir``.
+
+    ``added.nt`` and ``removed.nt`` hold the delta. When anything changed,
+    ``apply(removed, added)`` is called if given, then ``output_file`` is
+    rewritten from the stored triples (N-Triples lines, which are valid
+    Turtle) without converting any row, and the state is saved. Both files
+    are written to a temporary name and renamed, the output first, so an
+    interrupted run never leaves a truncated output behind a saved state.
+    Without a state file every triple counts as added.
+
+    If ``apply`` raises, the state is left as it was, so the next run
+    computes the unapplied changes again; re-applying the batches that did
+    go through is harmless, as DELETE DATA / INSERT DATA are idempotent.
     """
-    text = text.strip()
-    text = re.sub(r"\s+", "_", text)
-    text = re.sub(r"[^A-Za-z0-9_]", "", text)
-    return URIRef(BASE_URI + text)
-
-# ---------- Create RDF Graph ----------
-g = Graph()
-g.bind("ex", ex)
-
-# ---------- Read CSV ----------
-with open(CSV_FILE, newline="", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-
-    for row in reader:
-        movie_uri = to_uri(row["title"])
-
-        # title (mandatory)
-        g.add((movie_uri, RDF.type, ex.Movie))
-        g.add((movie_uri, ex.title, Literal(row["title"])))
-
-        # year (check empty and numeric)
-        year = row.get("year", "").strip()
-        if year.isdigit():
-            g.add((movie_uri, ex.year, Literal(year, datatype=XSD.gYear)))
-
-        # runtime (check empty and numeric)
-        runtime = row.get("runtime", "").strip()
-        if runtime.replace(".","").isdigit():
-            g.add((movie_uri, ex.runtime, Literal(runtime, datatype=XSD.float)))
-
-        # directors (multiple allowed, skip empty)
-        directors = row.get("directors", "").strip()
-        if directors:
-            for d in re.split(r"[|,]", directors):
-                d = d.strip()
-                if d:
-                    director_uri = to_uri(d)
-                    g.add((director_uri, RDF.type, ex.Director))
-                    g.add((movie_uri, ex.director, director_uri))
-
-        genres = row.get("genre", "").strip()
-        if genres:
-            for d in re.split(r"[|,]", genres):
-                d = d.strip()
-                if d:
-                    genre_uri = to_uri(d)
-                    g.add((genre_uri, RDF.type, ex.Genre))
-                    g.add((movie_uri, ex.genre, genre_uri))
-
-        # actors (multiple allowed, skip empty)
-        actors = row.get("actors", "").strip()
-        if actors:
-            for a in re.split(r"[|,]", actors):
-                a = a.strip()
-                if a:
-                    actor_uri = to_uri(a)
-                    g.add((actor_uri, RDF.type, ex.Actor))
-                    g.add((movie_uri, ex.actor, actor_uri))
-
-# ---------- Serialize RDF to Turtle ----------
-g.serialize(OUTPUT_FILE, format="turtle")
-print(f"RDF successfully written to {OUTPUT_FILE}")
+    state = {}
+    if os.path.exists(state_file):
+        with open(state_file, encoding="utf-8") as f:
+            state = json.load(f)
+    added, removed, state = compute_delta(rows, state)
+
+    os.makedirs(delta_dir, exist_ok=True)
+    for name, lines in (("added.nt", added), ("removed.nt", removed)):
+        with open(os.path.join(delta_dir, name), "w", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    if (added or removed) and apply is not None:
+        apply(removed, added)
+
+    if added or removed or not os.path.exists(output_file):
+        tmp = f"{output_file}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(dict.fromkeys(line for movie in state["movies"].values() for line in movie["triples"]))
+        os.replace(tmp, output_file)
+        tmp = f"{state_file}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, state_file)
+    return added, removed
+
+
+class CountingRows:
+    """Iterates over CSV rows, counting them."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.reader:
+            self.count += 1
+            yield row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converts the cleaned movie CSV to RDF")
+    parser.add_argument("--csv", default=CSV_FILE)
+    parser.add_argument("--out", default=OUTPUT_FILE)
+    parser.add_argument("--format", choices=("turtle", "nt"), default="turtle")
+    parser.add_argument("--stream", action="store_true",
+                        help="write statements incrementally instead of serializing a whole Graph")
+    parser.add_argument("--workers", type=int, default=1, help="processes converting rows (with --stream)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--incremental", action="store_true",
+                        help="only convert movies whose rows changed since the last run, and write the delta")
+    parser.add_argument("--state", default=STATE_FILE)
+    parser.add_argument("--delta-dir", default=DELTA_DIR)
+    parser.add_argument("--apply", metavar="ENDPOINT",
+                        help="with --incremental, apply the delta to this SPARQL endpoint with INSERT/DELETE DATA")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.csv, newline="", encoding="utf-8") as f:
+        rows = CountingRows(csv.DictReader(f))
+        if args.incremental:
+            apply = None
+            if args.apply:
+                from backend.query_engine import QueryEngine
+
+                def apply(removed, added):
+                    print(f"Applying the delta to {args.apply}...")
+                    print(QueryEngine(args.apply).apply_delta(removed, added))
+            added, removed = write_incremental(rows, args.state, args.delta_dir, args.out, apply)
+            print(f"Delta: +{len(added)} -{len(removed)} triples written to {args.delta_dir}")
+        elif args.stream:
+            write_stream(rows, args.out, args.format, args.workers, args.chunk_rows)
+        else:
+            g = build_graph(rows)
+            g.serialize(args.out, format="turtle" if args.format == "turtle" else "nt", encoding="utf-8")
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux; workers are reported separately
+    peak = f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB"
+    if args.stream and args.workers > 1:
+        peak += f" (largest worker {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024:.0f} MiB)"
+    print(f"RDF successfully written to {args.out}")
+    print(f"{rows.count} rows in {elapsed:.2f}s ({rows.count / elapsed:.0f} rows/s), {peak}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
-#%%
+import argparse
+import time
 import pandas as pd
-import numpy as np
 
 
 # =========================
@@ -10,131 +10,142 @@ INPUT_CSV = "./data/wiki_db_2.csv"
 OUTPUT_CSV = "./data/wiki_db_cleaned_2.csv"
 COVERAGE_CSV = "./data/wiki_db_column_coverage.csv"
 
-#%%
-# =========================
-# Load data
-# =========================
-df = pd.read_csv(INPUT_CSV)
-
-print("Original shape:", df.shape)
-
-#%%
-# =========================
-# Drop unnecessary columns
-# =========================
-DROP_COLS = [
-    "movie",
-    "qid"
-]
+# Compact dtypes for the columns the pipeline keeps or computes with;
+# the rest (titles, name lists) stay strings
+DTYPES = {
+    "year": "Int16",
+    "runtime": "float64",
+    "runtime_dbpedia": "float64",
+    "year_dbpedia": "Int16",
+    "genre": "category",
+}
+# Runtimes are averaged in float64 and stored as float32
+RUNTIME_DTYPE = "float32"
 
-df = df.drop(columns=DROP_COLS, errors="ignore")
+# Identifiers only needed to fetch the DBpedia columns
+ID_COLS = ["movie", "qid"]
+# DBpedia columns, dropped once merged into the Wikidata ones
+DBPEDIA_COLS = ["title_dbpedia", "year_dbpedia", "runtime_dbpedia", "directors_dbpedia", "actors_dbpedia"]
+# Columns preprocess() only drops; not even parsed unless diagnostics need them
+UNUSED_COLS = ID_COLS + [col for col in DBPEDIA_COLS if col != "runtime_dbpedia"]
 
-print("After dropping columns:", df.shape)
 
-#%%
 # =========================
-# Unit normalization
-# runtime_minutes -> hours
+# Transforms
 # =========================
-#%% 找出 'runtime_dbpedia' 欄位有值的列
-non_null_runtime_rows = df[df['runtime_dbpedia'].notna()]
-print(non_null_runtime_rows[['runtime', 'runtime_dbpedia']])
+def preprocess(df):
+    """Cleans one frame (the whole file or a chunk); every step is row-wise.
 
-#%%
-df["runtime_dbpedia"] = df["runtime_dbpedia"] / 60
+    - DBpedia runtimes are in seconds: converted to minutes, sign dropped
+    - where both sources have a runtime, ``runtime`` becomes their average
+    - identifier and DBpedia columns are dropped
+    """
+    df = df.drop(columns=ID_COLS, errors="ignore")
 
-#%%
-# =========================
-# Column coverage statistics
-# =========================
-coverage_df = pd.DataFrame({
-    "non_null_count": df.notnull().sum(),
-    "coverage_ratio": df.notnull().mean(),
-    "total_rows": len(df)
-}).sort_values("coverage_ratio", ascending=False)
+    if "runtime_dbpedia" in df.columns:
+        runtime_dbpedia = (df["runtime_dbpedia"] / 60).abs()
+        both = df["runtime"].notna() & runtime_dbpedia.notna()
+        df["runtime"] = df["runtime"].mask(both, (df["runtime"] + runtime_dbpedia) / 2)
+
+    df = df.drop(columns=DBPEDIA_COLS, errors="ignore")
+    return df.astype({"runtime": RUNTIME_DTYPE})
 
-print("\nColumn coverage:")
-print(coverage_df)
 
-#%%
 # =========================
-# Check data format issues
+# Diagnostics (opt-in)
 # =========================
-#%% 找出欄位有值的列
-columns_to_check = df.columns
-
-for col in columns_to_check:
-    non_null_rows = df[df[col].notna()]
-    print(f"\nNon-null rows for column '{col}':")
-    print(non_null_rows[[col]].head(10))
-
-#%% transform year_dbpedia to integer
-df['year_dbpedia'] = df['year_dbpedia'].astype('Int64')
-
-#%% transform runtime_dbpedia to absolute values
-df['runtime_dbpedia'] = df['runtime_dbpedia'].abs()
-
-#%% 找出兩個欄位值不相等的列
-column_1 = 'actors'
-column_2 = 'actors_dbpedia'
-not_null_df = df[df[column_1].notna() & df[column_2].notna()]
-different_values_df = not_null_df[not_null_df[column_1] != not_null_df[column_2]]
-pd.set_option('display.max_rows', None)
-print(different_values_df[[column_1, column_2]])
-
-#%% Drop title_dbpedia, year_dbpedia columns due to redundancy
-DROP_COLS = [
-    "title_dbpedia",
-    "year_dbpedia"
-]
-
-df = df.drop(columns=DROP_COLS, errors="ignore")
-
-#%% 取 'runtime' 和 'runtime_dbpedia' 兩個欄位值的平均值，並更新回這兩個欄位
-condition1 = df['runtime'] != df['runtime_dbpedia']
-condition2 = df['runtime'].notna()
-condition3 = df['runtime_dbpedia'].notna()
-rows_to_update_mask = condition1 & condition2 & condition3
-average_runtime = (df.loc[rows_to_update_mask, 'runtime'] + df.loc[rows_to_update_mask, 'runtime_dbpedia']) / 2
-df.loc[rows_to_update_mask, 'runtime'] = average_runtime
-
-#%% Conditional completeness: A has value, B is missing
-def count_A_notnull_B_null(df, col_A, col_B):
-    if col_A not in df.columns or col_B not in df.columns:
-        return None
-    return df[df[col_A].notnull() & df[col_B].isnull()].shape[0]
-
-conditional_stats = {
-    "dbpedia_notnull_wikidata_null_runtime":
-        count_A_notnull_B_null(df, "runtime_dbpedia", "runtime"),
-    "dbpedia_notnull_wikidata_null_directors":
-        count_A_notnull_B_null(df, "directors_dbpedia", "directors"),
-    "dbpedia_notnull_wikidata_null_actors":
-        count_A_notnull_B_null(df, "actors_dbpedia", "actors")
+# (column with a value, column missing it) pairs counted by the diagnostics
+CONDITIONAL_PAIRS = {
+    "dbpedia_notnull_wikidata_null_runtime": ("runtime_dbpedia", "runtime"),
+    "dbpedia_notnull_wikidata_null_directors": ("directors_dbpedia", "directors"),
+    "dbpedia_notnull_wikidata_null_actors": ("actors_dbpedia", "actors"),
 }
 
-print("\nConditional completeness:")
-for k, v in conditional_stats.items():
-    print(f"{k}: {v}")
-
-#%% Drop redundant dbpedia columns after merging
-print("Before dropping columns:", df.shape)
-DROP_COLS = [
-    "runtime_dbpedia",
-    "directors_dbpedia",
-    "actors_dbpedia"
-]
-df = df.drop(columns=DROP_COLS, errors="ignore")
-print("After dropping columns:", df.shape)
 
+class Diagnostics:
+    """Coverage and source-agreement counts, accumulated over the raw chunks."""
+
+    def __init__(self):
+        self.rows = 0
+        self.non_null = None
+        self.conditional = dict.fromkeys(CONDITIONAL_PAIRS, 0)
+        self.actors_differ = 0
+
+    def add(self, df):
+        self.rows += len(df)
+        counts = df.notnull().sum()
+        self.non_null = counts if self.non_null is None else self.non_null.add(counts, fill_value=0)
+        for name, (col_a, col_b) in CONDITIONAL_PAIRS.items():
+            if col_a in df.columns and col_b in df.columns:
+                self.conditional[name] += int((df[col_a].notnull() & df[col_b].isnull()).sum())
+        if "actors_dbpedia" in df.columns:
+            both = df["actors"].notna() & df["actors_dbpedia"].notna()
+            self.actors_differ += int((both & (df["actors"] != df["actors_dbpedia"])).sum())
+
+    def coverage(self):
+        return pd.DataFrame({
+            "non_null_count": self.non_null.astype(int),
+            "coverage_ratio": self.non_null / self.rows,
+            "total_rows": self.rows,
+        }).sort_values("coverage_ratio", ascending=False)
+
+    def report(self):
+        print("\nColumn coverage:")
+        print(self.coverage())
+        print("\nConditional completeness:")
+        for k, v in self.conditional.items():
+            print(f"{k}: {v}")
+        print(f"actors differing between Wikidata and DBpedia: {self.actors_differ}")
 
 
-#%%
 # =========================
-# Save results
+# Pipeline
 # =========================
-df.to_csv(OUTPUT_CSV, index=False)
-# coverage_df.to_csv(COVERAGE_CSV)
-
-print("\nSaved cleaned data to:", OUTPUT_CSV)
-print("Saved coverage stats to:", COVERAGE_CSV)
\ No newline at end of file
+def read_csv(path, chunksize=None, all_columns=True):
+    """The raw CSV with compact dtypes; an iterator of frames with ``chunksize``."""
+    columns = pd.read_csv(path, nrows=0).columns
+    usecols = None if all_columns else [col for col in columns if col not in UNUSED_COLS]
+    dtypes = {col: dtype for col, dtype in DTYPES.items() if col in columns}
+    return pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunksize)
+
+
+def run(input_csv=INPUT_CSV, output_csv=OUTPUT_CSV, chunksize=None, diagnostics=False, coverage_csv=None):
+    """Cleans ``input_csv`` into ``output_csv``; returns the number of rows written.
+
+    With ``chunksize``, the file is streamed through ``preprocess`` that many
+    rows at a time, so memory stays flat however large the input is.
+    """
+    stats = Diagnostics() if diagnostics or coverage_csv else None
+    frames = read_csv(input_csv, chunksize, all_columns=stats is not None)
+    chunks = frames if chunksize else [frames]
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        if stats:
+            stats.add(chunk)
+        cleaned = preprocess(chunk)
+        cleaned.to_csv(output_csv, index=False, mode="w" if i == 0 else "a", header=i == 0)
+        rows += len(cleaned)
+
+    if diagnostics:
+        stats.report()
+    if coverage_csv:
+        stats.coverage().to_csv(coverage_csv)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cleans the merged Wikidata/DBpedia movie CSV")
+    parser.add_argument("--input", default=INPUT_CSV)
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    parser.add_argument("--chunksize", type=int, help="stream the input this many rows at a time")
+    parser.add_argument("--diagnostics", action="store_true", help="print column coverage and source agreement")
+    parser.add_argument("--coverage-csv", nargs="?", const=COVERAGE_CSV, help="also save the column coverage")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = run(args.input, args.output, args.chunksize, args.diagnostics, args.coverage_csv)
+    print(f"\nSaved {rows} cleaned rows to: {args.output} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,15 @@ import { MovieCard } from '@/components/MovieCard';
 import { Loader2 } from 'lucide-react';
 
 export default function Home() {
-  const [options, setOptions] = useState<FilterOptions>({ genres: [], actors: [], directors: [] });
+  const [options, setOptions] = useState<FilterOptions>({ genres: [] });
   const [filters, setFilters] = useState<any>({});
   const [movies, setMovies] = useState<Movie[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  // Filters of the search that returned nextCursor; "load more" reuses them,
+  // not whatever has been edited in the sidebar since
+  const [searchedFilters, setSearchedFilters] = useState<any>({});
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [initialLoad, setInitialLoad] = useState(true);
 
   // Fetch options on mount
@@ -30,8 +35,11 @@ export default function Home() {
   const handleSearch = async () => {
     setLoading(true);
     try {
-      const results = await searchMovies(filters);
-      setMovies(results);
+      const submitted = { ...filters };
+      const page = await searchMovies(submitted);
+      setMovies(page.results);
+      setNextCursor(page.next_cursor);
+      setSearchedFilters(submitted);
     } catch (e) {
       console.error("Search failed", e);
     } finally {
@@ -47,8 +55,10 @@ export default function Home() {
 
     setLoading(true);
     try {
-      const results = await searchMovies(newFilters);
-      setMovies(results);
+      const page = await searchMovies(newFilters);
+      setMovies(page.results);
+      setNextCursor(page.next_cursor);
+      setSearchedFilters(newFilters);
     } catch (e) {
       console.error("Search failed", e);
     } finally {
@@ -57,6 +67,20 @@ export default function Home() {
     }
   };
 
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await searchMovies(searchedFilters, nextCursor);
+      setMovies((prev) => [...prev, ...page.results]);
+      setNextCursor(page.next_cursor);
+    } catch (e) {
+      console.error("Loading more results failed", e);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   return (
     <main className="min-h-screen pl-80 bg-zinc-50 dark:bg-black text-zinc-900 dark:text-white selection:bg-yellow-500 selection:text-black transition-colors duration-300">
       <Sidebar
@@ -94,6 +118,17 @@ export default function Home() {
                 onQuickSearch={handleQuickSearch}
               />
             ))}
+            {nextCursor && (
+              <div className="col-span-full flex justify-center pt-4">
+                <button
+                  onClick={handleLoadMore}
+                  disabled={loadingMore}
+                  className="px-6 py-2 rounded-lg border border-zinc-200 dark:border-zinc-800 hover:border-yellow-500 disabled:opacity-50 transition-colors"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
         ) : !initialLoad ? (
           <div className="h-64 flex flex-col items-center justify-center text-zinc-500 border border-zinc-200 dark:border-zinc-800 border-dashed rounded-lg">
@@ -1,6 +1,7 @@
 import { FilterOptions } from '@/types';
 import { Search, Filter, X } from 'lucide-react';
 import { ThemeToggle } from '@/components/ThemeToggle';
+import { SuggestInput } from '@/components/SuggestInput';
 
 interface SidebarProps {
     options: FilterOptions;
@@ -43,29 +44,32 @@ export const Sidebar = ({ options, filters, setFilters, onSearch, loading }: Sid
                     </div>
                 </div>
 
-                {/* Dropdowns */}
-                {['genre', 'director', 'actor'].map((field) => (
+                {/* Genre Dropdown */}
+                <div className="space-y-2">
+                    <label className="text-xs uppercase text-zinc-500 font-semibold tracking-wider">Genre</label>
+                    <select
+                        className="w-full bg-white dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800 rounded-lg py-2.5 px-3 text-sm text-zinc-900 dark:text-white focus:outline-none focus:border-yellow-500 transition-colors appearance-none cursor-pointer"
+                        value={filters.genre || ''}
+                        onChange={(e) => handleChange('genre', e.target.value)}
+                    >
+                        <option value="">Select genre...</option>
+                        {options.genres.map((opt) => (
+                            <option key={opt} value={opt}>
+                                {opt.replace(/_/g, ' ').replace(/([a-z])([A-Z])/g, '$1 $2').replace(/\b\w/g, c => c.toUpperCase())}
+                            </option>
+                        ))}
+                    </select>
+                </div>
+
+                {/* Director / Actor type-ahead (too many to list, see /suggest) */}
+                {['director', 'actor'].map((field) => (
                     <div key={field} className="space-y-2">
                         <label className="text-xs uppercase text-zinc-500 font-semibold tracking-wider capitalize">{field}</label>
-                        <select
-                            className="w-full bg-white dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800 rounded-lg py-2.5 px-3 text-sm text-zinc-900 dark:text-white focus:outline-none focus:border-yellow-500 transition-colors appearance-none cursor-pointer"
+                        <SuggestInput
+                            field={field}
                             value={filters[field] || ''}
-                            onChange={(e) => handleChange(field, e.target.value)}
-                        >
-                            <option value="">Select {field}...</option>
-                            {/* map options based on field name */}
-                            {/* 
-                   Note: options.genres matches 'genre', but 'director' -> options.directors, 'actor' -> options.actors.
-                   Simple mapping logic:
-                */}
-                            {(options[field + 's' as keyof FilterOptions] || []).map((opt) => (
-                                <option key={opt} value={opt}>
-                                    {field === 'genre'
-                                        ? opt.replace(/_/g, ' ').replace(/([a-z])([A-Z])/g, '$1 $2').replace(/\b\w/g, c => c.toUpperCase())
-                                        : opt.replace(/_/g, ' ')}
-                                </option>
-                            ))}
-                        </select>
+                            onChange={(value) => handleChange(field, value)}
+                        />
                     </div>
                 ))}
 
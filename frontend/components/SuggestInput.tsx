@@ -0,0 +1,79 @@
+import { useEffect, useRef, useState } from 'react';
+import { getSuggestions } from '@/lib/api';
+import { Suggestion } from '@/types';
+
+interface SuggestInputProps {
+    field: string;
+    value: string;
+    onChange: (value: string) => void;
+}
+
+const toName = (text: string) => text.trim().replace(/\s+/g, '_');
+
+// Type-ahead for actor/director names. Values are URI local names
+// (e.g. "Tom_Hanks"), shown with spaces.
+export const SuggestInput = ({ field, value, onChange }: SuggestInputProps) => {
+    const [text, setText] = useState(value.replace(/_/g, ' '));
+    const [suggestions, setSuggestions] = useState<Suggestion[]>([]);
+    const [open, setOpen] = useState(false);
+    const latest = useRef('');
+
+    // Follow outside changes, e.g. a quick search from a movie card,
+    // without rewriting what the user is typing
+    useEffect(() => {
+        setText((current) => toName(current) === value ? current : value.replace(/_/g, ' '));
+    }, [value]);
+
+    useEffect(() => {
+        const prefix = text.trim();
+        latest.current = prefix;
+        if (!open || !prefix) {
+            setSuggestions([]);
+            return;
+        }
+        const timer = setTimeout(async () => {
+            const results = await getSuggestions(field, prefix);
+            // Drop responses that arrive after the user kept typing
+            if (latest.current === prefix) setSuggestions(results);
+        }, 150);
+        return () => clearTimeout(timer);
+    }, [field, text, open]);
+
+    const select = (name: string) => {
+        onChange(name);
+        setText(name.replace(/_/g, ' '));
+        setOpen(false);
+    };
+
+    return (
+        <div className="relative">
+            <input
+                type="text"
+                value={text}
+                onChange={(e) => {
+                    setText(e.target.value);
+                    onChange(toName(e.target.value));
+                    setOpen(true);
+                }}
+                onFocus={() => setOpen(true)}
+                onBlur={() => setTimeout(() => setOpen(false), 150)}
+                placeholder={`Select ${field}...`}
+                className="w-full bg-white dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800 rounded-lg py-2.5 px-3 text-sm text-zinc-900 dark:text-white focus:outline-none focus:border-yellow-500 transition-colors placeholder:text-zinc-400 dark:placeholder:text-zinc-600"
+            />
+            {open && suggestions.length > 0 && (
+                <ul className="absolute z-20 mt-1 w-full max-h-64 overflow-y-auto bg-white dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800 rounded-lg shadow-lg">
+                    {suggestions.map((s) => (
+                        <li
+                            key={s.value}
+                            onMouseDown={() => select(s.value)}
+                            className="flex justify-between px-3 py-2 text-sm cursor-pointer hover:bg-yellow-500/10"
+                        >
+                            <span>{s.value.replace(/_/g, ' ')}</span>
+                            <span className="text-zinc-500">{s.count}</span>
+                        </li>
+                    ))}
+                </ul>
+            )}
+        </div>
+    );
+};
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { FilterOptions, Movie } from '@/types';
+import { FilterOptions, Movie, SearchPage, Suggestion } from '@/types';
 
 const API_URL = '/api';
 
@@ -12,15 +12,25 @@ export const getOptions = async (): Promise<FilterOptions> => {
     return response.data;
 };
 
-export const searchMovies = async (params: any): Promise<Movie[]> => {
+export const getSuggestions = async (field: string, prefix: string): Promise<Suggestion[]> => {
+    try {
+        const response = await api.get('/suggest', { params: { field, prefix } });
+        return response.data;
+    } catch (error) {
+        console.error("Error fetching suggestions:", error);
+        return [];
+    }
+};
+
+export const searchMovies = async (params: any, cursor?: string): Promise<SearchPage> => {
     console.log("DEBUG: Frontend API calling /api/search with params:", params);
     try {
-        const response = await api.get('/search', { params });
+        const response = await api.get('/search', { params: cursor ? { ...params, cursor } : params });
         console.log("DEBUG: Search response:", response.data);
         return response.data;
     } catch (error) {
         console.error("DEBUG: Search error:", error);
-        return [];
+        return { results: [], next_cursor: null };
     }
 };
 
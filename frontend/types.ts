@@ -11,6 +11,14 @@ export interface Movie {
 
 export interface FilterOptions {
     genres: string[];
-    actors: string[];
-    directors: string[];
+}
+
+export interface Suggestion {
+    value: string;
+    count: number;
+}
+
+export interface SearchPage {
+    results: Movie[];
+    next_cursor: string | null;
 }
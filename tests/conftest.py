@@ -0,0 +1,77 @@
+import json
+import os
+import pytest
+from rdflib import Graph
+from backend.async_query_engine import AsyncQueryEngine
+from backend.memory_engine import MemoryEngine
+from backend.query_engine import QueryEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ONTOLOGY = os.path.join(ROOT, "ontology", "ontology.ttl")
+MOVIES = os.path.join(ROOT, "tests", "data", "movies.ttl")
+
+
+def load_graph(*paths):
+    graph = Graph()
+    for path in paths:
+        graph.parse(path, format="turtle")
+    return graph
+
+
+class GraphQueryEngine(QueryEngine):
+    """QueryEngine answering its SELECT queries from an rdflib Graph instead of Blazegraph."""
+
+    def __init__(self, graph, **kwargs):
+        super().__init__("http://in-process.invalid/sparql", **kwargs)
+        self.graph = graph
+
+    def _query_json(self, query):
+        return json.loads(self.graph.query(query).serialize(format="json"))
+
+    def update(self, update):
+        self.graph.update(update)
+
+    def post_rdf(self, data, content_type="application/x-turtle"):
+        self.graph.parse(data=data, format="nt" if content_type == "text/plain" else "turtle")
+
+
+class GraphAsyncQueryEngine(AsyncQueryEngine):
+    """AsyncQueryEngine answering its SELECT queries from an rdflib Graph."""
+
+    def __init__(self, graph, **kwargs):
+        super().__init__("http://in-process.invalid/sparql", **kwargs)
+        self.graph = graph
+
+    def _query_json(self, query):
+        return json.loads(self.graph.query(query).serialize(format="json"))
+
+    async def _arun_query(self, query):
+        return self._query_json(query)["results"]["bindings"]
+
+
+def graph_engine(graph, single_query=True, use_async=False):
+    """A SPARQL engine over ``graph`` with its indexes loaded and no search cache."""
+    engine_cls = GraphAsyncQueryEngine if use_async else GraphQueryEngine
+    engine = engine_cls(graph, single_query=single_query, search_cache_size=0)
+    engine.load_title_index()
+    engine.load_suggest_indexes()
+    engine.load_genre_closure(ONTOLOGY)
+    return engine
+
+
+@pytest.fixture(scope="session")
+def movies_graph():
+    return load_graph(MOVIES, ONTOLOGY)
+
+
+@pytest.fixture(params=["single", "multi"])
+def sparql_engine(request, movies_graph):
+    """The sync SPARQL engine over tests/data/movies.ttl, in both query modes."""
+    engine = graph_engine(movies_graph, single_query=request.param == "single")
+    yield engine
+    engine.close()
+
+
+@pytest.fixture(scope="session")
+def memory_engine():
+    return MemoryEngine([MOVIES, ONTOLOGY])
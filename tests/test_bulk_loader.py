@@ -0,0 +1,88 @@
+import io
+import shutil
+import pytest
+from rdflib import Graph
+from backend.bulk_loader import BulkLoader, iter_turtle_chunks
+from tests.conftest import MOVIES, GraphQueryEngine, load_graph
+
+
+class FailingEngine(GraphQueryEngine):
+    """Fails the ``failing``-th upload (counting from 0), as if the connection dropped."""
+
+    def __init__(self, graph, failing):
+        super().__init__(graph)
+        self.failing = failing
+        self.uploads = 0
+
+    def post_rdf(self, data, content_type="application/x-turtle"):
+        self.uploads += 1
+        if self.uploads - 1 == self.failing:
+            raise ConnectionError("connection reset")
+        return super().post_rdf(data, content_type)
+
+
+class InterruptedEngine(GraphQueryEngine):
+    """Stops the process (Ctrl-C, container stop) during the first upload."""
+
+    def post_rdf(self, data, content_type="application/x-turtle"):
+        raise KeyboardInterrupt
+
+
+def loader(engine):
+    return BulkLoader(engine, chunk_bytes=300, concurrency=1, retries=0, backoff=0)
+
+
+def test_next_startup_finishes_interrupted_load(tmp_path):
+    path = str(tmp_path / "movies.ttl")
+    shutil.copy(MOVIES, path)
+    graph = Graph()
+
+    with pytest.raises(RuntimeError, match="failed chunks \\[2\\]"):
+        loader(FailingEngine(graph, failing=2)).ensure_loaded(path)
+    engine = GraphQueryEngine(graph)
+    assert engine.has_movies()
+    assert len(graph) < len(load_graph(MOVIES))
+
+    report = loader(engine).ensure_loaded(path)
+    assert report["chunks_skipped"] > 0 and report["chunks_failed"] == []
+    assert set(graph) == set(load_graph(MOVIES))
+    assert not loader(engine).is_pending(path)
+    # Fully loaded: later startups skip the load
+    assert loader(engine).ensure_loaded(path) is None
+
+
+def test_load_interrupted_before_any_chunk_finished_is_resumed(tmp_path):
+    path = str(tmp_path / "movies.ttl")
+    shutil.copy(MOVIES, path)
+    # The store has movies from the load, but no chunk was recorded as done
+    graph = load_graph(MOVIES)
+    with pytest.raises(KeyboardInterrupt):
+        loader(InterruptedEngine(graph)).load(path)
+    assert loader(GraphQueryEngine(graph)).is_pending(path)
+    assert loader(GraphQueryEngine(graph)).ensure_loaded(path)["chunks_skipped"] == 0
+
+
+# Lines ending in "." that do not end a statement: inside a long literal, a
+# short literal, an IRI and a comment
+TRICKY_TURTLE = b'''@prefix ex: <http://example.org/movie/> .
+
+ex:Heat ex:title "Heat" ;
+    ex:plot """A crew of thieves.
+One last job .
+Then out.""" .
+ex:Dune ex:title "Dune Pt." ;
+    # the sequel follows .
+    ex:homepage <http://example.org/dune.> ;
+    ex:sequel ex:Dune_Part_Two .
+ex:Alien ex:title "Alien" .
+'''
+
+
+def test_turtle_chunks_only_break_between_statements():
+    whole = Graph().parse(data=TRICKY_TURTLE, format="turtle")
+    chunks = [chunk for chunk, _ in iter_turtle_chunks(io.BytesIO(TRICKY_TURTLE), chunk_bytes=1)]
+    assert len(chunks) == 3
+    union = Graph()
+    for chunk in chunks:
+        union += Graph().parse(data=chunk, format="turtle")
+    assert set(union) == set(whole)
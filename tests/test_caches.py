@@ -0,0 +1,24 @@
+from tests.conftest import MOVIES, ONTOLOGY, graph_engine, load_graph
+
+NEW_MOVIE = ('<http://example.org/movie/Sicario> <http://example.org/movie/title> "Sicario" .\n'
+             '<http://example.org/movie/Sicario> <http://example.org/movie/director> '
+             '<http://example.org/movie/Denis_Villeneuve> .\n')
+
+
+def test_clearing_caches_keeps_indexes(movies_graph):
+    engine = graph_engine(movies_graph)
+    title_index, suggest_indexes = engine.title_index, engine.suggest_indexes
+    engine.invalidate_caches()
+    assert engine.title_index is title_index
+    assert engine.suggest_indexes is suggest_indexes
+    assert engine.suggest("actor", "tom") == [{"value": "Tom_Cruise", "count": 3}]
+    # Still answered from the title index rather than the SPARQL fallback
+    assert engine._title_filter("dune").startswith("\nVALUES ?movie")
+
+
+def test_data_change_rebuilds_indexes():
+    engine = graph_engine(load_graph(MOVIES, ONTOLOGY))
+    engine.search_movies(title="sicario")
+    engine.apply_delta([], [NEW_MOVIE])
+    assert [m["title"] for m in engine.search_movies(title="sicario")["results"]] == ["Sicario"]
+    assert engine.suggest("director", "denis") == [{"value": "Denis_Villeneuve", "count": 4}]
@@ -0,0 +1,58 @@
+import csv
+import pytest
+from csv_to_rdf import write_incremental
+
+COLUMNS = ["movie", "title", "year", "runtime", "directors", "actors", "genre"]
+HEAT = {"title": "Heat", "year": "1995", "runtime": "170.0", "directors": "Michael Mann",
+        "actors": "Al Pacino, Robert De Niro", "genre": "crime"}
+
+
+def read_rows(tmp_path, movies):
+    path = tmp_path / "movies.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, COLUMNS, restval="")
+        writer.writeheader()
+        writer.writerows(movies)
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_failed_apply_keeps_delta_pending(tmp_path):
+    state, delta, out = tmp_path / "state.json", tmp_path / "delta", tmp_path / "movies.ttl"
+    write_incremental(read_rows(tmp_path, [HEAT]), state, delta, out)
+    saved_state, saved_out = state.read_text(), out.read_text()
+    rows = read_rows(tmp_path, [{**HEAT, "year": "1996"}])
+
+    def fail(removed, added):
+        raise ConnectionError("endpoint down")
+
+    with pytest.raises(ConnectionError):
+        write_incremental(rows, state, delta, out, fail)
+    assert state.read_text() == saved_state
+    assert out.read_text() == saved_out
+
+    applied = []
+    added, removed = write_incremental(rows, state, delta, out, lambda r, a: applied.append((r, a)))
+    assert applied == [(removed, added)]
+    assert removed == ['<http://example.org/movie/Heat> <http://example.org/movie/year> '
+                       '"1995"^^<http://www.w3.org/2001/XMLSchema#gYear> .\n']
+    assert len(added) == 1 and '"1996"' in added[0]
+
+    # Nothing left to apply
+    assert write_incremental(rows, state, delta, out, lambda r, a: applied.append((r, a))) == ([], [])
+    assert len(applied) == 1
+
+
+def test_interrupted_output_write_keeps_old_output_and_state(tmp_path, monkeypatch):
+    state, delta, out = tmp_path / "state.json", tmp_path / "delta", tmp_path / "movies.ttl"
+    write_incremental(read_rows(tmp_path, [HEAT]), state, delta, out)
+    saved_state, saved_out = state.read_text(), out.read_text()
+
+    def crash(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("csv_to_rdf.os.replace", crash)
+    with pytest.raises(OSError):
+        write_incremental(read_rows(tmp_path, [{**HEAT, "year": "1996"}]), state, delta, out)
+    assert out.read_text() == saved_out
+    assert state.read_text() == saved_state
@@ -0,0 +1,54 @@
+import pytest
+from backend.memory_engine import MemoryEngine
+from benchmarks.memory_engine_parity import walk
+from tests.conftest import MOVIES, ONTOLOGY
+
+# Blonde (2022, 2025) and Nosferatu (1922, 2024) have two years each, Heat
+# two runtimes and Top Gun: Maverick two titles
+CASES = [
+    {},
+    {"title": "dune"},
+    {"title": "maverick"},
+    {"title": "top gun 2"},
+    {"title": "heat"},
+    {"title": "zzzq"},
+    {"genre": "Fiction"},
+    {"genre": "SpeculativeFiction", "year_start": 2016, "year_end": 2021},
+    {"genre": "crime"},
+    {"year_start": 2022},
+    {"year_start": 2022, "year_end": 2023},
+    {"year_start": 1920, "year_end": 1930},
+    {"year_end": 2004},
+    {"actor": "Tom Cruise"},
+    {"actor": ["Zendaya", "Al_Pacino"], "year_start": 1990},
+    {"director": "Denis_Villeneuve"},
+    {"title": "the", "genre": "action"},
+]
+
+
+@pytest.mark.parametrize("page_size", [1, 3])
+@pytest.mark.parametrize("case", CASES, ids=str)
+def test_search_pages_match(sparql_engine, memory_engine, case, page_size):
+    expected = walk(sparql_engine, case, page_size)
+    assert walk(memory_engine, case, page_size) == expected
+    ids = [movie["id"] for page in expected for movie in page]
+    assert len(ids) == len(set(ids))
+
+
+def test_details_options_and_suggestions_match(sparql_engine, memory_engine):
+    assert sparql_engine.get_options() == memory_engine.get_options()
+    uris = [f"http://example.org/movie/{name}" for name in ("Nosferatu", "Untitled", "Heat", "Top_Gun_Maverick",
+                                                               "No_Such_Movie")]
+    assert sparql_engine.get_movies_by_uris(uris) == memory_engine.get_movies_by_uris(uris)
+    for field, prefix in [("actor", "tom"), ("actor", "z"), ("director", "m"), ("director", "zz")]:
+        assert sparql_engine.suggest(field, prefix) == memory_engine.suggest(field, prefix)
+
+
+def test_multi_valued_movies_show_smallest_values(sparql_engine, memory_engine, tmp_path):
+    MemoryEngine([MOVIES, ONTOLOGY], snapshot_dir=str(tmp_path))
+    from_snapshot = MemoryEngine([MOVIES, ONTOLOGY], snapshot_dir=str(tmp_path))
+    for engine in (sparql_engine, memory_engine, from_snapshot):
+        [top_gun] = engine.search_movies(title="maverick")["results"]
+        assert top_gun["title"] == "Top Gun 2"
+        [heat] = engine.get_movies_by_uris(["http://example.org/movie/Heat"])
+        assert heat["runtime"] == "95.0"
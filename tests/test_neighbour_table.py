@@ -0,0 +1,32 @@
+import numpy as np
+
+from backend.embedding_engine import (EmbeddingEngine, NeighbourTable, append_embedding_store,
+                                      matrix_fingerprint, neighbours_path_for, save_embedding_store)
+
+
+def test_one_movie_gets_an_empty_table():
+    matrix = np.ones((1, 4), dtype=np.float32)
+    table = NeighbourTable.build(matrix, 10)
+    assert table.ids.shape == (1, 0) and table.ids.dtype == np.int32
+    assert table.distances.shape == (1, 0) and table.distances.dtype == np.float16
+    assert table.lookup(0, 5) is None
+
+    grown = np.arange(12, dtype=np.float32).reshape(3, 4)
+    sq_norms = np.einsum("ij,ij->i", grown, grown)
+    extended = table.extend(grown, sq_norms, first_row=1, fingerprint=matrix_fingerprint(grown))
+    assert extended.ids.shape == (3, 0) and extended.fingerprint == matrix_fingerprint(grown)
+
+
+def test_engine_on_a_one_movie_store(tmp_path):
+    embedding_file = str(tmp_path / "embeddings.npy")
+    save_embedding_store(embedding_file, ["Dune"], np.ones((1, 4), dtype=np.float32))
+    table = NeighbourTable.build(np.ones((1, 4), dtype=np.float32), 10)
+    table.save(neighbours_path_for(embedding_file))
+
+    engine = EmbeddingEngine(embedding_file, use_index=False)
+    assert engine.neighbours.k == 0
+    assert engine.get_similar_movies("Dune") == []
+
+    append_embedding_store(embedding_file, ["Heat", "Alien"], np.array([[1, 1, 1, 2], [5, 5, 5, 5]], np.float32))
+    assert engine.refresh() == 2
+    assert [uri for uri, _ in engine.get_similar_movies("Dune", top_n=2)] == ["Heat", "Alien"]
@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from rdflib import Graph
+from tests.conftest import graph_engine
+
+# Movie A has two years; a page of two must still hold two distinct movies
+THREE_MOVIES = """
+@prefix ex: <http://example.org/movie/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+ex:A ex:title "A" ; ex:actor ex:X ; ex:director ex:Y ; ex:year "2025"^^xsd:gYear, "2024"^^xsd:gYear .
+ex:B ex:title "B" ; ex:year "2023"^^xsd:gYear .
+ex:C ex:title "C" ; ex:year "2022"^^xsd:gYear .
+"""
+
+
+def walk(search, limit, **filters):
+    """Every page of a search, following next_cursor."""
+    pages = []
+    cursor = None
+    while True:
+        page = search(limit=limit, cursor=cursor, **filters)
+        pages.append(page["results"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def ids(pages):
+    return [[movie["id"].rsplit("/", 1)[-1] for movie in page] for page in pages]
+
+
+@pytest.mark.parametrize("single_query", [True, False])
+def test_multi_year_movie_takes_one_slot(single_query):
+    graph = Graph().parse(data=THREE_MOVIES, format="turtle")
+    engine = graph_engine(graph, single_query=single_query)
+    pages = walk(engine.search_movies, 2)
+    assert ids(pages) == [["A", "B"], ["C"]]
+    assert pages[0][0]["year"] == "2025"
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 50])
+def test_pages_list_each_movie_once(sparql_engine, memory_engine, limit):
+    pages = walk(sparql_engine.search_movies, limit)
+    assert all(len(page) <= limit for page in pages)
+    assert pages == walk(memory_engine.search_movies, limit)
+    found = [movie["id"] for page in pages for movie in page]
+    assert len(found) == len(set(found)) == 11
+    # Dated by the latest year, movies without a year last
+    assert found[:2] == ["http://example.org/movie/Blonde", "http://example.org/movie/Dune_Part_Two"]
+    assert found[-1] == "http://example.org/movie/Untitled"
+
+
+def test_multi_year_movie_is_dated_by_latest_year(sparql_engine):
+    [blonde] = sparql_engine.search_movies(title="blonde")["results"]
+    assert blonde["year"] == "2025"
+    nosferatu, untitled = sparql_engine.get_movies_by_uris(
+        ["http://example.org/movie/Nosferatu", "http://example.org/movie/Untitled"])
+    assert nosferatu["year"] == "2024"
+    assert untitled["year"] is None
+
+
+def test_no_match_gives_empty_page(sparql_engine):
+    sparql_engine.title_index = None  # filter in SPARQL rather than from the index
+    assert sparql_engine.search_movies(title="zzzz") == {"results": [], "next_cursor": None}
+
+
+def test_year_range_applies_to_latest_year(sparql_engine):
+    assert sparql_engine.search_movies(year_start=1920, year_end=1930)["results"] == []
+    found = [movie["title"] for movie in sparql_engine.search_movies(year_start=2023)["results"]]
+    assert found == ["Blonde", "Dune: Part Two", "Nosferatu"]
+
+
+@pytest.mark.parametrize("single_query", [True, False])
+def test_async_engine_pages_like_sync_engine(movies_graph, single_query):
+    sync_engine = graph_engine(movies_graph, single_query=single_query)
+    async_engine = graph_engine(movies_graph, single_query=single_query, use_async=True)
+    loop = asyncio.new_event_loop()
+    try:
+        def search(**kwargs):
+            return loop.run_until_complete(async_engine.search_movies(**kwargs))
+
+        assert walk(search, 2, genre="science_fiction") == walk(sync_engine.search_movies, 2, genre="science_fiction")
+        assert walk(search, 3) == walk(sync_engine.search_movies, 3)
+    finally:
+        loop.run_until_complete(async_engine.aclose())
+        loop.close()
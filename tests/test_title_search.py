@@ -0,0 +1,21 @@
+import pytest
+
+QUERIES = {
+    "dune": ["Dune: Part Two", "Dune"],
+    "ROGER RABBIT?": ["Who Framed Roger Rabbit?"],
+    "(.*)": ['Untitled (.*) "Project" \\d+'],
+    '"project" \\d': ['Untitled (.*) "Project" \\d+'],
+    ".*": ['Untitled (.*) "Project" \\d+'],
+    "d.ne": [],
+    '") || true || ("': [],
+}
+
+
+@pytest.mark.parametrize("use_index", [True, False])
+@pytest.mark.parametrize("query", QUERIES)
+def test_title_is_matched_as_plain_text(sparql_engine, memory_engine, use_index, query):
+    if not use_index:
+        sparql_engine.title_index = None  # the SPARQL filter path
+    found = [m["title"] for m in sparql_engine.search_movies(title=query)["results"]]
+    assert found == QUERIES[query]
+    assert found == [m["title"] for m in memory_engine.search_movies(title=query)["results"]]
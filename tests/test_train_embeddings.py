@@ -0,0 +1,120 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("pykeen")
+from pykeen.triples import TriplesFactory  # noqa: E402
+import train_embeddings  # noqa: E402
+
+TRIPLES = np.array([[f"m{i}", "genre", f"g{i % 3}"] for i in range(60)] +
+                   [[f"m{i}", "actor", f"a{i % 7}"] for i in range(60)])
+
+
+class FakeModel:
+    def __init__(self, triples_factory, **kwargs):
+        self.triples_factory = triples_factory
+
+
+class FakeStopper:
+    def __init__(self, **kwargs):
+        self.stopped = False
+        self.best_epoch = None
+        self.best_metric = None
+
+
+class FakeLoop:
+    """Records each train() call; ``behaviour`` decides how the run ends."""
+
+    calls = []
+    behaviour = "complete"
+
+    def __init__(self, model, triples_factory):
+        self.model = model
+
+    def train(self, stopper=None, **kwargs):
+        FakeLoop.calls.append(dict(kwargs, stopper=stopper))
+        path = os.path.join(kwargs["checkpoint_directory"], kwargs["checkpoint_name"])
+        os.makedirs(kwargs["checkpoint_directory"], exist_ok=True)
+        with open(path, "w") as f:
+            f.write("state")
+        if FakeLoop.behaviour == "interrupt":
+            raise KeyboardInterrupt
+        if FakeLoop.behaviour == "early_stop":
+            stopper.stopped, stopper.best_epoch, stopper.best_metric = True, 5, 0.5
+
+
+@pytest.fixture
+def fake_pykeen(monkeypatch):
+    FakeLoop.calls = []
+    FakeLoop.behaviour = "complete"
+    monkeypatch.setattr(train_embeddings, "RotatE", FakeModel)
+    monkeypatch.setattr(train_embeddings, "EarlyStopper", FakeStopper)
+    monkeypatch.setattr(train_embeddings, "RankBasedEvaluator", lambda: None)
+    monkeypatch.setattr(train_embeddings, "SLCWATrainingLoop", FakeLoop)
+    return FakeLoop
+
+
+def factory(triples=TRIPLES):
+    return TriplesFactory.from_labeled_triples(triples)
+
+
+def test_interrupted_run_resumes_and_completed_run_cleans_up(fake_pykeen, tmp_path, capsys):
+    fake_pykeen.behaviour = "interrupt"
+    with pytest.raises(KeyboardInterrupt):
+        train_embeddings.train(factory(), checkpoint_dir=str(tmp_path))
+    [checkpoint] = os.listdir(tmp_path)
+
+    fake_pykeen.behaviour = "complete"
+    train_embeddings.train(factory(), checkpoint_dir=str(tmp_path))
+    assert f"Resuming from {tmp_path / checkpoint}" in capsys.readouterr().out
+    assert [call["checkpoint_name"] for call in fake_pykeen.calls] == [checkpoint, checkpoint]
+    assert os.listdir(tmp_path) == []
+
+
+def test_other_data_or_settings_do_not_resume(fake_pykeen, tmp_path):
+    fake_pykeen.behaviour = "interrupt"
+    with pytest.raises(KeyboardInterrupt):
+        train_embeddings.train(factory(), checkpoint_dir=str(tmp_path))
+
+    fake_pykeen.behaviour = "complete"
+    train_embeddings.train(factory(TRIPLES[1:]), checkpoint_dir=str(tmp_path))
+    train_embeddings.train(factory(), embedding_dim=32, checkpoint_dir=str(tmp_path))
+    names = [call["checkpoint_name"] for call in fake_pykeen.calls]
+    assert len(set(names)) == 3
+    # Only the interrupted run's checkpoint is left
+    assert os.listdir(tmp_path) == [names[0]]
+
+
+def test_early_stop_reports_best_epoch(fake_pykeen, tmp_path, capsys):
+    fake_pykeen.behaviour = "early_stop"
+    model = train_embeddings.train(factory(), checkpoint_dir=str(tmp_path))
+    assert isinstance(model, FakeModel)
+    [call] = fake_pykeen.calls
+    assert call["stopper"].stopped
+    # The model is trained on the split's training part only
+    assert call["triples_factory"].num_triples < len(TRIPLES)
+    assert "Stopped early; best epoch 5" in capsys.readouterr().out
+    assert os.listdir(tmp_path) == []
+
+
+def test_no_early_stopping_trains_on_everything(fake_pykeen, tmp_path):
+    train_embeddings.train(factory(), early_stopping=False, checkpoint_dir=str(tmp_path))
+    [call] = fake_pykeen.calls
+    assert call["stopper"] is None
+    assert call["triples_factory"].num_triples == len(TRIPLES)
+
+
+def test_fresh_discards_checkpoints(fake_pykeen, tmp_path, monkeypatch):
+    stale = tmp_path / "rotate-0123456789abcdef.pt"
+    stale.write_text("state")
+    monkeypatch.setattr(train_embeddings, "load_triples", lambda path: (factory(), set()))
+    monkeypatch.setattr(train_embeddings, "save_movie_embeddings", lambda *args: None)
+    monkeypatch.setattr(train_embeddings, "save_model_state", lambda *args: None)
+    monkeypatch.setattr(sys, "argv", ["train_embeddings.py", "--fresh", "--checkpoint-dir", str(tmp_path)])
+    fake_pykeen.behaviour = "interrupt"
+    with pytest.raises(KeyboardInterrupt):
+        train_embeddings.main()
+    assert not stale.exists()
+    assert os.listdir(tmp_path) == [fake_pykeen.calls[0]["checkpoint_name"]]
@@ -1,55 +1,339 @@
 # Generates embeddings for all movie entities
-import csv
+import argparse
+import glob
+import hashlib
+import json
+import os
+import resource
+import shutil
+import time
 import numpy as np
-from rdflib import Graph
+import torch
+from pykeen.evaluation import RankBasedEvaluator
+from pykeen.stoppers import EarlyStopper
 from pykeen.triples import TriplesFactory
 from pykeen.models import RotatE
+from pykeen.nn.init import PretrainedInitializer, xavier_uniform_
 from pykeen.training import SLCWATrainingLoop
-from backend.vocab import EX
+from pykeen.training.callbacks import TrainingCallback
+from backend.embedding_engine import append_embedding_store, flatten_complex, save_embedding_store
+from triple_encoding import encode_triples
 
+# Training triples: the Turtle file, or (much faster to read) the cleaned CSV
+# or an N-Triples export of it (csv_to_rdf.py --stream --format nt)
 RDF_PATH = "data/wiki_db_cleaned.ttl"
-OUTPUT_CSV = "data/movie_embeddings.csv"
+# Binary store: float32 matrix + URI table (data/movie_embeddings.uris.txt)
+OUTPUT_NPY = "data/movie_embeddings.npy"
+# Training state saved every CHECKPOINT_MINUTES; a rerun over the same triples
+# with the same settings resumes from it (files are named rotate-<hash>.pt)
+CHECKPOINT_DIR = "data/checkpoints"
+CHECKPOINT_PREFIX = "rotate"
+# Entity/relation vectors and labels of the last run, the base of --incremental
+MODEL_DIR = "data/rotate_model"
 
 #Values for training the model
 EMBEDDING_DIM = 64
-EPOCHS = 20
+EPOCHS = 20  # upper bound when early stopping is on
 BATCH_SIZE = 512
+SEED = 42
 
-#Parse graph
-g = Graph()
-g.parse(RDF_PATH, format="turtle")
+#Early stopping: hits@10 on held-out triples, checked every EVAL_EVERY epochs
+VALIDATION_FRACTION = 0.02
+EVAL_EVERY = 5
+PATIENCE = 2
+CHECKPOINT_MINUTES = 10
 
-#Store every triple as a string in a NumPy array
-triples = []
-for s, p, o in g:
-    triples.append((str(s), str(p), str(o)))
-triples = np.array(triples, dtype=str)
+#Incremental runs only train the new entities, against the triples that mention them
+INCREMENTAL_EPOCHS = 5
 
-#Needed for creating and training the model
-triples_factory = TriplesFactory.from_labeled_triples(triples)
 
+class ThroughputCallback(TrainingCallback):
+    """Prints loss and training triples/sec after every epoch (evaluation time excluded)."""
 
-model = RotatE(triples_factory=triples_factory, embedding_dim=EMBEDDING_DIM, random_seed=42) #Initialize the RotatE model
-training_loop = SLCWATrainingLoop(model=model, triples_factory=triples_factory) #Procedure for single-link prediction
-training_loop.train(num_epochs=EPOCHS, batch_size=BATCH_SIZE, triples_factory=triples_factory) #Actually trains the model
+    def __init__(self, num_triples):
+        super().__init__()
+        self.num_triples = num_triples
+        self.epoch_start = None
 
-#Extract all entity embeddings and their corresponding embedding index
-all_embeddings = model.entity_representations[0]().detach().cpu().numpy()
-entity_to_id = triples_factory.entity_to_id
+    def pre_batch(self, **kwargs):
+        if self.epoch_start is None:
+            self.epoch_start = time.perf_counter()
 
-# Retrieve all movie entities (subjects with a title)
-movie_uris = set(str(s) for s in g.subjects(predicate=EX.title))
+    def post_epoch(self, epoch, epoch_loss, **kwargs):
+        elapsed = time.perf_counter() - self.epoch_start
+        self.epoch_start = None
+        print(f"epoch {epoch}: loss {epoch_loss:.4f}, {elapsed:.1f}s, {self.num_triples / elapsed:,.0f} triples/s",
+              flush=True)
 
-#Store movie embeddings in a CSV file
-with open(OUTPUT_CSV, "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
 
-    header = ["movie_uri"] + [f"e{i}" for i in range(EMBEDDING_DIM)] #first row is header
-    writer.writerow(header)
+def load_triples(path):
+    """(TriplesFactory of every triple, movie URIs) of a .ttl, .nt or .csv file.
 
-    #Iterates through each movie entity and save its embedding
-    for uri in movie_uris:
-        if uri not in entity_to_id:
-            continue
-        vec = all_embeddings[entity_to_id[uri]]
-        writer.writerow([uri] + vec.tolist())
+    The triples are integer-encoded while they are read and handed to
+    TriplesFactory as ids, numbered as from_labeled_triples would.
+    """
+    encoded = encode_triples(path)
+    triples_factory = TriplesFactory(
+        mapped_triples=torch.from_numpy(encoded.mapped),
+        entity_to_id=encoded.entity_to_id,
+        relation_to_id=encoded.relation_to_id,
+    )
+    return triples_factory, encoded.movie_uris
+
+
+def checkpoint_name(triples_factory, **settings):
+    """Checkpoint file name of a training run, keyed to its triples, labels and settings."""
+    digest = hashlib.sha1(triples_factory.mapped_triples.cpu().numpy().tobytes())
+    for to_id in (triples_factory.entity_to_id, triples_factory.relation_to_id):
+        digest.update("\n".join(sorted(to_id, key=to_id.get)).encode("utf-8"))
+    settings.update(seed=SEED, validation_fraction=VALIDATION_FRACTION, eval_every=EVAL_EVERY, patience=PATIENCE)
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return f"{CHECKPOINT_PREFIX}-{digest.hexdigest()[:16]}.pt"
+
+
+def train(triples_factory, epochs=EPOCHS, batch_size=BATCH_SIZE, embedding_dim=EMBEDDING_DIM,
+          early_stopping=True, checkpoint_dir=CHECKPOINT_DIR, checkpoint_minutes=CHECKPOINT_MINUTES):
+    """Trains RotatE on ``triples_factory`` and returns the model.
+
+    With early stopping, a held-out split (every entity stays in the
+    training part) is evaluated every EVAL_EVERY epochs, and training ends
+    once hits@10 stops improving; the best weights are restored. Progress is
+    checkpointed to ``checkpoint_dir`` under a ``checkpoint_name`` of the
+    triples and settings: an interrupted run resumes from it, a run on other
+    data or settings starts over. The checkpoint is deleted once training
+    completes.
+    """
+    name = checkpoint_name(triples_factory, epochs=epochs, batch_size=batch_size, embedding_dim=embedding_dim,
+                           early_stopping=early_stopping)
+    checkpoint = os.path.join(checkpoint_dir, name)
+    if os.path.exists(checkpoint):
+        print(f"Resuming from {checkpoint}")
+
+    training = triples_factory
+    stopper = None
+    if early_stopping:
+        # A fixed seed keeps the split, and so the checkpoint, valid across runs
+        training, validation = triples_factory.split([1 - VALIDATION_FRACTION, VALIDATION_FRACTION], random_state=SEED)
+
+    model = RotatE(triples_factory=training, embedding_dim=embedding_dim, random_seed=SEED) #Initialize the RotatE model
+    if early_stopping:
+        stopper = EarlyStopper(
+            model=model,
+            evaluator=RankBasedEvaluator(),
+            training_triples_factory=training,
+            evaluation_triples_factory=validation,
+            frequency=EVAL_EVERY,
+            patience=PATIENCE,
+        )
+
+    training_loop = SLCWATrainingLoop(model=model, triples_factory=training) #Procedure for single-link prediction
+    training_loop.train( #Actually trains the model
+        triples_factory=training,
+        num_epochs=epochs,
+        batch_size=batch_size,
+        stopper=stopper,
+        callbacks=ThroughputCallback(training.num_triples),
+        checkpoint_directory=checkpoint_dir,
+        checkpoint_name=name,
+        checkpoint_frequency=checkpoint_minutes,
+        checkpoint_on_failure=True,
+        use_tqdm=False,
+    )
+    if stopper is not None and stopper.stopped:
+        print(f"Stopped early; best epoch {stopper.best_epoch} (hits@10 {stopper.best_metric:.4f}), weights restored")
+    # Done: a later run must not resume a finished one
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return model
+
+
+def save_movie_embeddings(model, triples_factory, movie_uris, output_npy=OUTPUT_NPY):
+    #Extract all entity embeddings and their corresponding embedding index
+    all_embeddings = model.entity_representations[0]().detach().cpu().numpy()
+    entity_to_id = triples_factory.entity_to_id
+
+    #Store movie embeddings as one float32 matrix (real parts then imaginary parts)
+    #The backend memory-maps this file directly, no parsing needed at startup
+    movie_uris = sorted(uri for uri in movie_uris if uri in entity_to_id)
+    movie_ids = [entity_to_id[uri] for uri in movie_uris]
+    save_embedding_store(output_npy, movie_uris, flatten_complex(all_embeddings[movie_ids]))
+    print(f"Saved {len(movie_uris)} movie embeddings to {output_npy}")
+
+
+def save_model_state(model, triples_factory, directory=MODEL_DIR):
+    """Saves every entity and relation vector with its label, for ``train_incremental``.
+
+    Vectors are stored as float32 (count, dim, 2) arrays (real and imaginary
+    parts last), the layout pykeen hands to initializers of complex
+    embeddings. Written to a temporary directory and renamed into place.
+    """
+    tmp = f"{directory}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, representation in (("entities", model.entity_representations[0]),
+                                 ("relations", model.relation_representations[0])):
+        vectors = torch.view_as_real(representation().detach().cpu())
+        np.save(os.path.join(tmp, f"{name}.npy"), vectors.numpy().astype(np.float32))
+    labels = {
+        "entities": sorted(triples_factory.entity_to_id, key=triples_factory.entity_to_id.get),
+        "relations": sorted(triples_factory.relation_to_id, key=triples_factory.relation_to_id.get),
+    }
+    with open(os.path.join(tmp, "labels.json"), "w", encoding="utf-8") as f:
+        json.dump(labels, f, ensure_ascii=False)
+
+    old = f"{directory}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(directory):
+        os.rename(directory, old)
+    os.rename(tmp, directory)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def load_model_state(directory=MODEL_DIR):
+    """(entity labels, relation labels, entity vectors, relation vectors) saved by ``save_model_state``."""
+    with open(os.path.join(directory, "labels.json"), encoding="utf-8") as f:
+        labels = json.load(f)
+    entities = np.load(os.path.join(directory, "entities.npy"))
+    relations = np.load(os.path.join(directory, "relations.npy"))
+    return labels["entities"], labels["relations"], entities, relations
+
+
+def _extend_pretrained(pretrained):
+    """Initializer keeping the first rows from ``pretrained``; new rows get RotatE's default."""
+    pretrained = torch.from_numpy(pretrained)
+
+    def initialize(x):
+        x = xavier_uniform_(x)
+        x[:len(pretrained)] = pretrained.to(device=x.device, dtype=x.dtype)
+        return x
+
+    return initialize
+
+
+def train_incremental(encoded, directory=MODEL_DIR, epochs=INCREMENTAL_EPOCHS, batch_size=BATCH_SIZE):
+    """Trains only the entities of ``encoded`` that the saved model has never seen.
+
+    Existing entity and relation vectors are loaded and frozen; the new
+    entities start from RotatE's usual initialization and are trained for a
+    few epochs on the triples that mention them. Returns (model,
+    TriplesFactory over old + new entities, new entity labels), or None when
+    there is nothing new. New relations need a full retraining.
+    """
+    entity_labels, relation_labels, entity_vectors, relation_vectors = load_model_state(directory)
+    unknown = sorted(set(encoded.relation_labels).difference(relation_labels))
+    if unknown:
+        raise ValueError(f"{len(unknown)} relations are not in the saved model (e.g. {unknown[0]}); retrain fully")
+
+    entity_to_id = {label: i for i, label in enumerate(entity_labels)}
+    new_labels = [label for label in encoded.entity_labels if label not in entity_to_id]
+    if not new_labels:
+        return None
+    for label in new_labels:
+        entity_to_id[label] = len(entity_to_id)
+    relation_to_id = {label: i for i, label in enumerate(relation_labels)}
+
+    # encoded ids -> ids of the saved model, new entities numbered after the old ones
+    entity_ids = np.array([entity_to_id[label] for label in encoded.entity_labels], dtype=np.int64)
+    relation_ids = np.array([relation_to_id[label] for label in encoded.relation_labels], dtype=np.int64)
+    mapped = np.stack([entity_ids[encoded.mapped[:, 0]], relation_ids[encoded.mapped[:, 1]],
+                       entity_ids[encoded.mapped[:, 2]]], axis=1)
+    num_old = len(entity_labels)
+    mapped = mapped[(mapped[:, 0] >= num_old) | (mapped[:, 2] >= num_old)]
+
+    triples_factory = TriplesFactory(
+        mapped_triples=torch.from_numpy(mapped),
+        entity_to_id=entity_to_id,
+        relation_to_id=relation_to_id,
+    )
+    model = RotatE(
+        triples_factory=triples_factory,
+        embedding_dim=entity_vectors.shape[1],
+        entity_initializer=_extend_pretrained(entity_vectors),
+        relation_initializer=PretrainedInitializer(torch.from_numpy(relation_vectors)),
+        random_seed=SEED,
+    )
+    # Relations are left out of the optimizer; old entity rows get zero gradients
+    for parameter in model.relation_representations.parameters():
+        parameter.requires_grad_(False)
+    trainable = torch.zeros(len(entity_to_id), 1)
+    trainable[num_old:] = 1.0
+    for parameter in model.entity_representations.parameters():
+        parameter.register_hook(lambda grad: grad * trainable.to(grad.device))
+
+    training_loop = SLCWATrainingLoop(model=model, triples_factory=triples_factory)
+    training_loop.train(
+        triples_factory=triples_factory,
+        num_epochs=epochs,
+        batch_size=batch_size,
+        callbacks=ThroughputCallback(triples_factory.num_triples),
+        use_tqdm=False,
+    )
+    return model, triples_factory, new_labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trains RotatE on the movie graph and saves the movie embeddings")
+    parser.add_argument("--rdf", default=RDF_PATH, help="training triples: .ttl, .nt or the cleaned .csv")
+    parser.add_argument("--out", default=OUTPUT_NPY)
+    parser.add_argument("--epochs", type=int, help=f"default {EPOCHS}, {INCREMENTAL_EPOCHS} with --incremental")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    parser.add_argument("--threads", type=int, default=os.cpu_count(), help="torch intra-op threads")
+    parser.add_argument("--no-early-stopping", action="store_true")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--checkpoint-minutes", type=int, default=CHECKPOINT_MINUTES,
+                        help="minutes between checkpoints (0: after every epoch)")
+    parser.add_argument("--fresh", action="store_true", help="discard existing checkpoints instead of resuming")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="where the trained vectors are kept for --incremental")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"only train entities missing from --model-dir (default {INCREMENTAL_EPOCHS} epochs) "
+                             "and append the new movies to --out")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    if args.incremental:
+        start = time.perf_counter()
+        encoded = encode_triples(args.rdf)
+        result = train_incremental(encoded, args.model_dir, epochs=args.epochs or INCREMENTAL_EPOCHS,
+                                   batch_size=args.batch_size)
+        if result is None:
+            print("No new entities, nothing to train")
+            return
+        model, triples_factory, new_labels = result
+        save_model_state(model, triples_factory, args.model_dir)
+        new_movies = sorted(encoded.movie_uris.intersection(new_labels))
+        if new_movies:
+            vectors = model.entity_representations[0]().detach().cpu().numpy()
+            ids = [triples_factory.entity_to_id[uri] for uri in new_movies]
+            first_row = append_embedding_store(args.out, new_movies, flatten_complex(vectors[ids]))
+            print(f"Appended {len(new_movies)} movie embeddings to {args.out} at row {first_row} "
+                  f"({len(new_labels)} new entities, {time.perf_counter() - start:.1f}s); "
+                  "POST /admin/embeddings/refresh makes them searchable")
+        else:
+            print(f"Trained {len(new_labels)} new entities, none of them a movie")
+        return
+
+    if args.fresh:
+        for checkpoint in glob.glob(os.path.join(args.checkpoint_dir, f"{CHECKPOINT_PREFIX}*.pt")):
+            os.remove(checkpoint)
+
+    start = time.perf_counter()
+    triples_factory, movie_uris = load_triples(args.rdf)
+    # ru_maxrss is in KiB on Linux
+    print(f"{triples_factory.num_triples} triples, {triples_factory.num_entities} entities ready in "
+          f"{time.perf_counter() - start:.1f}s (peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB)")
+    model = train(
+        triples_factory,
+        epochs=args.epochs or EPOCHS,
+        batch_size=args.batch_size,
+        embedding_dim=args.dim,
+        early_stopping=not args.no_early_stopping,
+        checkpoint_dir=args.checkpoint_dir,
+        checkpoint_minutes=args.checkpoint_minutes,
+    )
+    save_movie_embeddings(model, triples_factory, movie_uris, args.out)
+    save_model_state(model, triples_factory, args.model_dir)
+
+
+if __name__ == "__main__":
+    main()
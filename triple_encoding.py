@@ -0,0 +1,130 @@
+# Integer-encoded triples for embedding training, read straight from the
+# cleaned CSV, a line-oriented N-Triples file or (slowest) a Turtle file,
+# without building string arrays of every triple
+import csv
+import re
+from array import array
+import numpy as np
+from backend.vocab import EX
+from csv_to_rdf import row_triples
+
+TITLE = str(EX.title)
+
+# <s> <p> <o> . or <s> <p> "literal"[^^<datatype>|@lang] .
+NT_LINE = re.compile(r'<([^>]*)>\s+<([^>]*)>\s+(?:<([^>]*)>|"((?:[^"\\]|\\.)*)"(?:\^\^<[^>]*>|@[A-Za-z0-9-]+)?)\s*\.\s*$')
+NT_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+NT_ESCAPES = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+
+def _unescape(match):
+    code = match.group(1) or match.group(2)
+    return chr(int(code, 16)) if code else NT_ESCAPES[match.group(3)]
+
+
+class EncodedTriples:
+    """Distinct (head, relation, tail) id triples with their label tables.
+
+    Labels are numbered in sorted order, exactly as
+    ``TriplesFactory.from_labeled_triples`` numbers them, and literals are
+    labelled by their lexical form (``str()`` of the rdflib term), so the
+    ids match the ones of the old Graph-based path.
+    """
+
+    def __init__(self, mapped, entity_labels, relation_labels, movie_uris):
+        self.mapped = mapped                    # (n, 3) int64, sorted rows
+        self.entity_labels = entity_labels      # id -> label
+        self.relation_labels = relation_labels  # id -> label
+        self.movie_uris = movie_uris            # subjects with an ex:title
+
+    @property
+    def entity_to_id(self):
+        return {label: i for i, label in enumerate(self.entity_labels)}
+
+    @property
+    def relation_to_id(self):
+        return {label: i for i, label in enumerate(self.relation_labels)}
+
+
+class TripleEncoder:
+    """Assigns ids to labels as triples stream in; ``finish`` renumbers them."""
+
+    def __init__(self):
+        self.entities = {}
+        self.relations = {}
+        self.columns = (array("q"), array("q"), array("q"))
+        self.movie_uris = set()
+
+    def add(self, s, p, o):
+        entities = self.entities
+        heads, relations, tails = self.columns
+        heads.append(entities.setdefault(s, len(entities)))
+        relations.append(self.relations.setdefault(p, len(self.relations)))
+        tails.append(entities.setdefault(o, len(entities)))
+        if p == TITLE:
+            self.movie_uris.add(s)
+
+    @staticmethod
+    def _sorted_ids(labels):
+        """(sorted labels, old id -> new id array)."""
+        labels = list(labels)
+        order = sorted(range(len(labels)), key=labels.__getitem__)
+        remap = np.empty(len(labels), dtype=np.int64)
+        remap[order] = np.arange(len(labels))
+        return [labels[i] for i in order], remap
+
+    def finish(self):
+        entity_labels, entity_ids = self._sorted_ids(self.entities)
+        relation_labels, relation_ids = self._sorted_ids(self.relations)
+        heads, relations, tails = (np.frombuffer(column, dtype=np.int64) for column in self.columns)
+        mapped = np.stack([entity_ids[heads], relation_ids[relations], entity_ids[tails]], axis=1)
+        # The same triple can come from several rows or lines; a Graph keeps one
+        mapped = np.unique(mapped, axis=0)
+        return EncodedTriples(mapped, entity_labels, relation_labels, self.movie_uris)
+
+
+def encode_csv(path):
+    """Triples of the cleaned CSV, converted exactly as csv_to_rdf.py does."""
+    encoder = TripleEncoder()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            for s, p, o in row_triples(row):
+                encoder.add(str(s), str(p), str(o))
+    return encoder.finish()
+
+
+def encode_ntriples(path):
+    """Triples of an N-Triples file, one statement per line (no blank nodes)."""
+    encoder = TripleEncoder()
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            match = NT_LINE.match(line.strip())
+            if match is None:
+                raise ValueError(f"{path}:{number}: not an N-Triples statement: {line.strip()[:200]}")
+            s, p, uri, literal = match.groups()
+            if uri is None:
+                uri = NT_ESCAPE.sub(_unescape, literal) if "\\" in literal else literal
+            encoder.add(s, p, uri)
+    return encoder.finish()
+
+
+def encode_turtle(path):
+    """Triples of a Turtle file; still parsed by rdflib, but never copied into string arrays."""
+    from rdflib import Graph
+
+    graph = Graph()
+    graph.parse(path, format="turtle")
+    encoder = TripleEncoder()
+    for s, p, o in graph:
+        encoder.add(str(s), str(p), str(o))
+    return encoder.finish()
+
+
+def encode_triples(path):
+    """EncodedTriples of a .csv, .nt or Turtle file (by extension)."""
+    if path.endswith(".csv"):
+        return encode_csv(path)
+    if path.endswith(".nt"):
+        return encode_ntriples(path)
+    return encode_turtle(path)
@@ -1,6 +1,12 @@
+import hashlib
+import json
+import os
+import threading
 import pandas as pd
 import requests
 import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 # =========================
 # Config
@@ -15,17 +21,150 @@ HEADERS = {
     "User-Agent": "MovieDataIntegration/1.0 (student project)"
 }
 
+# Responses are cached per query, so a rerun (or a run after a crash) only
+# fetches the batches that have not been answered yet
+CACHE_DIR = "./data/sparql_cache"
+
+# Parallel requests, and the request rate allowed per endpoint (requests/s
+# with bursts of up to RATE_BURST); public endpoints throttle hard above it
+WORKERS = 4
+RATE_PER_SECOND = 2.0
+RATE_BURST = 4
+RETRIES = 4
+
+# URIs per get_movie_data query
+MOVIE_BATCH_SIZE = 100
+
+# =========================
+# Helper: rate limiting and response cache
+# =========================
+class TokenBucket:
+    """Thread-safe token bucket: acquire() blocks until a request is allowed."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ResponseCache:
+    """SPARQL result bindings on disk, one JSON file per (endpoint, query) hash."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+
+    def _path(self, endpoint, query):
+        key = hashlib.sha256(f"{endpoint}\n{query}".encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, endpoint, query):
+        try:
+            with open(self._path(endpoint, query), encoding="utf-8") as f:
+                bindings = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.hits += 1
+        return bindings
+
+    def put(self, endpoint, query, bindings):
+        path = self._path(endpoint, query)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written under a temporary name first, so a crash never leaves a truncated entry
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(bindings, f)
+        os.replace(tmp, path)
+
+
+class SparqlFetcher:
+    """Runs SPARQL queries concurrently, rate limited per endpoint and cached on disk."""
+
+    def __init__(self, cache_dir=CACHE_DIR, workers=WORKERS, rate=RATE_PER_SECOND, burst=RATE_BURST,
+                 retries=RETRIES):
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.workers = workers
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.buckets = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _bucket(self, endpoint):
+        with self.lock:
+            if endpoint not in self.buckets:
+                self.buckets[endpoint] = TokenBucket(self.rate, self.burst)
+            return self.buckets[endpoint]
+
+    def run(self, endpoint, query):
+        """Result bindings of one query, from the cache or the endpoint."""
+        if self.cache:
+            bindings = self.cache.get(endpoint, query)
+            if bindings is not None:
+                return bindings
+
+        for attempt in range(self.retries + 1):
+            self._bucket(endpoint).acquire()
+            with self.lock:
+                self.requests += 1
+            try:
+                bindings = run_sparql(endpoint, query, self.session)
+                break
+            except requests.RequestException as e:
+                status = getattr(e.response, "status_code", None)
+                # Only throttling, server errors and network failures are worth retrying
+                if attempt == self.retries or (status is not None and status != 429 and status < 500):
+                    raise
+                retry_after = getattr(e.response, "headers", {}).get("Retry-After", "")
+                time.sleep(float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+
+        if self.cache:
+            self.cache.put(endpoint, query, bindings)
+        return bindings
+
+    def run_all(self, endpoint, queries, label="batch"):
+        """Bindings of every query, in order; a query that keeps failing yields [] (rerun to retry it)."""
+        def one(item):
+            i, query = item
+            try:
+                return self.run(endpoint, query)
+            except Exception as e:
+                print(f"{label} {i} failed: {e}")
+                return []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(one, enumerate(queries)))
+
 # =========================
 # Helper: run SPARQL query
 # =========================
-def run_sparql(endpoint, query):
+def run_sparql(endpoint, query, session=requests):
     headers = {
         "User-Agent": "MovieDataIntegration/1.0 (student project)",
         "Accept": "application/sparql-results+json",
         "Content-Type": "application/x-www-form-urlencoded"
     }
 
-    response = requests.post(
+    response = session.post(
         endpoint,
         data={"query": query},
         headers=headers,
@@ -47,15 +186,15 @@ def normalize_qid(value):
 # =========================
 # Step 1: QID -> DBpedia URI
 # =========================
-def get_dbpedia_uris(qids, batch_size=50, sleep_time=1):
-    mapping = {}
+def get_dbpedia_uris(qids, batch_size=50, fetcher=None):
+    fetcher = fetcher or SparqlFetcher()
+    queries = []
     for i in range(0, len(qids), batch_size):
         batch = qids[i:i + batch_size]
-        print(f"  Wikidata batch {i}–{i + len(batch) - 1}")
 
         values = " ".join(f"<http://www.wikidata.org/entity/{qid}>" for qid in batch)
 
-        query = f"""
+        queries.append(f"""
         PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
         PREFIX owl: <http://www.w3.org/2002/07/owl#>
 
@@ -63,18 +202,15 @@ def get_dbpedia_uris(qids, batch_size=50, sleep_time=1):
             VALUES ?wikidata {{ {values} }}
             ?dbpediaMovie owl:sameAs ?wikidata .
         }}
-        """
-
-        try:
-            results = run_sparql(DBPEDIA_SPARQL, query)
-            for r in results:
-                wikidata_qid = r["wikidata"]["value"].rsplit("/", 1)[-1]
-                dbpedia_uri = r["dbpediaMovie"]["value"]
-                mapping[wikidata_qid] = dbpedia_uri
-        except Exception as e:
-            print(f"Batch failed: {e}")
+        """)
 
-        time.sleep(sleep_time)
+    print(f"  {len(queries)} Wikidata batches of {batch_size}")
+    mapping = {}
+    for results in fetcher.run_all(DBPEDIA_SPARQL, queries, "Wikidata batch"):
+        for r in results:
+            wikidata_qid = r["wikidata"]["value"].rsplit("/", 1)[-1]
+            dbpedia_uri = r["dbpediaMovie"]["value"]
+            mapping[wikidata_qid] = dbpedia_uri
 
     return mapping
 
@@ -83,13 +219,10 @@ def get_dbpedia_uris(qids, batch_size=50, sleep_time=1):
 # =========================
 # Step 2: DBpedia movie data
 # =========================
-def get_movie_data(dbpedia_uris):
-    if not dbpedia_uris:
-        return {}
-
+def movie_data_query(dbpedia_uris):
     values = " ".join(f"<{uri}>" for uri in dbpedia_uris)
 
-    query = f"""
+    return f"""
     SELECT
       ?film
       ?title
@@ -127,18 +260,26 @@ def get_movie_data(dbpedia_uris):
     GROUP BY ?film ?title ?year ?runtime
     """
 
-    results = run_sparql(DBPEDIA_SPARQL, query)
+
+def get_movie_data(dbpedia_uris, batch_size=MOVIE_BATCH_SIZE, fetcher=None):
+    if not dbpedia_uris:
+        return {}
+
+    fetcher = fetcher or SparqlFetcher()
+    queries = [movie_data_query(dbpedia_uris[i:i + batch_size]) for i in range(0, len(dbpedia_uris), batch_size)]
+    print(f"  {len(queries)} DBpedia batches of {batch_size}")
 
     data = {}
-    for r in results:
-        film_uri = r["film"]["value"]
-        data[film_uri] = {
-            "title_dbpedia": r.get("title", {}).get("value"),
-            "year_dbpedia": r.get("year", {}).get("value"),
-            "runtime": r.get("runtime", {}).get("value"),
-            "directors": r.get("directors", {}).get("value"),
-            "actors": r.get("actors", {}).get("value"),
-        }
+    for results in fetcher.run_all(DBPEDIA_SPARQL, queries, "DBpedia batch"):
+        for r in results:
+            film_uri = r["film"]["value"]
+            data[film_uri] = {
+                "title_dbpedia": r.get("title", {}).get("value"),
+                "year_dbpedia": r.get("year", {}).get("value"),
+                "runtime": r.get("runtime", {}).get("value"),
+                "directors": r.get("directors", {}).get("value"),
+                "actors": r.get("actors", {}).get("value"),
+            }
 
     return data
 
@@ -162,18 +303,19 @@ def main():
     qids = df["qid"].dropna().unique().tolist()
     print(f"Found {len(qids)} QIDs")
 
+    fetcher = SparqlFetcher()
+
     print("Querying Wikidata for DBpedia URIs...")
-    qid_to_dbpedia = get_dbpedia_uris(qids)
+    qid_to_dbpedia = get_dbpedia_uris(qids, fetcher=fetcher)
 
     df["dbpedia_uri"] = df["qid"].map(qid_to_dbpedia)
 
-    time.sleep(1)
-
     dbpedia_uris = df["dbpedia_uri"].dropna().unique().tolist()
     print(f"Found {len(dbpedia_uris)} DBpedia URIs")
 
     print("Querying DBpedia for movie data...")
-    movie_data = get_movie_data(dbpedia_uris)
+    movie_data = get_movie_data(dbpedia_uris, fetcher=fetcher)
+    print(f"{fetcher.requests} requests sent, {fetcher.cache.hits if fetcher.cache else 0} answered from the cache")
 
     df["title_dbpedia"] = df["dbpedia_uri"].map(
         lambda x: movie_data.get(x, {}).get("title_dbpedia")